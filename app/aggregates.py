@@ -0,0 +1,164 @@
+from datetime import date
+
+import pandas as pd
+
+# --- Agrégats par semaine ---
+# Une ligne par semaine ISO publiée : nombre d'instructions et dernière mise à
+# jour. Toutes les statistiques de l'onglet Visualisation (années, mois,
+# cumul, calendrier) s'en déduisent sans relire la table des instructions.
+WEEK_COUNTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS week_counts (
+        year INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        last_updated TIMESTAMP,
+        PRIMARY KEY (year, week)
+    )
+"""
+
+# Retrait d'une instruction de sa semaine : la dernière mise à jour de la
+# semaine est relue via l'index (année, semaine), une semaine vide disparaît
+_REMOVE_OLD = """
+    UPDATE week_counts
+    SET count = count - 1,
+        last_updated = (SELECT MAX(last_updated) FROM instructions WHERE year = OLD.year AND week = OLD.week)
+    WHERE year = OLD.year AND week = OLD.week;
+    DELETE FROM week_counts WHERE year = OLD.year AND week = OLD.week AND count <= 0;
+"""
+
+_ADD_NEW = """
+    INSERT INTO week_counts (year, week, count, last_updated) VALUES (NEW.year, NEW.week, 1, NEW.last_updated)
+    ON CONFLICT (year, week) DO UPDATE SET
+        count = count + 1,
+        last_updated = CASE WHEN excluded.last_updated IS NULL OR last_updated >= excluded.last_updated
+                            THEN last_updated ELSE excluded.last_updated END;
+"""
+
+# Tenue à jour incrémentale, quel que soit le chemin d'écriture (ingestion,
+# complétion, changesets, migrations)
+TRIGGERS = {
+    "trg_week_counts_insert": f"""
+        AFTER INSERT ON instructions
+        WHEN NEW.year IS NOT NULL AND NEW.week IS NOT NULL
+        BEGIN {_ADD_NEW} END
+    """,
+    "trg_week_counts_delete": f"""
+        AFTER DELETE ON instructions
+        WHEN OLD.year IS NOT NULL AND OLD.week IS NOT NULL
+        BEGIN {_REMOVE_OLD} END
+    """,
+    "trg_week_counts_update_old": f"""
+        AFTER UPDATE OF year, week, last_updated ON instructions
+        WHEN OLD.year IS NOT NULL AND OLD.week IS NOT NULL
+        BEGIN {_REMOVE_OLD} END
+    """,
+    "trg_week_counts_update_new": f"""
+        AFTER UPDATE OF year, week, last_updated ON instructions
+        WHEN NEW.year IS NOT NULL AND NEW.week IS NOT NULL
+        BEGIN {_ADD_NEW} END
+    """,
+}
+
+
+def _has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def rebuild_week_counts(conn):
+    """Recalcule tous les agrégats depuis la table des instructions (en une requête)."""
+    conn.execute("DELETE FROM week_counts")
+    conn.execute("""
+        INSERT INTO week_counts (year, week, count, last_updated)
+        SELECT year, week, COUNT(*), MAX(last_updated)
+        FROM instructions
+        WHERE year IS NOT NULL AND week IS NOT NULL
+        GROUP BY year, week
+    """)
+
+
+def ensure_week_counts(conn):
+    """Crée les agrégats et leurs déclencheurs ; le premier calcul part de la base existante.
+
+    Les déclencheurs sont créés avant le calcul, dans la même transaction :
+    aucune écriture ne peut passer entre les deux.
+    """
+    created = not _has_table(conn, "week_counts")
+    conn.execute(WEEK_COUNTS_TABLE)
+    # Les deux déclencheurs de mise à jour donnent le même résultat dans un ordre
+    # comme dans l'autre : la dernière mise à jour retirée est relue en base
+    for name, body in TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if created:
+        rebuild_week_counts(conn)
+    conn.commit()
+
+
+# --- Lecture ---
+def _iso_date(year, week, day):
+    """Jour d'une semaine ISO, None pour une semaine qui n'existe pas (53e semaine d'une année à 52)."""
+    try:
+        return date.fromisocalendar(int(year), int(week), day)
+    except ValueError:
+        return None
+
+
+def load_week_counts(conn):
+    """Agrégats par semaine : année, semaine, mois (celui du jeudi de la semaine ISO), nombre, dernière mise à jour."""
+    cube = pd.read_sql_query("SELECT year, week, count, last_updated FROM week_counts ORDER BY year, week", conn)
+    thursdays = [_iso_date(year, week, 4) for year, week in zip(cube['year'], cube['week'])]
+    cube['month'] = pd.array([day.month if day else None for day in thursdays], dtype='Int64')
+    return cube
+
+
+def summary(cube):
+    """Totaux : nombre d'instructions, années couvertes, dernière mise à jour."""
+    if cube.empty:
+        return {'total': 0, 'min_year': None, 'max_year': None, 'last_update': None}
+    last_update = pd.to_datetime(cube['last_updated'], errors='coerce').max()
+    return {
+        'total': int(cube['count'].sum()),
+        'min_year': int(cube['year'].min()),
+        'max_year': int(cube['year'].max()),
+        'last_update': None if pd.isna(last_update) else last_update,
+    }
+
+
+def year_counts(cube):
+    """Nombre d'instructions par année."""
+    return cube.groupby('year', as_index=False)['count'].sum()
+
+
+def week_counts(cube, year=None):
+    """Nombre d'instructions par numéro de semaine, toutes années ou pour une année (exploration)."""
+    if year is not None:
+        cube = cube[cube['year'] == year]
+    return cube.groupby('week', as_index=False)['count'].sum()
+
+
+def month_counts(cube, year=None):
+    """Nombre d'instructions par mois, toutes années ou pour une année."""
+    if year is not None:
+        cube = cube[cube['year'] == year]
+    return cube.groupby('month', as_index=False)['count'].sum()
+
+
+def cumulative_counts(cube):
+    """Nombre cumulé d'instructions, semaine après semaine (lundi de chaque semaine ISO)."""
+    return pd.DataFrame({
+        'date': [_iso_date(year, week, 1) for year, week in zip(cube['year'], cube['week'])],
+        'total': cube['count'].cumsum(),
+    })
+
+
+def publication_calendar(cube):
+    """Calendrier des publications : une ligne par (année, semaine), semaines sans publication comprises."""
+    if cube.empty:
+        return cube[['year', 'week', 'count']]
+    years = range(int(cube['year'].min()), int(cube['year'].max()) + 1)
+    grid = pd.DataFrame(
+        [(year, week) for year in years for week in range(1, date(year, 12, 28).isocalendar()[1] + 1)],
+        columns=['year', 'week'],
+    )
+    grid = grid.merge(cube[['year', 'week', 'count']], on=['year', 'week'], how='left')
+    grid['count'] = grid['count'].fillna(0).astype(int)
+    return grid
@@ -2,25 +2,22 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import os
-import requests
-from bs4 import BeautifulSoup
-from whoosh.index import create_in, exists_in, open_dir, LockError
-from whoosh.fields import Schema, TEXT, ID
-from whoosh.qparser import QueryParser
-from whoosh.analysis import StemmingAnalyzer, LowercaseFilter, StopFilter
-import nltk
-from nltk.corpus import wordnet
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
+import json
 from datetime import datetime, timedelta
 import time
 import traceback
-import subprocess
-import hashlib
-import glob
-import shutil
-from PIL import Image
-from io import BytesIO
+from functools import partial, wraps
+
+import aggregates
+import backups
+import database
+import exports
+import nlp
+import pdf_store
+
+# Les modules de recherche (Whoosh, NLTK), de scraping et de PDF sont importés
+# au premier usage, dans les fonctions : ils ne retardent pas le premier affichage
+# (contrôlé par scripts/bench_startup.py)
 
 # Configuration de la page Streamlit avec plus d'options
 st.set_page_config(
@@ -30,6 +27,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Début de l'exécution : mesure du temps de rerun
+app_started = time.perf_counter()
+
 # --- Styles CSS personnalisés ---
 st.markdown("""
 <style>
@@ -154,8 +154,6 @@ if 'db_last_checked' not in st.session_state:
     st.session_state.db_last_checked = None
 if 'is_db_updated' not in st.session_state:
     st.session_state.is_db_updated = False
-if 'search_results' not in st.session_state:
-    st.session_state.search_results = None
 if 'selected_instruction' not in st.session_state:
     st.session_state.selected_instruction = None
 if 'filter_year' not in st.session_state:
@@ -165,93 +163,95 @@ if 'filter_week' not in st.session_state:
 if 'update_frequency' not in st.session_state:
     st.session_state.update_frequency = "Hebdomadaire"
 
-# --- Initialisation NLTK ---
-@st.cache_resource
-def initialize_nltk():
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
+# --- Initialisation du processus ---
+@st.cache_resource(show_spinner=False)
+def initialize_process():
+    """Travaux de démarrage faits une seule fois par processus, pour toutes les sessions."""
+    os.makedirs('data', exist_ok=True)
+    os.makedirs('indexdir', exist_ok=True)
+    os.makedirs('backups', exist_ok=True)
+
+    # Les anciennes copies brutes sont intégrées une fois au magasin de sauvegardes
+    backups.import_legacy_backups()
+
+initialize_process()
+
+# --- Mesure des temps d'exécution ---
+def record_timing(region, duration):
+    """Garde en session la dernière durée d'exécution d'une région (ou de l'application)."""
+    st.session_state.setdefault('run_timings', {})[region] = (duration, datetime.now())
+
+def timed_region(region):
+    """Décorateur : chronomètre chaque exécution de la fonction (onglet ou fragment)."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(region, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def show_timings():
+    """Affiche les dernières durées mesurées : rerun complet et régions relancées seules."""
+    timings = st.session_state.get('run_timings', {})
+    if not timings:
+        return
+    with st.expander("⏱️ Temps d'exécution"):
+        st.dataframe(
+            pd.DataFrame(
+                [(region, round(duration * 1000), at.strftime("%H:%M:%S")) for region, (duration, at) in timings.items()],
+                columns=["Région", "Durée (ms)", "Heure"],
+            ),
+            use_container_width=True,
+            hide_index=True
+        )
 
-    try:
-        nltk.data.find('corpora/wordnet')
-    except LookupError:
-        nltk.download('wordnet')
-        nltk.download('omw-1.4')
+# --- Fonction pour télécharger la base de données depuis GitHub ---
+def backup_database(local_db_path):
+    """Sauvegarde la base avant son remplacement (magasin dédupliqué et compressé)."""
+    entry = backups.create_backup(local_db_path)
+    st.write(f"✅ Sauvegarde créée: {entry['sha256'][:12]}")
 
-initialize_nltk()
+def download_db_from_github(force=False):
+    """Télécharge la base de données depuis GitHub si une version plus récente est disponible.
 
-# --- Configuration des répertoires ---
-os.makedirs('data', exist_ok=True)
-os.makedirs('indexdir', exist_ok=True)
-os.makedirs('backups', exist_ok=True)
+    Les changesets publiés depuis la version locale sont appliqués en priorité ;
+    la base complète n'est téléchargée que si la base locale est trop en retard.
+    Les vérifications sont conditionnelles : une base inchangée ne coûte qu'une
+    réponse 304, sans téléchargement.
+    """
+    import sync
 
-# --- Fonction pour télécharger la base de données depuis GitHub ---
-def download_db_from_github(force=False):
-    """Télécharge la base de données depuis GitHub si une version plus récente est disponible."""
-    # URL directe vers le fichier dans le dépôt GitHub
-    github_raw_url = "https://raw.githubusercontent.com/M00N69/sdssa-instructions-app/main/data/sdssa_instructions.db"
-    local_db_path = "data/sdssa_instructions.db"
-
-    # Définir les headers avec un User-Agent
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    local_db_path = database.DB_PATH
 
     try:
-        # Vérifier si le fichier existe localement et obtenir sa date de modification
-        local_modification_time = None
-        local_hash = None
         if os.path.exists(local_db_path):
-            local_modification_time = os.path.getmtime(local_db_path)
-            local_modification_date = datetime.fromtimestamp(local_modification_time)
-
-            # Calculer le hash de la base locale pour détecter les changements
-            with open(local_db_path, 'rb') as f:
-                local_hash = hashlib.md5(f.read()).hexdigest()
-
+            local_modification_date = datetime.fromtimestamp(os.path.getmtime(local_db_path))
             with st.status(f"📅 Base de données locale du {local_modification_date.strftime('%d/%m/%Y à %H:%M')}"):
                 st.write("Vérification des mises à jour...")
 
-        # Télécharger directement le fichier sans vérifier les en-têtes (plus fiable)
         with st.spinner("Téléchargement de la base de données..."):
-            response = requests.get(github_raw_url, headers=headers, allow_redirects=True, timeout=30)
-
-            if response.status_code == 200:
-                # Calculer le hash de la nouvelle version
-                new_content = response.content
-                new_hash = hashlib.md5(new_content).hexdigest()
-
-                # Vérifier si le contenu a réellement changé ou si le téléchargement est forcé
-                if force or not local_hash or new_hash != local_hash:
-                    # Créer une sauvegarde datée
-                    if os.path.exists(local_db_path):
-                        backup_date = datetime.now().strftime('%Y%m%d_%H%M%S')
-                        backup_path = f"backups/sdssa_instructions_{backup_date}.db"
-                        shutil.copy2(local_db_path, backup_path)
-                        st.write(f"✅ Sauvegarde créée: {backup_path}")
-
-                    # Écrire la nouvelle version
-                    with open(local_db_path, 'wb') as f:
-                        f.write(new_content)
-
-                    st.success("✅ Base de données mise à jour avec succès!")
-                    st.session_state.is_db_updated = True
-
-                    # Limiter le nombre de sauvegardes (garder les 5 plus récentes)
-                    backups = sorted(glob.glob("backups/sdssa_instructions_*.db"))
-                    if len(backups) > 5:
-                        for old_backup in backups[:-5]:
-                            os.remove(old_backup)
-
-                    return True
-                else:
-                    st.info("📌 Le contenu de la base de données est identique - aucune mise à jour nécessaire")
-                    return True
-            else:
-                st.error(f"❌ Erreur lors du téléchargement: {response.status_code}")
-                return False
+            result = sync.update_local_database(local_path=local_db_path, force=force,
+                                                before_replace=backup_database)
+
+        st.session_state.db_last_checked = datetime.now()
 
+        if result.status == sync.UPDATED:
+            st.success("✅ Base de données mise à jour avec succès!")
+            st.session_state.is_db_updated = True
+        elif result.status == sync.PATCHED:
+            st.success("✅ Nouvelles instructions synchronisées (changesets appliqués)!")
+            st.session_state.is_db_updated = True
+        else:
+            st.info("📌 Le contenu de la base de données est identique - aucune mise à jour nécessaire")
+        return True
+
+    except sync.SyncError as e:
+        st.error(f"❌ Erreur lors du téléchargement: {e}")
+        return False
     except Exception as e:
         st.error(f"❌ Erreur lors du téléchargement de la base de données: {e}")
         st.error(traceback.format_exc())
@@ -260,12 +260,12 @@ def download_db_from_github(force=False):
 # --- Fonctions de gestion de la base de données SQLite ---
 def get_db_connection():
     """Crée et retourne une connexion à la base de données avec un context manager."""
-    db_path = "data/sdssa_instructions.db"
+    db_path = database.DB_PATH
     if not os.path.exists(db_path):
         st.error("❌ Base de données non trouvée! Veuillez télécharger la base de données depuis GitHub.")
         st.stop()
 
-    return sqlite3.connect(db_path)
+    return database.connect(db_path)
 
 def ensure_database_structure():
     """Vérifie et crée la structure de la base de données."""
@@ -294,11 +294,25 @@ def ensure_database_structure():
                 cursor.execute("ALTER TABLE instructions ADD COLUMN last_updated TIMESTAMP")
                 conn.commit()
 
+            # Index sur le titre pour la lecture des fiches complètes
+            database.ensure_indexes(conn)
+            # Agrégats de l'onglet Visualisation, calculés une fois puis tenus à jour par déclencheurs
+            aggregates.ensure_week_counts(conn)
+
             return True
         except sqlite3.Error as e:
             st.error(f"❌ Erreur base de données: {e}")
             return False
 
+@st.cache_resource(show_spinner=False)
+def initialize_database(db_identity):
+    """Vérifie la structure de la base une fois par processus et par fichier.
+
+    `db_identity` (inode du fichier) change quand la base est remplacée par une
+    synchronisation ou une restauration : la structure est alors revérifiée.
+    """
+    return ensure_database_structure()
+
 def check_table_structure():
     """Vérifie la structure actuelle de la table instructions."""
     with get_db_connection() as conn:
@@ -340,40 +354,64 @@ def recreate_table():
         conn.commit()
         print("Table 'instructions' recréée avec succès.")
 
-def load_data():
-    """Charge les données depuis la base de données avec mise en cache."""
-    # Utiliser le cache de Streamlit pour optimiser les performances
-    @st.cache_data(ttl=300)  # Cache valide pendant 5 minutes
-    def _load_data():
-        with get_db_connection() as conn:
-            query = "SELECT * FROM instructions"
-            df = pd.read_sql_query(query, conn)
-            return df
+def get_data_version():
+    """Retourne le jeton de version de la base, clé de tous les caches dérivés."""
+    return database.data_version(database.DB_PATH)
+
+# Liste partagée telle quelle entre les reruns (ni copie ni désérialisation) :
+# elle n'est jamais modifiée, filtres et recherche en font des sélections
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _load_data(version):
+    with get_db_connection() as conn:
+        return database.load_list_frame(conn)
+
+def load_data(version):
+    """Charge la liste légère des instructions, mise en cache par version des données.
 
+    Seuls l'année, la semaine, le titre, les liens et un extrait de l'objet sont
+    chargés ; les textes complets sont lus à la demande via `get_instruction_details`.
+    """
     try:
-        return _load_data()
+        return _load_data(version)
     except Exception as e:
         st.error(f"❌ Erreur lors du chargement des données: {e}")
         return pd.DataFrame()
 
-def get_instruction_details(title):
-    """Récupère les détails d'une instruction spécifique."""
-    with get_db_connection() as conn:
-        query = "SELECT * FROM instructions WHERE title = ?"
-        df = pd.read_sql_query(query, conn, params=(title,))
-        if not df.empty:
-            return df.iloc[0]
+def get_instruction_details(title, version):
+    """Récupère les détails complets d'une instruction (cache LRU par version et titre)."""
+    if not os.path.exists(database.DB_PATH):
         return None
+    return database.get_instruction_details(title, version=version)
+
+# --- Exports ---
+# Périmètres d'export : libellé -> suffixe du nom de fichier
+EXPORT_SCOPES = {
+    "Toutes": "complete",
+    "90 derniers jours": "recent",
+    "Filtres de l'onglet Recherche": "selection",
+}
+
+def export_filters_for(scope, year=None, week=None):
+    """Filtres d'un périmètre d'export ; la date des exports récents est arrondie au jour (clé de cache stable)."""
+    if scope == "90 derniers jours":
+        return {"since": (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")}
+    if scope == "Filtres de l'onglet Recherche":
+        return {"year": year, "week": week}
+    return {}
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def count_export_rows(version, filters):
+    with get_db_connection() as conn:
+        return exports.count_rows(conn, **dict(filters))
 
 def add_instruction_to_db(year, week, title, link, pdf_link, objet, resume):
     """Ajoute ou met à jour une instruction dans la base de données."""
+    import ingest
+
     with get_db_connection() as conn:
-        cursor = conn.cursor()
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO instructions (year, week, title, link, pdf_link, objet, resume, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (year, week, title, link, pdf_link, objet, resume, datetime.now()))
+            ingest.prepare(conn)
+            ingest.upsert_instructions(conn, year, week, [(title, link, pdf_link, objet, resume)])
             conn.commit()
             return True
         except sqlite3.Error as e:
@@ -383,73 +421,102 @@ def add_instruction_to_db(year, week, title, link, pdf_link, objet, resume):
 # --- Fonctions de Web Scraping ---
 def get_new_instructions(year, week):
     """Récupère les nouvelles instructions SDSSA pour une année et semaine données."""
-    url = f"https://info.agriculture.gouv.fr/boagri/historique/annee-{year}/semaine-{week}"
-    try:
-        with st.spinner(f"Récupération données année {year}, semaine {week}..."):
-            response = requests.get(url, timeout=15)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                instructions = soup.find_all('a', href=True)
-                sdssa_instructions = [a for a in instructions if 'SDSSA' in a.text]
-                new_instructions = []
-
-                progress_bar = st.progress(0.0)
-                for idx, instruction in enumerate(sdssa_instructions):
-                    href = instruction['href']
-                    if not href.startswith(('http://', 'https://')):
-                        href = f"https://info.agriculture.gouv.fr{href}"
-                    link = href
-                    pdf_link = link.replace("/detail", "/telechargement")
+    import scraper
 
-                    try:
-                        detail_response = requests.get(link, timeout=15)
-                        if detail_response.status_code == 200:
-                            soup = BeautifulSoup(detail_response.content, 'html.parser')
-                            objet_tag = soup.find('b', text="OBJET : ")
-                            objet = objet_tag.next_sibling.strip() if objet_tag and objet_tag.next_sibling else "OBJET : Inconnu"
-                            resume_tag = soup.find('b', text="RESUME : ")
-                            resume = resume_tag.next_sibling.strip() if resume_tag and resume_tag.next_sibling else "RESUME : Inconnu"
-                            new_instructions.append((instruction.text, link, pdf_link, objet, resume))
-                    except requests.RequestException as e:
-                        st.warning(f"⚠️ Erreur détails {link}: {e}")
-                        new_instructions.append((instruction.text, link, pdf_link, "OBJET : Inconnu", "RESUME : Inconnu"))
-
-                    # Mettre à jour la barre de progression
-                    progress_bar.progress((idx + 1) / len(sdssa_instructions))
-                    # Pause pour éviter de surcharger le serveur
-                    time.sleep(0.5)
-
-                return new_instructions
-            else:
-                st.warning(f"⚠️ Impossible de récupérer année {year} semaine {week} (Status: {response.status_code})")
-                return []
-    except requests.RequestException as e:
-        st.error(f"❌ Erreur connexion année {year} semaine {week}: {e}")
+    with st.spinner(f"Récupération données année {year}, semaine {week}..."):
+        instructions = scraper.scrape_weeks([(year, week)])[(year, week)]
+    if instructions is None:
+        st.warning(f"⚠️ Impossible de récupérer année {year} semaine {week}")
         return []
+    return instructions
 
 # --- Fonctions de Normalisation de Texte et Indexation Whoosh ---
-@st.cache_resource
-def create_whoosh_index(df):
-    """Crée ou ouvre l'index Whoosh."""
+# Fichier de `indexdir` décrivant l'état indexé (JSON) : version du schéma,
+# version des données et repère des dernières modifications indexées
+INDEX_VERSION_FILE = "DATA_VERSION"
+
+# Version du schéma de l'index : un changement de schéma force la
+# reconstruction de l'index existant
+INDEX_SCHEMA_VERSION = "3"
+
+# Pondération du texte des PDF dans la recherche, relative aux fiches
+PDF_TEXT_BOOST = 0.5
+
+def _read_index_state(version_file):
+    """État noté lors de la dernière indexation, ou None (absent, ancien format)."""
+    try:
+        with open(version_file) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+def _update_index(ix, conn, titles):
+    """Réindexe les instructions indiquées ; retourne False si l'index ne correspond plus à la base."""
+    writer = ix.writer()
+    for title, objet, resume, pdf_text in database.iter_documents(conn, titles):
+        writer.update_document(key=title, title=title, objet=objet, resume=resume,
+                               content=f"{title} {objet} {resume}", pdf_text=pdf_text)
+    writer.commit()
+    # Une suppression ou un doublon de titre ne se voit pas aux dates : reconstruction
+    return ix.doc_count() == conn.execute("SELECT COUNT(*) FROM instructions").fetchone()[0]
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def create_whoosh_index(version):
+    """Crée ou ouvre l'index Whoosh correspondant à une version des données.
+
+    L'état indexé est noté dans `indexdir`. Si la base a changé depuis, seules
+    les instructions modifiées après le repère noté (fiche ou texte du PDF) sont
+    réindexées ; l'index n'est reconstruit entièrement qu'au premier lancement,
+    après un changement de schéma, ou si le nombre de documents ne correspond
+    plus. Les textes complets sont lus directement depuis la base, ligne à ligne.
+    """
+    from whoosh.analysis import LowercaseFilter, StemmingAnalyzer, StopFilter
+    from whoosh.fields import ID, TEXT, Schema
+    from whoosh.index import LockError, create_in, exists_in, open_dir
+
     analyzer = StemmingAnalyzer() | LowercaseFilter() | StopFilter()
-    schema = Schema(title=TEXT(stored=True, analyzer=analyzer),
+    schema = Schema(key=ID(unique=True),
+                    title=TEXT(stored=True, analyzer=analyzer),
                     objet=TEXT(stored=True, analyzer=analyzer),
                     resume=TEXT(stored=True, analyzer=analyzer),
-                    content=TEXT(analyzer=analyzer))
+                    content=TEXT(analyzer=analyzer),
+                    pdf_text=TEXT(analyzer=analyzer))
     index_dir = "indexdir"
+    version_file = os.path.join(index_dir, INDEX_VERSION_FILE)
 
     try:
-        if not exists_in(index_dir) or len(os.listdir(index_dir)) == 0:
-            ix = create_in(index_dir, schema)
-            with st.spinner("Création index Whoosh..."):
-                writer = ix.writer()
-                for index, row in df.iterrows():
-                    writer.add_document(title=row['title'], objet=row['objet'], resume=row['resume'],
-                                       content=f"{row['title']} {row['objet']} {row['resume']}")
-                writer.commit()
-        else:
-            ix = open_dir(index_dir)
+        state = _read_index_state(version_file)
+        reusable = exists_in(index_dir) and state is not None and state.get("schema") == INDEX_SCHEMA_VERSION
+        if reusable and state.get("version") == version:
+            return open_dir(index_dir)
 
+        with get_db_connection() as conn:
+            # Repère pris avant la lecture : une écriture concurrente sera vue la prochaine fois
+            watermark = database.index_watermark(conn)
+            ix = None
+            if reusable:
+                ix = open_dir(index_dir)
+                changed = database.titles_changed_since(conn, state.get("watermark") or [None, None])
+                with st.spinner(f"Mise à jour index Whoosh ({len(changed)} instructions)..."):
+                    if not _update_index(ix, conn, changed):
+                        ix = None
+
+            if ix is None:
+                # Supprimer l'ancien index avant de le reconstruire
+                for f in os.listdir(index_dir):
+                    os.remove(os.path.join(index_dir, f))
+
+                ix = create_in(index_dir, schema)
+                with st.spinner("Création index Whoosh..."):
+                    writer = ix.writer()
+                    for title, objet, resume, pdf_text in database.iter_documents(conn):
+                        writer.add_document(key=title, title=title, objet=objet, resume=resume,
+                                            content=f"{title} {objet} {resume}", pdf_text=pdf_text)
+                    writer.commit()
+
+        with open(version_file, 'w') as f:
+            json.dump({"schema": INDEX_SCHEMA_VERSION, "version": version, "watermark": watermark}, f)
         return ix
     except LockError as e:
         st.error(f"❌ Erreur verrouillage index Whoosh: {e}")
@@ -462,76 +529,51 @@ def create_whoosh_index(df):
         st.stop()
         return None
 
-def update_whoosh_index(df):
-    """Met à jour l'index Whoosh avec les nouvelles données."""
-    index_dir = "indexdir"
-    if exists_in(index_dir):
-        # Supprimer l'ancien index
-        for f in os.listdir(index_dir):
-            os.remove(os.path.join(index_dir, f))
-
-    # Recréer l'index
-    create_whoosh_index(df)
+# --- Fonction de recherche avancée ---
+@st.cache_data(max_entries=256, show_spinner=False)
+def _search_scores(query, version, _ix):
+    """Retourne les scores {titre: score} d'une requête, mis en cache par version des données."""
+    from whoosh.qparser import MultifieldParser
 
-def get_synonyms(word):
-    """Récupère les synonymes d'un mot."""
+    normalized_search = nlp.normalize_text(query)
     synonyms = set()
-    for syn in wordnet.synsets(word, lang='fra'):
-        for lemma in syn.lemmas(lang='fra'):
-            synonyms.add(lemma.name().lower())
-    return synonyms
-
-def normalize_text(text):
-    """Normalise le texte."""
-    lemmatizer = WordNetLemmatizer()
-    words = word_tokenize(text.lower())
-    normalized_words = [lemmatizer.lemmatize(word) for word in words]
-    return ' '.join(normalized_words)
+    for word in nlp.tokenize(normalized_search):
+        synonyms.update(nlp.get_synonyms(word))
 
-# --- Fonction de recherche avancée ---
-def search_instructions(query, ix, data):
+    # Ajouter les termes de recherche originaux
+    synonyms.add(normalized_search)
+
+    # Créer une requête combinée avec OR, sur les fiches et sur le texte des PDF
+    # (moins pondéré : un terme du titre ou de l'objet reste plus pertinent)
+    query_string = " OR ".join(synonyms)
+
+    with _ix.searcher() as searcher:
+        query_parser = MultifieldParser(["content", "pdf_text"], _ix.schema,
+                                        fieldboosts={"content": 1.0, "pdf_text": PDF_TEXT_BOOST})
+        parsed_query = query_parser.parse(query_string)
+        results = searcher.search(parsed_query, limit=None)
+        return {hit['title']: hit.score for hit in results}
+
+def search_instructions(query, ix, data, version):
     """Effectue une recherche avancée dans l'index Whoosh."""
     if not query or not ix:
         return data
 
-    normalized_search = normalize_text(query)
-    synonyms = set()
-    for word in word_tokenize(normalized_search):
-        synonyms.update(get_synonyms(word))
+    try:
+        scores = _search_scores(query, version, ix)
 
-    # Ajouter les termes de recherche originaux
-    synonyms.add(normalized_search)
+        if scores:
+            # Rattacher les résultats à la liste légère par titre
+            filtered_data = data[data['title'].isin(scores)]
+            filtered_data = filtered_data.assign(score=filtered_data['title'].map(scores))
 
-    # Créer une requête combinée avec OR
-    query_string = " OR ".join([f"content:{syn}" for syn in synonyms])
+            # Trier par score de pertinence
+            if not filtered_data.empty:
+                filtered_data = filtered_data.sort_values(by='score', ascending=False)
 
-    try:
-        with ix.searcher() as searcher:
-            query_parser = QueryParser("content", ix.schema)
-            parsed_query = query_parser.parse(query_string)
-            results = searcher.search(parsed_query, limit=None)
-
-            if len(results) > 0:
-                filtered_data = pd.DataFrame([{
-                    'id': data.loc[data['title'] == hit['title'], 'id'].values[0] if not data.loc[data['title'] == hit['title'], 'id'].empty else None,
-                    'year': data.loc[data['title'] == hit['title'], 'year'].values[0] if not data.loc[data['title'] == hit['title'], 'year'].empty else None,
-                    'week': data.loc[data['title'] == hit['title'], 'week'].values[0] if not data.loc[data['title'] == hit['title'], 'week'].empty else None,
-                    'title': hit['title'],
-                    'link': data.loc[data['title'] == hit['title'], 'link'].values[0] if not data.loc[data['title'] == hit['title'], 'link'].empty else None,
-                    'pdf_link': data.loc[data['title'] == hit['title'], 'pdf_link'].values[0] if not data.loc[data['title'] == hit['title'], 'pdf_link'].empty else None,
-                    'objet': hit['objet'],
-                    'resume': hit['resume'],
-                    'last_updated': data.loc[data['title'] == hit['title'], 'last_updated'].values[0] if not data.loc[data['title'] == hit['title'], 'last_updated'].empty else None,
-                    'score': hit.score,
-                } for hit in results if not data.loc[data['title'] == hit['title']].empty])
-
-                # Trier par score de pertinence
-                if not filtered_data.empty:
-                    filtered_data = filtered_data.sort_values(by='score', ascending=False)
-
-                return filtered_data
-            else:
-                return pd.DataFrame(columns=data.columns)
+            return filtered_data
+        else:
+            return pd.DataFrame(columns=data.columns)
     except Exception as e:
         st.error(f"❌ Erreur lors de la recherche: {e}")
         st.error(traceback.format_exc())
@@ -540,118 +582,110 @@ def search_instructions(query, ix, data):
 # --- Fonction pour mettre à jour les données ---
 def update_database(weeks_limit=10):
     """Met à jour la base de données avec les nouvelles instructions."""
+    import ingest
+    import jobs
+
     db_path = "data/sdssa_instructions.db"
     if not os.path.exists(db_path):
         st.error("❌ Base de données non trouvée! Veuillez d'abord télécharger la base de données.")
         return False
 
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        new_notes_added = False
-
-        try:
-            # Récupérer la date de la dernière mise à jour
-            cursor.execute("SELECT MAX(last_updated) FROM instructions")
-            last_update_str = cursor.fetchone()[0]
-
-            # Définir une date de départ par défaut (3 mois en arrière)
-            default_start_date = datetime.now() - timedelta(days=90)
-
-            if last_update_str:
-                try:
-                    last_update = datetime.strptime(last_update_str, '%Y-%m-%d %H:%M:%S.%f')
-                    # Si la dernière mise à jour date de plus de 3 mois, utiliser 3 mois en arrière
-                    if (datetime.now() - last_update).days > 90:
-                        last_update = default_start_date
-                except ValueError:
-                    last_update = default_start_date
-            else:
-                # Aucune mise à jour antérieure trouvée, utiliser la date par défaut
-                last_update = default_start_date
-
-            # Récupérer l'année et la semaine actuelles
-            current_date = datetime.now()
-            current_year, current_week, _ = current_date.isocalendar()
-
-            # Récupérer l'année et la semaine de la dernière mise à jour
-            start_year, start_week, _ = last_update.isocalendar()
-
-            # Afficher les informations de mise à jour en dehors d'une structure de colonnes
-            st.info(f"📅 Dernière mise à jour: {last_update.strftime('%Y-%m-%d')}")
-            st.info(f"🔍 Année/semaine de départ: {start_year}/{start_week}")
-            st.info(f"📌 Année/semaine actuelle: {current_year}/{current_week}")
-
-            # Générer les semaines à vérifier depuis la dernière mise à jour
-            weeks_to_check = []
-
-            # Si même année
-            if start_year == current_year:
-                for week in range(start_week, current_week + 1):
-                    weeks_to_check.append((start_year, week))
-            else:
-                # Ajouter les semaines restantes de l'année de départ
-                for week in range(start_week, 53):  # ISO peut avoir 53 semaines
-                    weeks_to_check.append((start_year, week))
-
-                # Ajouter les années intermédiaires complètes
-                for year in range(start_year + 1, current_year):
-                    for week in range(1, 53):
-                        weeks_to_check.append((year, week))
-
-                # Ajouter les semaines de l'année en cours
-                for week in range(1, current_week + 1):
-                    weeks_to_check.append((current_year, week))
-
-            # Récupérer les combinaisons année/semaine déjà en base
-            cursor.execute("SELECT DISTINCT year, week FROM instructions")
-            existing_weeks = set((int(row[0]), int(row[1])) for row in cursor.fetchall())
-
-            # Filtrer pour ne garder que les semaines manquantes
-            weeks_to_check = [(year, week) for year, week in weeks_to_check if (year, week) not in existing_weeks]
-
-            st.write(f"🔍 Nombre de semaines manquantes à vérifier: {len(weeks_to_check)}")
-
-            if len(weeks_to_check) > weeks_limit:
-                st.warning(f"⚠️ Attention: {len(weeks_to_check)} semaines à vérifier. Limité à {weeks_limit} semaines les plus récentes.")
-                weeks_to_check = sorted(weeks_to_check, key=lambda x: (x[0], x[1]), reverse=True)[:weeks_limit]
-
-            new_instructions_total = 0
-            progress_bar = st.progress(0)
-
-            for idx, (year_to_check, week_num) in enumerate(sorted(weeks_to_check)):
-                with st.status(f"🔍 Vérification année {year_to_check}, semaine {week_num}..."):
-                    instructions = get_new_instructions(year_to_check, week_num)
-                    if instructions:
-                        st.write(f"📝 Instructions récupérées: {len(instructions)}")
-                        new_instructions_total += len(instructions)
-
-                        for title, link, pdf_link, objet, resume in instructions:
-                            if add_instruction_to_db(year_to_check, week_num, title, link, pdf_link, objet, resume):
-                                new_notes_added = True
-                                st.write(f"✅ Ajouté: {title}")
-
-                # Mettre à jour la barre de progression
-                progress_bar.progress((idx + 1) / len(weeks_to_check))
-
-            if new_notes_added:
-                st.success(f"✅ {new_instructions_total} nouvelles instructions ajoutées !")
+    try:
+        with get_db_connection() as conn:
+            last_update = ingest.start_date(conn)
+        current_year, current_week, _ = datetime.now().isocalendar()
+        start_year, start_week, _ = last_update.isocalendar()
+
+        st.info(f"📅 Dernière mise à jour: {last_update.strftime('%Y-%m-%d')}")
+        st.info(f"🔍 Année/semaine de départ: {start_year}/{start_week}")
+        st.info(f"📌 Année/semaine actuelle: {current_year}/{current_week}")
+
+        progress_bar = st.progress(0)
+
+        def on_progress(done, total, year, week, instructions):
+            """Affiche chaque semaine dès qu'elle est enregistrée (pages en parallèle)."""
+            if instructions is None:
+                st.warning(f"⚠️ Impossible de récupérer année {year} semaine {week}")
+            elif instructions:
+                st.write(f"📝 Année {year}, semaine {week} - instructions récupérées: {len(instructions)}")
+            progress_bar.progress(min(done / total, 1.0) if total else 1.0)
+
+        # File persistante : les semaines déjà traitées ne sont pas reprises, les
+        # semaines récentes sont revérifiées, les semaines vides le sont de plus
+        # en plus rarement et les échecs sont retentés plus tard
+        old_version = get_data_version()
+        with st.status(f"🔍 Vérification de {weeks_limit} semaines au plus, en parallèle..."):
+            stats = ingest.run(db_path, max_weeks=weeks_limit, on_progress=on_progress)
+        # Seules les fiches réellement modifiées (mise à jour ou migration) sortent
+        # du cache des fiches complètes
+        database.details_cache.carry_over(old_version, get_data_version(),
+                                          stats.changed_titles + stats.migrated_titles)
+
+        st.write(f"🔍 Semaines vérifiées: {stats.weeks_checked} (dont {stats.weeks_empty} sans instruction)")
+        with get_db_connection() as conn:
+            remaining = jobs.claimable_count(conn)
+        if remaining:
+            st.warning(f"⚠️ Attention: {remaining} semaines restent en file. Limité à {weeks_limit} semaines, les plus prioritaires d'abord.")
 
-                # Recharger les données et mettre à jour l'index
-                data = load_data()
-                update_whoosh_index(data)
+        if stats.changed_titles:
+            for title in stats.changed_titles:
+                st.write(f"✅ Ajouté: {title}")
+            st.success(f"✅ {stats.inserted} nouvelles instructions ajoutées, {stats.updated} mises à jour !")
 
-                # Forcer le rechargement des données en cache
-                st.cache_data.clear()
+            # La version des données a changé : données, index et statistiques
+            # seront recalculés au prochain rerun, sans vider les autres caches
+            return True
+        else:
+            st.info("📌 Aucune nouvelle instruction trouvée.")
+            return False
 
-                return True
-            else:
-                st.info("📌 Aucune nouvelle instruction trouvée.")
-                return False
+    except Exception as e:
+        st.error(f"❌ Erreur lors de la mise à jour: {e}")
+        st.error(traceback.format_exc())
+        return False
 
-        except Exception as e:
-            st.error(f"❌ Erreur lors de la mise à jour: {e}")
-            st.error(traceback.format_exc())
-            return False
+# --- Miroir local des PDF ---
+def mirror_pdfs():
+    """Copie en local les PDF des instructions qui ne sont pas encore dans le miroir."""
+    import pdf_mirror
+
+    progress_bar = st.progress(0)
+
+    def on_progress(done, total, title, status):
+        if status == "failed":
+            st.warning(f"⚠️ PDF indisponible : {title}")
+        progress_bar.progress(done / total if total else 1.0)
+
+    with st.status("📄 Copie des PDF en local..."):
+        stats = pdf_mirror.mirror_pdfs(on_progress=on_progress)
+    progress_bar.progress(1.0)
+    st.success(f"✅ {stats['mirrored']} PDF copiés, {stats['skipped'] + stats['deduplicated']} déjà présents, "
+               f"{stats['failed']} en échec.")
+
+def enrich_instructions():
+    """Redemande les pages de détail des fiches restées sans objet ou sans résumé."""
+    import enrich
+
+    progress_bar = st.progress(0)
+
+    def on_progress(done, total, title, status):
+        if status != 200:
+            st.warning(f"⚠️ Page indisponible ({status or 'pas de réponse'}) : {title}")
+        progress_bar.progress(done / total if total else 1.0)
+
+    old_version = get_data_version()
+    with st.status("🧩 Complétion des fiches incomplètes..."):
+        stats = enrich.run(on_progress=on_progress)
+    database.details_cache.carry_over(old_version, get_data_version(),
+                                      stats.changed_titles + stats.migrated_titles)
+    progress_bar.progress(1.0)
+    if not stats.selected:
+        st.info("ℹ️ Aucune fiche incomplète à redemander pour l'instant.")
+        return
+    for title in stats.changed_titles:
+        st.write(f"✅ Complété: {title}")
+    st.success(f"✅ {stats.enriched} fiches complétées, {stats.failed} à reprendre plus tard "
+               f"({stats.abandoned} abandonnées).")
 
 # --- Vérification programmée des mises à jour ---
 def check_scheduled_updates():
@@ -673,76 +707,160 @@ def check_scheduled_updates():
     elif update_freq == "Mensuelle" and time_diff.days >= 30:
         update_needed = True
 
-    # Si une mise à jour est nécessaire, essayer de mettre à jour la base de données
+    # Si une mise à jour est nécessaire, essayer de mettre à jour la base de données.
+    # La tentative est notée même en cas d'échec : les reruns suivants ne la refont pas.
     if update_needed:
         st.info(f"🔄 Mise à jour {update_freq.lower()} automatique...")
+        st.session_state.last_auto_update = current_time
         success = download_db_from_github()
         if success:
-            st.session_state.last_auto_update = current_time
             st.success(f"✅ Mise à jour automatique effectuée ({update_freq.lower()})!")
         return success
 
     return False
 
-# --- Formatage des données pour l'affichage ---
-def format_data_for_display(df):
-    """Formate les données pour un meilleur affichage."""
-    if df.empty:
-        return df
+# --- Statistiques ---
+@st.cache_data(max_entries=4, show_spinner=False)
+def compute_statistics(version):
+    """Lit les agrégats de l'onglet Visualisation, une seule fois par version des données.
 
-    # Copier pour éviter de modifier l'original
-    display_df = df.copy()
+    Tout vient de la table `week_counts` (une ligne par semaine publiée), tenue à
+    jour par l'ingestion : la table des instructions n'est pas relue.
+    """
+    with get_db_connection() as conn:
+        cube = aggregates.load_week_counts(conn)
+    summary = aggregates.summary(cube)
+    last_update = summary['last_update']
+
+    return {
+        'total': summary['total'],
+        'min_year': summary['min_year'],
+        'max_year': summary['max_year'],
+        'last_update': last_update.strftime("%d/%m/%Y") if last_update is not None else "Non disponible",
+        'cube': cube,
+        'year_counts': aggregates.year_counts(cube),
+        'week_counts': aggregates.week_counts(cube),
+        'cumulative': aggregates.cumulative_counts(cube),
+        'calendar': aggregates.publication_calendar(cube),
+    }
 
-    # Ajouter des colonnes formatées pour l'affichage
-    display_df['affichage_date'] = display_df.apply(
-        lambda row: f"{row['year']}-S{row['week']:02d}", axis=1
-    )
+def publication_heatmap():
+    """Calendrier des publications : semaines en colonnes, années en lignes."""
+    return {
+        "mark": "rect",
+        "encoding": {
+            "x": {"field": "week", "type": "ordinal", "title": "Semaine"},
+            "y": {"field": "year", "type": "ordinal", "title": "Année", "sort": "descending"},
+            "color": {"field": "count", "type": "quantitative", "title": "Instructions",
+                      "scale": {"scheme": "blues"}},
+            "tooltip": [
+                {"field": "year", "title": "Année"},
+                {"field": "week", "title": "Semaine"},
+                {"field": "count", "title": "Instructions"},
+            ],
+        },
+    }
 
-    # Limiter la taille des champs de texte longs
-    display_df['resume_court'] = display_df['resume'].apply(
-        lambda x: x[:100] + '...' if len(x) > 100 else x
-    )
+# --- Tableaux de résultats ---
+DISPLAY_COLUMN_CONFIG = {
+    "affichage_date": "Date",
+    "title": "Titre",
+    "objet_court": "Objet"
+}
+
+# Tris proposés : libellé -> (clé de tri, ordre décroissant)
+SORT_OPTIONS = {
+    "Date (récentes d'abord)": ("date", True),
+    "Date (anciennes d'abord)": ("date", False),
+    "Titre (A → Z)": ("title", False),
+    "Titre (Z → A)": ("title", True),
+}
+RELEVANCE_SORT = "Pertinence"
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_page(version, year, week, sort, descending, after):
+    """Une page de la liste, lue et triée par SQLite (mise en cache par version des données)."""
+    with get_db_connection() as conn:
+        return database.list_page(conn, year, week, sort, descending, after)
 
-    display_df['objet_court'] = display_df['objet'].apply(
-        lambda x: x[:100] + '...' if len(x) > 100 else x
+@st.cache_data(max_entries=16, show_spinner=False)
+def count_instructions(version, year, week):
+    with get_db_connection() as conn:
+        return database.count_list(conn, year, week)
+
+def get_pager(signature):
+    """État de pagination du tableau, remis à la première page quand la requête change.
+
+    `cursors[n]` est la clé de la dernière ligne avant la page n (pagination par clé).
+    """
+    pager = st.session_state.get('pager')
+    if pager is None or pager['signature'] != signature:
+        pager = {'signature': signature, 'page': 0, 'cursors': [None]}
+        st.session_state.pager = pager
+    return pager
+
+def _move_page(step):
+    st.session_state.pager['page'] += step
+
+def show_pager(pager, total):
+    """Boutons page précédente / suivante sous le tableau."""
+    pages = max(1, -(-total // database.PAGE_SIZE))
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    col_prev.button("◀ Précédente", on_click=_move_page, args=(-1,), disabled=pager['page'] == 0,
+                    use_container_width=True)
+    col_info.markdown(f"<p style='text-align: center'>Page {pager['page'] + 1} / {pages}</p>", unsafe_allow_html=True)
+    col_next.button("Suivante ▶", on_click=_move_page, args=(1,), disabled=pager['page'] + 1 >= pages,
+                    use_container_width=True)
+
+def _select_row(key, titles):
+    """Ouvre la fiche de la ligne cliquée."""
+    rows = st.session_state[key].selection.rows
+    if rows:
+        st.session_state.selected_instruction = titles[rows[0]]
+
+def show_instructions_table(df, key):
+    """Affiche une page d'instructions ; un clic sur une ligne ouvre sa fiche.
+
+    Les colonnes d'affichage sont calculées au chargement de la liste (une fois
+    par version des données) : le tableau se contente de les sélectionner.
+    """
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    st.dataframe(
+        df[database.DISPLAY_COLUMNS],
+        column_config=DISPLAY_COLUMN_CONFIG,
+        use_container_width=True,
+        hide_index=True,
+        key=key,
+        on_select=partial(_select_row, key, df['title'].tolist()),
+        selection_mode="single-row",
     )
+    st.markdown("</div>", unsafe_allow_html=True)
 
-    return display_df
-
-# --- Interface utilisateur principale ---
-
-# --- Titre de l'application ---
-st.markdown("<h1 class='main-header'>📚 Instructions Techniques DGAL / SDSSA</h1>", unsafe_allow_html=True)
-
-# --- Vérifier les mises à jour automatiques ---
-if st.session_state.update_frequency != "Désactivée":
-    check_scheduled_updates()
-
-# --- Initialisation et Chargement des Données ---
-ensure_database_structure()
-
-# Vérifier si la base de données existe, sinon proposer de la télécharger
-if not os.path.exists("data/sdssa_instructions.db"):
-    st.markdown("<div class='warning-message'>⚠️ Aucune base de données trouvée. Veuillez télécharger la base de données pour commencer.</div>", unsafe_allow_html=True)
-
-    if st.button("📥 Télécharger la base de données depuis GitHub"):
-        download_db_from_github(force=True)
-        st.rerun()
-    st.stop()
-
-# Charger les données
-data = load_data()
-if data.empty:
-    st.error("❌ Aucune donnée trouvée dans la base de données.")
-    st.stop()
-
-# Créer ou ouvrir l'index Whoosh
-ix = create_whoosh_index(data)
-
-# --- Interface principale avec onglets ---
-tab1, tab2, tab3, tab4 = st.tabs(["🔍 Recherche", "📊 Visualisation", "⚙️ Mise à jour", "ℹ️ Informations"])
+def _open_found_title():
+    st.session_state.selected_instruction = st.session_state.found_title
 
-with tab1:
+def find_instruction():
+    """Ouvre une fiche par son titre : seuls les titres correspondants sont proposés."""
+    fragment = st.text_input("📄 Ouvrir une instruction par son titre", placeholder="ex: 2024-170")
+    if not fragment:
+        return
+    with get_db_connection() as conn:
+        titles = database.find_titles(conn, fragment.strip())
+    if not titles:
+        st.info("ℹ️ Aucun titre ne correspond.")
+        return
+    st.selectbox("Instructions correspondantes", titles, index=None, key="found_title",
+                 on_change=_open_found_title, placeholder="Choisir une instruction")
+
+# --- Onglets ---
+# Chaque onglet est une fonction appelée seulement quand il est ouvert ; les
+# régions interactives sont des fragments : un clic ou une saisie n'y relance
+# que la région concernée, pas toute l'application.
+@st.fragment
+@timed_region("Onglet Recherche")
+def search_tab(data_version):
+    """Onglet Recherche : filtres, tableau paginé et fiche de l'instruction."""
+    data = load_data(data_version)
     st.markdown("<h2 class='sub-header'>Recherche d'instructions</h2>", unsafe_allow_html=True)
 
     col1, col2 = st.columns([3, 1])
@@ -772,76 +890,56 @@ with tab1:
             else:
                 selected_week = "Toutes"
 
-    # Effectuer la recherche
-    if search_button or search_query or (selected_year != "Toutes"):
+    year = None if selected_year == "Toutes" else int(selected_year)
+    week = None if selected_week == "Toutes" else int(selected_week)
+    # Filtres repris par l'export « Filtres de l'onglet Recherche »
+    st.session_state.filter_year, st.session_state.filter_week = year, week
+    sort_labels = ([RELEVANCE_SORT] if search_query else []) + list(SORT_OPTIONS)
+    sort_label = st.selectbox("Trier par", sort_labels)
+    sort, descending = SORT_OPTIONS.get(sort_label, ("score", True))
+    pager = get_pager((search_query, year, week, sort_label, data_version))
+
+    if search_query:
+        # Recherche textuelle : résultats classés en mémoire, seule la page affichée est envoyée
         with st.spinner("Recherche en cours..."):
-            # Appliquer les filtres par année/semaine
-            filtered_data = data.copy()
-
-            if selected_year != "Toutes":
-                filtered_data = filtered_data[filtered_data['year'] == selected_year]
-
-                if selected_week != "Toutes":
-                    filtered_data = filtered_data[filtered_data['week'] == selected_week]
-
-            # Si recherche textuelle, appliquer la recherche avancée
-            if search_query:
-                search_results = search_instructions(search_query, ix, filtered_data)
-                st.session_state.search_results = search_results
-            else:
-                st.session_state.search_results = filtered_data
-
-    # Afficher les résultats de recherche
-    if 'search_results' in st.session_state and st.session_state.search_results is not None:
-        results = st.session_state.search_results
-
-        if results.empty:
-            st.markdown("<div class='info-box'>Aucun résultat trouvé pour cette recherche.</div>", unsafe_allow_html=True)
-        else:
-            st.markdown(f"<div class='success-message'>📊 {len(results)} instructions trouvées</div>", unsafe_allow_html=True)
-
-            # Formater les données pour l'affichage
-            display_data = format_data_for_display(results)
-
-            # Affichage des résultats sous forme de tableau
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.dataframe(
-                display_data[['affichage_date', 'title', 'objet_court']],
-                column_config={
-                    "affichage_date": "Date",
-                    "title": "Titre",
-                    "objet_court": "Objet"
-                },
-                use_container_width=True,
-                hide_index=True
-            )
-            st.markdown("</div>", unsafe_allow_html=True)
+            filtered_data = data
+            if year is not None:
+                filtered_data = filtered_data[filtered_data['year'] == year]
+                if week is not None:
+                    filtered_data = filtered_data[filtered_data['week'] == week]
+            ix = create_whoosh_index(data_version)
+            results = search_instructions(search_query, ix, filtered_data, data_version)
+            missing = nlp.missing_resources()
+            if missing:
+                st.caption(f"ℹ️ Recherche sans lemmes ni synonymes (ressources NLTK indisponibles : {', '.join(missing)}). "
+                           "Lancez `python scripts/fetch_nltk_data.py`.")
+        total = len(results)
+        page = database.frame_page(results, sort, descending, pager['page'])
     else:
-        # Afficher toutes les données par défaut si aucune recherche n'a été effectuée
-        display_data = format_data_for_display(data)
-        st.markdown("<div class='card'>", unsafe_allow_html=True)
-        st.dataframe(
-            display_data[['affichage_date', 'title', 'objet_court']],
-            column_config={
-                "affichage_date": "Date",
-                "title": "Titre",
-                "objet_court": "Objet"
-            },
-            use_container_width=True,
-            hide_index=True
-        )
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Sélection d'une instruction pour voir les détails
-    if 'search_results' in st.session_state and st.session_state.search_results is not None and not st.session_state.search_results.empty:
-        results = st.session_state.search_results
-        st.markdown("<h3 class='sub-header'>Détails de l'instruction</h3>", unsafe_allow_html=True)
-        selected_title = st.selectbox("Sélectionner une instruction", options=results['title'].tolist())
-
-        if selected_title:
-            st.session_state.selected_instruction = selected_title
-            instruction = results[results['title'] == selected_title].iloc[0]
-
+        # Liste complète ou filtrée : la page est lue et triée par SQLite
+        total = count_instructions(data_version, year, week)
+        page, last = load_page(data_version, year, week, sort, descending, pager['cursors'][pager['page']])
+        del pager['cursors'][pager['page'] + 1:]
+        pager['cursors'].append(last)
+
+    if total == 0:
+        st.markdown("<div class='info-box'>Aucun résultat trouvé pour cette recherche.</div>", unsafe_allow_html=True)
+    else:
+        if search_query or year is not None:
+            st.markdown(f"<div class='success-message'>📊 {total} instructions trouvées</div>", unsafe_allow_html=True)
+        show_instructions_table(page, key=f"table_{hash(pager['signature'])}_{pager['page']}")
+        show_pager(pager, total)
+        st.caption("👆 Cliquer sur une ligne pour afficher la fiche de l'instruction.")
+
+    # Fiche d'une instruction : clic sur une ligne ou recherche par titre
+    st.markdown("<h3 class='sub-header'>Détails de l'instruction</h3>", unsafe_allow_html=True)
+    find_instruction()
+    selected_title = st.session_state.selected_instruction
+    if selected_title:
+        # Le texte complet n'est lu qu'à l'ouverture de la fiche
+        instruction = get_instruction_details(selected_title, data_version)
+
+        if instruction is not None:
             # Affichage détaillé de l'instruction
             st.markdown("<div class='card'>", unsafe_allow_html=True)
 
@@ -853,7 +951,17 @@ with tab1:
 
             with col2:
                 st.markdown(f"<p><a href='{instruction['link']}' target='_blank'>🔗 Voir sur le site</a></p>", unsafe_allow_html=True)
-                st.markdown(f"<p><a href='{instruction['pdf_link']}' target='_blank'>📄 Télécharger le PDF</a></p>", unsafe_allow_html=True)
+                # Copie locale du miroir si disponible : le fichier n'est lu qu'au clic
+                local_pdf = pdf_store.local_pdf(instruction['title'])
+                if local_pdf:
+                    st.download_button(
+                        "📄 Télécharger le PDF",
+                        data=partial(pdf_store.read_pdf, local_pdf),
+                        file_name=f"{instruction['title'].replace('/', '_')}.pdf",
+                        mime="application/pdf",
+                    )
+                else:
+                    st.markdown(f"<p><a href='{instruction['pdf_link']}' target='_blank'>📄 Télécharger le PDF</a></p>", unsafe_allow_html=True)
 
             st.markdown("<hr>", unsafe_allow_html=True)
             st.markdown(f"<p><strong>Objet:</strong> {instruction['objet']}</p>", unsafe_allow_html=True)
@@ -864,59 +972,111 @@ with tab1:
             # Bouton pour télécharger cette instruction
             if st.download_button(
                 "📥 Télécharger cette instruction (CSV)",
-                data=results[results['title'] == selected_title].to_csv(index=False).encode('utf-8'),
+                data=partial(exports.record_csv, instruction),
                 file_name=f"instruction_{instruction['year']}_{instruction['week']}.csv",
                 mime="text/csv"
             ):
                 st.success("✅ Instruction téléchargée!")
 
-with tab2:
+@st.fragment
+@timed_region("Onglet Visualisation")
+def visualization_tab(data_version):
+    """Onglet Visualisation : statistiques lues dans les agrégats par semaine."""
     st.markdown("<h2 class='sub-header'>Visualisation des données</h2>", unsafe_allow_html=True)
 
     # Statistiques générales
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns(3)
 
+    stats = compute_statistics(data_version)
+
     with col1:
-        st.metric("Total Instructions", len(data))
+        st.metric("Total Instructions", stats['total'])
 
     with col2:
-        st.metric("Années couvertes", f"{min(data['year'])} - {max(data['year'])}")
+        st.metric("Années couvertes", f"{stats['min_year']} - {stats['max_year']}")
 
     with col3:
-        # Correction de l'erreur à la ligne 851
-        if 'last_updated' in data.columns and not data['last_updated'].isna().all():
-            try:
-                last_update = max(pd.to_datetime(data['last_updated'], errors='coerce').dropna())
-                last_update_str = last_update.strftime("%d/%m/%Y")
-            except (ValueError, TypeError):
-                last_update_str = "Non disponible"
-        else:
-            last_update_str = "Non disponible"
-
-        st.metric("Dernière mise à jour", last_update_str)
+        st.metric("Dernière mise à jour", stats['last_update'])
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-    # Graphique par année
+    # Répartition par année, avec exploration d'une année semaine par semaine
     st.markdown("<h3 class='sub-header'>Répartition par année</h3>", unsafe_allow_html=True)
 
-    year_counts = data.groupby('year').size().reset_index(name='count')
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    drill_years = sorted(stats['year_counts']['year'].tolist(), reverse=True)
+    drill_year = st.selectbox("Détailler une année", ["Toutes"] + drill_years)
+    if drill_year == "Toutes":
+        st.bar_chart(stats['year_counts'], x='year', y='count')
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.caption(f"Par semaine ({drill_year})")
+            st.bar_chart(aggregates.week_counts(stats['cube'], drill_year), x='week', y='count')
+        with col2:
+            st.caption(f"Par mois ({drill_year})")
+            st.bar_chart(aggregates.month_counts(stats['cube'], drill_year), x='month', y='count')
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Nombre cumulé d'instructions
+    st.markdown("<h3 class='sub-header'>Évolution du nombre d'instructions</h3>", unsafe_allow_html=True)
 
     st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.bar_chart(year_counts, x='year', y='count')
+    st.area_chart(stats['cumulative'], x='date', y='total')
     st.markdown("</div>", unsafe_allow_html=True)
 
-    # Répartition par mois
+    # Répartition par semaine, toutes années confondues
     st.markdown("<h3 class='sub-header'>Répartition par semaine</h3>", unsafe_allow_html=True)
 
-    week_counts = data.groupby('week').size().reset_index(name='count')
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    st.line_chart(stats['week_counts'], x='week', y='count')
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Calendrier des publications
+    st.markdown("<h3 class='sub-header'>Calendrier des publications</h3>", unsafe_allow_html=True)
 
     st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.line_chart(week_counts, x='week', y='count')
+    st.vega_lite_chart(stats['calendar'], publication_heatmap(), use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-with tab3:
+@st.fragment
+@timed_region("Export")
+def export_section(data_version):
+    """Export des données : format et périmètre ne relancent que cette région."""
+    st.markdown("<div class='card'>", unsafe_allow_html=True)
+    st.markdown("<h3>Exporter les données</h3>", unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        export_format = st.selectbox("Format", exports.available_formats(),
+                                     format_func=lambda fmt: exports.FORMATS[fmt][0])
+
+    with col2:
+        export_scope = st.radio("Instructions à exporter", list(EXPORT_SCOPES))
+
+    # Le fichier n'est produit qu'au clic, lot par lot, puis gardé pour cette version des données
+    export_filters = export_filters_for(export_scope, st.session_state.filter_year, st.session_state.filter_week)
+    export_rows = count_export_rows(data_version, tuple(sorted(export_filters.items())))
+    label, extension, mime, _ = exports.FORMATS[export_format]
+    st.download_button(
+        f"📥 Télécharger {export_rows} instructions ({label})",
+        data=partial(exports.read_export, export_format, data_version, **export_filters),
+        file_name=f"sdssa_instructions_{EXPORT_SCOPES[export_scope]}.{extension}",
+        mime=mime,
+        disabled=export_rows == 0,
+        use_container_width=True
+    )
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+@timed_region("Onglet Mise à jour")
+def maintenance_tab(data_version):
+    """Onglet Mise à jour : synchronisation, collecte, export et sauvegardes.
+
+    Pas de fragment ici : une mise à jour change les données de tous les onglets.
+    """
     st.markdown("<h2 class='sub-header'>Mise à jour des données</h2>", unsafe_allow_html=True)
 
     col1, col2 = st.columns(2)
@@ -959,97 +1119,64 @@ with tab3:
             if st.button("🔎 Rechercher nouvelles instructions", use_container_width=True):
                 update_database(weeks_limit=20)
 
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Exporter les données
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<h3>Exporter les données</h3>", unsafe_allow_html=True)
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        if st.download_button(
-            "📥 Télécharger toutes les données (CSV)",
-            data=data.to_csv(index=False).encode('utf-8'),
-            file_name="sdssa_instructions_complete.csv",
-            mime="text/csv",
-            use_container_width=True
-        ):
-            st.success("✅ Données téléchargées!")
+        if st.button("📄 Copier les PDF en local", use_container_width=True):
+            mirror_pdfs()
 
-    with col2:
-        # Exporter uniquement les instructions récentes
-        recent_date = datetime.now() - timedelta(days=90)
-        recent_data = data[pd.to_datetime(data['last_updated']) > recent_date]
+        if st.button("🧩 Compléter les fiches incomplètes", use_container_width=True):
+            enrich_instructions()
 
-        if not recent_data.empty:
-            if st.download_button(
-                f"📥 Instructions récentes ({len(recent_data)})",
-                data=recent_data.to_csv(index=False).encode('utf-8'),
-                file_name="sdssa_instructions_recent.csv",
-                mime="text/csv",
-                use_container_width=True
-            ):
-                st.success("✅ Données récentes téléchargées!")
+        st.markdown("</div>", unsafe_allow_html=True)
 
-    st.markdown("</div>", unsafe_allow_html=True)
+    # Exporter les données
+    export_section(data_version)
 
     # Gestion des sauvegardes
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.markdown("<h3>Gestion des sauvegardes</h3>", unsafe_allow_html=True)
 
-    backups = sorted(glob.glob("backups/sdssa_instructions_*.db"), reverse=True)
+    backup_entries = backups.list_backups()
 
-    if backups:
-        st.write(f"📁 {len(backups)} sauvegardes disponibles:")
+    if backup_entries:
+        st.write(f"📁 {len(backup_entries)} sauvegardes disponibles:")
 
-        for backup in backups:
-            backup_name = os.path.basename(backup)
-            backup_date = backup_name.replace("sdssa_instructions_", "").replace(".db", "")
-
-            try:
-                formatted_date = datetime.strptime(backup_date, "%Y%m%d_%H%M%S").strftime("%d/%m/%Y à %H:%M:%S")
-            except:
-                formatted_date = backup_date
+        for entry in backup_entries:
+            backup_id = entry['sha256']
+            formatted_date = datetime.fromisoformat(entry['created_at']).strftime("%d/%m/%Y à %H:%M:%S")
+            size_kb = entry['compressed_size'] / 1024
 
             col1, col2 = st.columns([3, 1])
 
             with col1:
-                st.write(f"📂 Sauvegarde du {formatted_date}")
+                st.write(f"📂 Sauvegarde du {formatted_date} ({size_kb:.1f} Ko compressés)")
 
             with col2:
-                if st.button(f"🔄 Restaurer", key=f"restore_{backup_name}"):
+                if st.button(f"🔄 Restaurer", key=f"restore_{backup_id}"):
                     try:
-                        # Sauvegarder la base actuelle avant restauration
-                        if os.path.exists("data/sdssa_instructions.db"):
-                            current_backup = f"backups/pre_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                            shutil.copy2("data/sdssa_instructions.db", current_backup)
-            
-                        # Restaurer la sauvegarde
-                        shutil.copy2(backup, "data/sdssa_instructions.db")
+                        # La base actuelle est sauvegardée avant restauration
+                        backups.restore_backup(backup_id)
                         st.success(f"✅ Base de données restaurée depuis la sauvegarde du {formatted_date}")
-            
-                        # Recharger les données
-                        st.cache_data.clear()
+
+                        # Recharger les données (la nouvelle version invalide les caches)
                         st.rerun()
                     except Exception as e:
                         st.error(f"❌ Erreur lors de la restauration: {e}")
-            
-                # Ajouter un bouton de téléchargement à côté du bouton de restauration
-                if st.download_button(
+
+                # Le fichier n'est lu qu'au clic (appel différé), sans relancer la page
+                st.download_button(
                     "📥 Télécharger",
-                    data=open(backup, 'rb').read(),
-                    file_name=f"sdssa_instructions_{backup_date}.db",
-                    mime="application/octet-stream",
-                    key=f"download_{backup_name}"
-                ):
-                    st.success(f"✅ Sauvegarde du {formatted_date} téléchargée!")
-                else:
-                    st.info("📌 Aucune sauvegarde disponible")
+                    data=partial(backups.read_backup, backup_id),
+                    file_name=f"sdssa_instructions_{entry['created_at'].replace(':', '')}.db.gz",
+                    mime="application/gzip",
+                    key=f"download_{backup_id}",
+                    on_click="ignore"
+                )
+    else:
+        st.info("📌 Aucune sauvegarde disponible")
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-with tab4:
+def about_tab():
+    """Onglet Informations."""
     st.markdown("<h2 class='sub-header'>À propos de l'application</h2>", unsafe_allow_html=True)
 
     st.markdown("<div class='card'>", unsafe_allow_html=True)
@@ -1121,6 +1248,59 @@ with tab4:
     """, unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Temps d'exécution des dernières exécutions (application et régions)
+    show_timings()
+
+# --- Interface utilisateur principale ---
+
+# --- Titre de l'application ---
+st.markdown("<h1 class='main-header'>📚 Instructions Techniques DGAL / SDSSA</h1>", unsafe_allow_html=True)
+
+# --- Vérifier les mises à jour automatiques ---
+if st.session_state.update_frequency != "Désactivée":
+    check_scheduled_updates()
+
+# --- Initialisation et Chargement des Données ---
+# Vérifier si la base de données existe, sinon proposer de la télécharger
+if not os.path.exists(database.DB_PATH):
+    st.markdown("<div class='warning-message'>⚠️ Aucune base de données trouvée. Veuillez télécharger la base de données pour commencer.</div>", unsafe_allow_html=True)
+
+    if st.button("📥 Télécharger la base de données depuis GitHub"):
+        download_db_from_github(force=True)
+        st.rerun()
+    st.stop()
+
+# Structure de la base : une fois par processus et par fichier
+initialize_database(os.stat(database.DB_PATH).st_ino)
+
+# Version des données : clé de tous les caches (liste, index, statistiques, recherche)
+data_version = get_data_version()
+
+if count_instructions(data_version, None, None) == 0:
+    st.error("❌ Aucune donnée trouvée dans la base de données.")
+    st.stop()
+
+# --- Interface principale avec onglets ---
+# Onglets paresseux : seul l'onglet ouvert est calculé
+tab1, tab2, tab3, tab4 = st.tabs(["🔍 Recherche", "📊 Visualisation", "⚙️ Mise à jour", "ℹ️ Informations"],
+                                 key="active_tab", on_change="rerun")
+
+with tab1:
+    if tab1.open:
+        search_tab(data_version)
+
+with tab2:
+    if tab2.open:
+        visualization_tab(data_version)
+
+with tab3:
+    if tab3.open:
+        maintenance_tab(data_version)
+
+with tab4:
+    if tab4.open:
+        about_tab()
+
 # --- Pied de page ---
 st.markdown("<div class='footer'>", unsafe_allow_html=True)
 st.markdown("""
@@ -1138,6 +1318,9 @@ st.markdown("""
 """, unsafe_allow_html=True)
 st.markdown("</div>", unsafe_allow_html=True)
 
+# Durée du rerun complet (les fragments relancés seuls sont mesurés à part)
+record_timing("Application (rerun complet)", time.perf_counter() - app_started)
+
 # --- Point d'entrée principal ---
 if __name__ == "__main__":
     # Vérifier si c'est la première exécution
@@ -0,0 +1,190 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from threading import Lock
+
+from database import DB_PATH, integrity_error
+
+# --- Configuration ---
+BACKUP_DIR = "backups"
+OBJECTS_DIR = os.path.join(BACKUP_DIR, "objects")
+INDEX_PATH = os.path.join(BACKUP_DIR, "index.json")
+
+# Nombre de sauvegardes distinctes conservées
+KEEP_BACKUPS = 5
+
+CHUNK_SIZE = 64 * 1024
+
+# Anciennes sauvegardes (copies brutes nommées par date)
+LEGACY_PATTERN = os.path.join(BACKUP_DIR, "*.db")
+
+_lock = Lock()
+
+
+class BackupError(Exception):
+    """Sauvegarde introuvable ou invalide."""
+
+
+# --- Index des sauvegardes ---
+def load_index():
+    """Lit l'index des sauvegardes (métadonnées uniquement)."""
+    try:
+        with open(INDEX_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"snapshots": []}
+
+
+def _save_index(index):
+    tmp_path = f"{INDEX_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def object_path(sha256):
+    """Chemin de l'objet compressé correspondant à une empreinte."""
+    return os.path.join(OBJECTS_DIR, f"{sha256}.db.gz")
+
+
+def list_backups():
+    """Retourne les sauvegardes, de la plus récente à la plus ancienne, sans lire les fichiers."""
+    snapshots = load_index()["snapshots"]
+    return sorted(snapshots, key=lambda entry: entry["created_at"], reverse=True)
+
+
+# --- Création ---
+def _snapshot_to_temp(db_path):
+    """Copie cohérente de la base via l'API de sauvegarde en ligne de SQLite."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".backup_", suffix=".db", dir=BACKUP_DIR)
+    os.close(fd)
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return tmp_path
+
+
+def _store_object(tmp_path):
+    """Compresse un fichier dans le magasin d'objets, s'il n'y est pas déjà."""
+    digest = hashlib.sha256()
+    with open(tmp_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    path = object_path(sha256)
+    if not os.path.exists(path):
+        part_path = f"{path}.part"
+        with open(tmp_path, 'rb') as source, gzip.open(part_path, 'wb') as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        os.replace(part_path, path)
+    return sha256, os.path.getsize(tmp_path), os.path.getsize(path)
+
+
+def create_backup(db_path=DB_PATH, label="auto", created_at=None):
+    """Sauvegarde la base dans le magasin adressé par contenu.
+
+    Une sauvegarde identique à une sauvegarde existante n'est pas stockée une
+    seconde fois : seule sa date est rafraîchie. Retourne l'entrée d'index.
+    """
+    os.makedirs(OBJECTS_DIR, exist_ok=True)
+    created_at = created_at or datetime.now().isoformat(timespec='seconds')
+
+    with _lock:
+        tmp_path = _snapshot_to_temp(db_path)
+        try:
+            sha256, size, compressed_size = _store_object(tmp_path)
+        finally:
+            os.remove(tmp_path)
+
+        index = load_index()
+        entry = next((e for e in index["snapshots"] if e["sha256"] == sha256), None)
+        if entry is None:
+            entry = {"sha256": sha256, "size": size, "compressed_size": compressed_size}
+            index["snapshots"].append(entry)
+        entry.update({"created_at": created_at, "label": label})
+
+        _prune(index)
+        _save_index(index)
+    return entry
+
+
+def _prune(index):
+    """Garde les KEEP_BACKUPS sauvegardes les plus récentes et supprime les objets orphelins."""
+    snapshots = sorted(index["snapshots"], key=lambda entry: entry["created_at"], reverse=True)
+    index["snapshots"] = snapshots[:KEEP_BACKUPS]
+    for entry in snapshots[KEEP_BACKUPS:]:
+        try:
+            os.remove(object_path(entry["sha256"]))
+        except FileNotFoundError:
+            pass
+
+
+def import_legacy_backups():
+    """Intègre au magasin les anciennes copies `backups/*.db`, puis les supprime."""
+    for legacy_path in sorted(glob.glob(LEGACY_PATTERN)):
+        name = os.path.basename(legacy_path)
+        stamp = "_".join(os.path.splitext(name)[0].rsplit("_", 2)[-2:])
+        try:
+            created_at = datetime.strptime(stamp, "%Y%m%d_%H%M%S").isoformat(timespec='seconds')
+        except ValueError:
+            created_at = datetime.fromtimestamp(os.path.getmtime(legacy_path)).isoformat(timespec='seconds')
+        label = "pre_restore" if name.startswith("pre_restore") else "auto"
+        create_backup(legacy_path, label=label, created_at=created_at)
+        os.remove(legacy_path)
+
+
+# --- Lecture et restauration ---
+def read_backup(sha256):
+    """Retourne le contenu compressé (gzip) d'une sauvegarde.
+
+    Passée en appel différé à `st.download_button`, la lecture n'a lieu qu'au
+    clic, jamais à l'affichage de la liste des sauvegardes.
+    """
+    path = object_path(sha256)
+    if not os.path.exists(path):
+        raise BackupError(f"Sauvegarde introuvable: {sha256[:12]}")
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def restore_backup(sha256, db_path=DB_PATH):
+    """Restaure une sauvegarde après avoir sauvegardé la base actuelle.
+
+    Le fichier est décompressé par blocs dans un fichier temporaire, vérifié puis
+    installé atomiquement.
+    """
+    path = object_path(sha256)
+    if not os.path.exists(path):
+        raise BackupError(f"Sauvegarde introuvable: {sha256[:12]}")
+
+    directory = os.path.dirname(os.path.abspath(db_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".restore_", suffix=".db", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as target, gzip.open(path, 'rb') as source:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+        error = integrity_error(tmp_path)
+        if error is not None:
+            raise BackupError(f"Sauvegarde corrompue: {error}")
+
+        # Sauvegarder la base actuelle une fois la restauration prête (la
+        # rétention peut alors supprimer l'objet restauré sans conséquence)
+        if os.path.exists(db_path):
+            create_backup(db_path, label="pre_restore")
+
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
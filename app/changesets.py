@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+
+import database
+
+# --- Configuration ---
+CHANGESET_DIR = "data/changesets"
+MANIFEST_NAME = "manifest.json"
+
+# Nombre de changesets conservés dans le manifeste (environ deux ans de mises à jour hebdomadaires)
+KEEP_CHANGESETS = 104
+
+# Au-delà de ce retard, un client télécharge la base complète plutôt que les changesets
+MAX_CHANGESETS_BEHIND = 20
+
+CHANGESET_FIELDS = ("year", "week", "title", "link", "pdf_link", "objet", "resume", "last_updated")
+
+# Texte des PDF : flux voisin du changeset (`pdf_file` dans le manifeste), que
+# les clients antérieurs ignorent. Les textes sont écrits une fois par contenu.
+PDF_DOCUMENT_FIELDS = ("title", "pdf_link", "sha256", "size", "changed_at")
+
+# Opérations de chaque flux et champ obligatoire de chacune
+INSTRUCTION_OPS = {"upsert": "title"}
+PDF_OPS = {"pdf_text": "sha256", "pdf_document": "title"}
+
+
+class ChangesetError(Exception):
+    """Changeset illisible ou ne correspondant pas au manifeste."""
+
+
+# --- Version des données stockée dans la base ---
+def ensure_meta_table(conn):
+    """Crée la table des métadonnées de synchronisation."""
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def get_version(conn):
+    """Retourne la version de changeset de la base, ou None si elle est inconnue."""
+    try:
+        row = conn.execute("SELECT value FROM sync_meta WHERE key = 'changeset_version'").fetchone()
+    except sqlite3.OperationalError:
+        # Base antérieure aux changesets : pas de table sync_meta
+        return None
+    return int(row[0]) if row else None
+
+
+def set_version(conn, version):
+    """Enregistre la version de changeset de la base (sans valider la transaction)."""
+    ensure_meta_table(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('changeset_version', ?)",
+        (str(version),),
+    )
+
+
+# --- Manifeste ---
+def changeset_name(version):
+    """Nom du fichier NDJSON d'une version."""
+    return f"changeset_{version:06d}.ndjson"
+
+
+def pdf_changeset_name(version):
+    """Nom du fichier NDJSON du texte des PDF d'une version."""
+    return f"changeset_{version:06d}.pdf.ndjson"
+
+
+def load_manifest(directory=CHANGESET_DIR):
+    """Lit le manifeste local, ou un manifeste vide."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"latest_version": 0, "changesets": []}
+
+
+def save_manifest(manifest, directory=CHANGESET_DIR):
+    """Écrit le manifeste de façon atomique."""
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# --- Production (script de mise à jour) ---
+def _has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def _pdf_lines(conn, titles):
+    """Lignes NDJSON du texte des PDF des instructions données (textes puis documents)."""
+    documents = [row for title in titles for row in conn.execute(
+        f"SELECT {', '.join(PDF_DOCUMENT_FIELDS)} FROM pdf_documents WHERE title = ?", (title,))]
+    lines = []
+    for sha256 in sorted({row[2] for row in documents if row[2]}):
+        row = conn.execute("SELECT text, pages, extracted_at FROM pdf_texts WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is not None:
+            text = zlib.decompress(row[0]).decode('utf-8')
+            lines.append(json.dumps({"op": "pdf_text", "sha256": sha256, "text": text,
+                                     "pages": row[1], "extracted_at": row[2]}, ensure_ascii=False))
+    lines.extend(json.dumps({"op": "pdf_document", **dict(zip(PDF_DOCUMENT_FIELDS, row))}, ensure_ascii=False)
+                 for row in documents)
+    return lines
+
+
+def _write_file(directory, name, lines):
+    """Écrit un fichier NDJSON ; retourne son entrée de manifeste (nom, lignes, empreinte)."""
+    payload = ("\n".join(lines) + "\n").encode('utf-8')
+    with open(os.path.join(directory, name), 'wb') as f:
+        f.write(payload)
+    return name, len(lines), hashlib.sha256(payload).hexdigest()
+
+
+def write_changeset(conn, titles, directory=CHANGESET_DIR, pdf_titles=()):
+    """Publie un changeset NDJSON contenant l'état actuel des instructions données.
+
+    Le texte des PDF des instructions `pdf_titles` est publié dans un fichier
+    voisin. La version de la base est incrémentée, les fichiers sont ajoutés au
+    manifeste et les changesets les plus anciens sont retirés. Retourne la
+    nouvelle version, ou None s'il n'y a rien à publier.
+    """
+    titles = sorted(set(titles))
+    pdf_titles = sorted(set(pdf_titles))
+    if not titles and not pdf_titles:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    version = max(manifest.get("latest_version", 0), get_version(conn) or 0) + 1
+
+    lines = []
+    for title in titles:
+        row = conn.execute(
+            f"SELECT {', '.join(CHANGESET_FIELDS)} FROM instructions WHERE title = ?", (title,)
+        ).fetchone()
+        if row is None:
+            continue
+        record = {"op": "upsert", **dict(zip(CHANGESET_FIELDS, row))}
+        lines.append(json.dumps(record, ensure_ascii=False))
+
+    name, count, sha256 = _write_file(directory, changeset_name(version), lines)
+    entry = {"version": version, "file": name, "count": count, "sha256": sha256}
+    pdf_lines = _pdf_lines(conn, pdf_titles) if pdf_titles and _has_table(conn, "pdf_documents") else []
+    if pdf_lines:
+        pdf_name, pdf_count, pdf_sha256 = _write_file(directory, pdf_changeset_name(version), pdf_lines)
+        entry.update({"pdf_file": pdf_name, "pdf_count": pdf_count, "pdf_sha256": pdf_sha256})
+
+    manifest["latest_version"] = version
+    manifest["changesets"] = manifest.get("changesets", []) + [entry]
+
+    # Rétention : retirer les changesets trop anciens
+    expired = manifest["changesets"][:-KEEP_CHANGESETS]
+    manifest["changesets"] = manifest["changesets"][-KEEP_CHANGESETS:]
+    for expired_entry in expired:
+        for expired_name in filter(None, (expired_entry["file"], expired_entry.get("pdf_file"))):
+            try:
+                os.remove(os.path.join(directory, expired_name))
+            except FileNotFoundError:
+                pass
+
+    set_version(conn, version)
+    conn.commit()
+    save_manifest(manifest, directory)
+    return version
+
+
+# --- Consommation (application) ---
+def plan_changesets(manifest, local_version, max_behind=MAX_CHANGESETS_BEHIND):
+    """Retourne la liste ordonnée des changesets à appliquer.
+
+    Retourne None si la base doit être remplacée par la version complète : version
+    locale inconnue, retard trop important ou changesets nécessaires déjà purgés.
+    """
+    latest = manifest.get("latest_version", 0)
+    if local_version is None or local_version > latest:
+        return None
+    if latest == local_version:
+        return []
+
+    pending = sorted(
+        (entry for entry in manifest.get("changesets", []) if entry["version"] > local_version),
+        key=lambda entry: entry["version"],
+    )
+    versions = [entry["version"] for entry in pending]
+    if len(pending) > max_behind or versions != list(range(local_version + 1, latest + 1)):
+        return None
+    return pending
+
+
+def parse_changeset(payload, expected_sha256=None, ops=INSTRUCTION_OPS):
+    """Décode un changeset NDJSON après vérification de son empreinte.
+
+    `ops` donne les opérations admises et le champ obligatoire de chacune
+    (`PDF_OPS` pour le flux du texte des PDF).
+    """
+    if expected_sha256 and hashlib.sha256(payload).hexdigest() != expected_sha256:
+        raise ChangesetError("Empreinte du changeset invalide")
+
+    records = []
+    for line_number, line in enumerate(payload.decode('utf-8').splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ChangesetError(f"Ligne {line_number} invalide: {e}") from e
+        key = ops.get(record.get("op"))
+        if key is None or not record.get(key):
+            raise ChangesetError(f"Ligne {line_number}: opération non prise en charge")
+        records.append(record)
+    return records
+
+
+def _apply_pdf_records(conn, records):
+    """Applique les lignes du flux du texte des PDF (transaction laissée ouverte)."""
+    columns = ", ".join(PDF_DOCUMENT_FIELDS)
+    placeholders = ", ".join("?" for _ in PDF_DOCUMENT_FIELDS)
+    updates = ", ".join(f"{field} = excluded.{field}" for field in PDF_DOCUMENT_FIELDS if field != "title")
+    for record in records:
+        if record["op"] == "pdf_text":
+            conn.execute(
+                "INSERT OR REPLACE INTO pdf_texts (sha256, text, pages, extracted_at) VALUES (?, ?, ?, ?)",
+                (record["sha256"], zlib.compress((record.get("text") or "").encode('utf-8')),
+                 record.get("pages"), record.get("extracted_at")),
+            )
+            continue
+        conn.execute(f"INSERT INTO pdf_documents ({columns}) VALUES ({placeholders}) "
+                     f"ON CONFLICT(title) DO UPDATE SET {updates}",
+                     [record.get(field) for field in PDF_DOCUMENT_FIELDS])
+
+
+def apply_changeset(conn, records, version, pdf_records=()):
+    """Applique les lignes d'un changeset, le texte de ses PDF et la nouvelle version
+    dans une seule transaction."""
+    if pdf_records:
+        database.ensure_pdf_tables(conn)
+    assignments = ", ".join(f"{field} = ?" for field in CHANGESET_FIELDS if field != "title")
+    placeholders = ", ".join("?" for _ in CHANGESET_FIELDS)
+    # Empreinte de contenu périmée : effacée, elle est recalculée à la prochaine comparaison
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(instructions)")}
+    if "content_hash" in columns:
+        assignments += ", content_hash = NULL"
+    with conn:
+        for record in records:
+            values = [record.get(field) for field in CHANGESET_FIELDS if field != "title"]
+            cursor = conn.execute(
+                f"UPDATE instructions SET {assignments} WHERE title = ?",
+                values + [record["title"]],
+            )
+            if cursor.rowcount == 0:
+                conn.execute(
+                    f"INSERT INTO instructions ({', '.join(CHANGESET_FIELDS)}) VALUES ({placeholders})",
+                    [record.get(field) for field in CHANGESET_FIELDS],
+                )
+        _apply_pdf_records(conn, pdf_records)
+        set_version(conn, version)
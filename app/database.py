@@ -0,0 +1,428 @@
+import hashlib
+import os
+import sqlite3
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+import pandas as pd
+
+# --- Configuration ---
+DB_PATH = "data/sdssa_instructions.db"
+
+# Longueur des extraits affichés dans les tableaux
+SHORT_TEXT_LENGTH = 100
+
+# Lignes par page des tableaux de résultats
+PAGE_SIZE = 50
+
+# Nombre de fiches complètes gardées en mémoire
+DETAILS_CACHE_SIZE = 128
+
+# Colonnes légères utilisées par les tableaux et les filtres : les textes longs
+# (objet, resume) ne sont pas chargés, seul un extrait de l'objet est calculé par SQLite.
+LIST_QUERY = f"""
+    SELECT rowid AS id, year, week, title, link, pdf_link,
+           CASE WHEN length(objet) > {SHORT_TEXT_LENGTH}
+                THEN substr(objet, 1, {SHORT_TEXT_LENGTH}) || '...'
+                ELSE objet
+           END AS objet_court,
+           last_updated
+    FROM instructions
+"""
+
+FULL_COLUMNS = "year, week, title, link, pdf_link, objet, resume, last_updated"
+
+# Colonnes des tableaux de résultats (calculées au chargement de la liste)
+DISPLAY_COLUMNS = ["affichage_date", "title", "objet_court"]
+
+
+def connect(db_path=DB_PATH):
+    """Ouvre une connexion SQLite sur la base des instructions."""
+    return sqlite3.connect(db_path)
+
+
+# --- Jeton de version des données ---
+# Connexion de surveillance gardée ouverte par fichier : `PRAGMA data_version` n'a de
+# sens que comparé sur une même connexion, il change dès qu'une autre connexion écrit.
+_watchers = {}
+_watchers_lock = Lock()
+
+# Octets de l'en-tête SQLite : compteur de modifications (24-27), cookie de
+# schéma (40-43) et numéro de version associé au compteur (92-95).
+_HEADER_FIELDS = ((24, 28), (40, 44), (92, 96))
+
+
+def _header_fingerprint(db_path):
+    """Empreinte du contenu lue dans l'en-tête du fichier (100 octets, coût constant)."""
+    with open(db_path, 'rb') as f:
+        header = f.read(100)
+    return b"".join(header[start:end] for start, end in _HEADER_FIELDS).hex()
+
+
+def _pragma_data_version(db_path, inode):
+    """Lit `PRAGMA data_version` sur la connexion de surveillance du fichier."""
+    with _watchers_lock:
+        watcher = _watchers.get(db_path)
+        # Fichier remplacé (nouvel inode) : l'ancienne connexion pointe sur l'ancien fichier
+        if watcher is None or watcher[0] != inode:
+            if watcher is not None:
+                watcher[1].close()
+            watcher = (inode, sqlite3.connect(db_path, check_same_thread=False))
+            _watchers[db_path] = watcher
+        return watcher[1].execute("PRAGMA data_version").fetchone()[0]
+
+
+def data_version(db_path=DB_PATH):
+    """Retourne un jeton court identifiant l'état actuel de la base.
+
+    Le jeton combine l'inode, la date de modification et la taille du fichier,
+    `PRAGMA data_version` et une empreinte de l'en-tête SQLite. Son calcul ne dépend
+    pas du volume de données ; il sert de clé à tous les caches dérivés.
+    Retourne None si la base n'existe pas.
+    """
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+
+    pragma_version = _pragma_data_version(db_path, stat.st_ino)
+    fingerprint = _header_fingerprint(db_path)
+    raw = f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}:{pragma_version}:{fingerprint}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def integrity_error(path):
+    """Vérifie un fichier SQLite avec `PRAGMA integrity_check`.
+
+    Retourne None si la base est saine, sinon le message d'erreur.
+    """
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return str(e)
+
+    if not result:
+        return "aucun résultat"
+    return None if result[0] == "ok" else result[0]
+
+
+def ensure_indexes(conn):
+    """Crée les index nécessaires aux recherches par clé."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_instructions_title ON instructions(title)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_instructions_year_week ON instructions(year, week)")
+    # Pagination par clé sur (année, semaine, titre) : parcours de l'index, sans tri
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_instructions_year_week_title ON instructions(year, week, title)")
+    conn.commit()
+
+
+# --- Niveau 1 : liste légère ---
+def add_display_columns(df):
+    """Ajoute les colonnes d'affichage par opérations vectorisées, sur place.
+
+    - affichage_date : `2024-S07` ;
+    - objet_court : extrait de l'objet, vide si l'objet est absent.
+    """
+    df['affichage_date'] = (df['year'].astype('Int64').astype(str) + "-S"
+                            + df['week'].astype('Int64').astype(str).str.zfill(2))
+    df['objet_court'] = df['objet_court'].fillna("")
+    return df
+
+
+def load_list_frame(conn):
+    """Charge la liste légère des instructions (sans objet ni résumé complets).
+
+    Les colonnes d'affichage sont calculées ici, une fois par chargement : les
+    tableaux n'ont plus qu'à sélectionner `DISPLAY_COLUMNS`.
+    """
+    return add_display_columns(pd.read_sql_query(LIST_QUERY, conn))
+
+
+# --- Pages de la liste ---
+# Tris proposés : colonnes de la clé de pagination, la dernière départage les ex aequo
+SORT_KEYS = {
+    "date": ("year", "week", "title", "rowid"),
+    "title": ("title", "rowid"),
+}
+
+
+def _list_filter(year=None, week=None):
+    clauses, params = [], []
+    if year is not None:
+        clauses.append("year = ?")
+        params.append(int(year))
+    if week is not None:
+        clauses.append("week = ?")
+        params.append(int(week))
+    return clauses, params
+
+
+def count_list(conn, year=None, week=None):
+    """Nombre d'instructions de la liste, filtrée par année et semaine."""
+    clauses, params = _list_filter(year, week)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(f"SELECT COUNT(*) FROM instructions {where}", params).fetchone()[0]
+
+
+def list_page(conn, year=None, week=None, sort="date", descending=True, after=None, limit=PAGE_SIZE):
+    """Une page de la liste légère, triée et découpée par SQLite : (page, clé de la dernière ligne).
+
+    Pagination par clé : `after` est la clé de la dernière ligne de la page
+    précédente (None pour la première). Le tri suit un index (titre, ou année,
+    semaine et titre), sans OFFSET : chaque page coûte le même prix.
+    """
+    keys = SORT_KEYS[sort]
+    clauses, params = _list_filter(year, week)
+    if after is not None:
+        clauses.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' for _ in keys)})")
+        params += list(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = ", ".join(f"{key} {'DESC' if descending else 'ASC'}" for key in keys)
+    page = add_display_columns(pd.read_sql_query(f"{LIST_QUERY} {where} ORDER BY {order} LIMIT ?",
+                                                 conn, params=params + [limit]))
+    if page.empty:
+        return page, None
+    # `rowid` est exposé sous le nom `id` par la requête de liste
+    last = tuple(page["id" if key == "rowid" else key].tolist()[-1] for key in keys)
+    return page, last
+
+
+def frame_page(df, sort="date", descending=True, page=0, limit=PAGE_SIZE):
+    """Une page d'un jeu de résultats déjà en mémoire (recherche) : tri puis découpage.
+
+    `sort="score"` garde l'ordre de pertinence.
+    """
+    if sort != "score":
+        columns = ["id" if key == "rowid" else key for key in SORT_KEYS[sort]]
+        df = df.sort_values(columns, ascending=not descending)
+    return df.iloc[page * limit:(page + 1) * limit]
+
+
+def find_titles(conn, fragment, limit=10):
+    """Titres contenant `fragment`, les plus récents d'abord (recherche de fiche par titre)."""
+    return [row[0] for row in conn.execute("""
+        SELECT title FROM instructions WHERE title LIKE ?
+        ORDER BY year DESC, week DESC LIMIT ?
+    """, (f"%{fragment}%", limit))]
+
+
+def _has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+# --- Texte des PDF ---
+def ensure_pdf_tables(conn):
+    """Crée les tables du texte des PDF.
+
+    `pdf_documents` garde, par instruction, l'état du dernier téléchargement
+    (validateurs HTTP, empreinte du contenu) : `changed_at` ne change qu'avec
+    l'empreinte (c'est le repère de l'index de recherche), `checked_at` à chaque
+    vérification, et les échecs sont reprogrammés (`attempts`, `next_attempt_at`).
+    `pdf_texts` garde le texte extrait, compressé, une seule fois par contenu.
+    La transaction n'est pas validée.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pdf_documents (
+            title TEXT PRIMARY KEY,
+            pdf_link TEXT,
+            sha256 TEXT,
+            size INTEGER,
+            etag TEXT,
+            last_modified TEXT,
+            changed_at TIMESTAMP,
+            checked_at TIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP,
+            error TEXT
+        )
+    """)
+    # Tables des versions précédentes : `fetched_at` bougeait à chaque vérification
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(pdf_documents)")}
+    if "fetched_at" in columns:
+        conn.execute("ALTER TABLE pdf_documents RENAME COLUMN fetched_at TO changed_at")
+    for column, definition in (("checked_at", "TIMESTAMP"), ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+                               ("next_attempt_at", "TIMESTAMP")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE pdf_documents ADD COLUMN {column} {definition}")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pdf_texts (
+            sha256 TEXT PRIMARY KEY,
+            text BLOB,
+            pages INTEGER,
+            extracted_at TIMESTAMP
+        )
+    """)
+
+
+def iter_documents(conn, titles=None):
+    """Parcourt les textes complets ligne à ligne, sans les matérialiser en DataFrame.
+
+    Produit (titre, objet, résumé, texte du PDF) ; le texte du PDF, extrait par
+    `pdf_text`, est vide tant qu'il n'a pas été récupéré. `titles` restreint le
+    parcours à certaines instructions.
+    """
+    where = ""
+    if titles is not None:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted_titles (title TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.wanted_titles")
+        conn.executemany("INSERT OR IGNORE INTO temp.wanted_titles VALUES (?)", [(title,) for title in titles])
+        where = "WHERE i.title IN (SELECT title FROM temp.wanted_titles)"
+    if _has_table(conn, "pdf_documents") and _has_table(conn, "pdf_texts"):
+        cursor = conn.execute(f"""
+            SELECT i.title, i.objet, i.resume, t.text
+            FROM instructions AS i
+            LEFT JOIN pdf_documents AS d ON d.title = i.title
+            LEFT JOIN pdf_texts AS t ON t.sha256 = d.sha256
+            {where}
+        """)
+    else:
+        cursor = conn.execute(f"SELECT i.title, i.objet, i.resume, NULL FROM instructions AS i {where}")
+    for title, objet, resume, pdf_text in cursor:
+        text = zlib.decompress(pdf_text).decode('utf-8') if pdf_text else ""
+        yield title, objet or "", resume or "", text
+
+
+def _pdf_changed_column(conn):
+    """Date de dernier changement du texte d'un PDF (`fetched_at` dans les bases antérieures)."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(pdf_documents)")}
+    return "changed_at" if "changed_at" in columns else "fetched_at"
+
+
+def index_watermark(conn):
+    """Repère des dernières modifications indexables : [fiches, textes des PDF].
+
+    Les dates viennent de la base elle-même (`last_updated`, `changed_at`) : le
+    repère a le même sens d'un processus ou d'une machine à l'autre. Une simple
+    vérification d'un PDF (304, contenu identique, échec) ne le déplace pas.
+    """
+    instructions = conn.execute("SELECT MAX(last_updated) FROM instructions").fetchone()[0]
+    pdf = None
+    if _has_table(conn, "pdf_documents"):
+        pdf = conn.execute(f"SELECT MAX({_pdf_changed_column(conn)}) FROM pdf_documents").fetchone()[0]
+    return [instructions, pdf]
+
+
+def titles_changed_since(conn, watermark):
+    """Titres dont la fiche ou le texte du PDF a changé après un repère (`index_watermark`)."""
+    instructions, pdf = watermark
+    titles = {row[0] for row in conn.execute(
+        "SELECT title FROM instructions WHERE last_updated > ?", (instructions or "",))}
+    if _has_table(conn, "pdf_documents"):
+        titles.update(row[0] for row in conn.execute(
+            f"SELECT title FROM pdf_documents WHERE {_pdf_changed_column(conn)} > ?", (pdf or "",)))
+    return titles
+
+
+# --- Contrôle des liens ---
+LINK_REPORT_QUERY = """
+    SELECT COUNT(*) AS total,
+           COALESCE(SUM(link IS NULL OR link = ''), 0) AS missing_link,
+           COALESCE(SUM(substr(link, 1, length(:site) + 4) = :site || 'http'), 0) AS doubled_prefix,
+           COALESCE(SUM(substr(link, 1, length(:site) + 1) != :site || '/'), 0) AS off_site,
+           COALESCE(SUM(pdf_link IS NOT rtrim(link, '/') || '/telechargement'), 0) AS pdf_mismatch,
+           COALESCE(SUM(link_uses > 1), 0) AS duplicate_link
+    FROM (SELECT link, pdf_link, COUNT(link) OVER (PARTITION BY link) AS link_uses FROM instructions)
+"""
+
+
+def link_report(conn, site="https://info.agriculture.gouv.fr"):
+    """Bilan d'intégrité des liens, en une seule requête : {anomalie: nombre de lignes}.
+
+    - missing_link : lien absent ;
+    - doubled_prefix : adresse du site dédoublée ;
+    - off_site : lien hors du site (préfixes dédoublés compris) ;
+    - pdf_mismatch : lien PDF différent de `<lien>/telechargement` ;
+    - duplicate_link : lien partagé par plusieurs instructions.
+    """
+    cursor = conn.execute(LINK_REPORT_QUERY, {"site": site})
+    return dict(zip([column[0] for column in cursor.description], cursor.fetchone()))
+
+
+# --- Niveau 2 : fiches complètes ---
+class DetailCache:
+    """Cache LRU borné des fiches complètes, indexé par (version, titre)."""
+
+    def __init__(self, maxsize=DETAILS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, loader):
+        """Retourne l'entrée en cache ou la charge via `loader` puis la mémorise."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = loader()
+        if value is None:
+            return None
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def discard(self, key):
+        """Retire une entrée du cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def carry_over(self, old_version, new_version, changed_titles):
+        """Reporte sur une nouvelle version les fiches que la mise à jour n'a pas touchées.
+
+        Seules les fiches des titres modifiés seront relues en base.
+        """
+        changed = set(changed_titles)
+        with self._lock:
+            for (version, title), value in list(self._entries.items()):
+                if version == old_version and title not in changed:
+                    self._entries[(new_version, title)] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Le module est importé une seule fois par processus : le cache survit aux reruns Streamlit
+details_cache = DetailCache()
+
+
+def fetch_instruction_details(conn, title):
+    """Lit la fiche complète d'une instruction via l'index sur le titre."""
+    cursor = conn.execute(
+        f"SELECT rowid AS id, {FULL_COLUMNS} FROM instructions WHERE title = ? LIMIT 1",
+        (title,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    columns = [description[0] for description in cursor.description]
+    return dict(zip(columns, row))
+
+
+def get_instruction_details(title, version=None, db_path=DB_PATH):
+    """Retourne la fiche complète d'une instruction, servie par le cache LRU.
+
+    Les entrées sont indexées par version des données : une nouvelle version ne
+    sert jamais une fiche périmée, les anciennes entrées sortent du LRU.
+    """
+    def _load():
+        conn = connect(db_path)
+        try:
+            return fetch_instruction_details(conn, title)
+        finally:
+            conn.close()
+
+    if version is None:
+        version = data_version(db_path)
+    return details_cache.get((version, title), _load)
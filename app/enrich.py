@@ -0,0 +1,222 @@
+import time
+from datetime import datetime, timedelta
+
+import database
+import history
+import http_client
+import migrations
+import scraper
+
+# --- Configuration ---
+# Pages de détail redemandées par exécution
+DEFAULT_LIMIT = 200
+
+# Nouvelles tentatives par instruction : attente exponentielle, plafonnée, puis abandon
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(hours=12)
+RETRY_MAX_DELAY = timedelta(days=30)
+
+# Statuts définitifs : la page n'existe plus, inutile de réessayer
+PERMANENT_STATUSES = (404, 410)
+
+# Fiches incomplètes : objet ou résumé resté à sa valeur par défaut. Les valeurs
+# sont écrites en toutes lettres pour que SQLite utilise l'index partiel.
+PLACEHOLDER_CONDITION = (f"(objet = '{scraper.OBJET_PLACEHOLDER}' "
+                         f"OR resume = '{scraper.RESUME_PLACEHOLDER}')")
+
+
+class EnrichStats:
+    """Compteurs d'une exécution de complétion (sérialisables en JSON)."""
+
+    def __init__(self):
+        self.selected = 0
+        self.enriched = 0
+        self.failed = 0
+        self.abandoned = 0
+        self.changed_titles = []
+        self.migrated_titles = []
+        self.duration = 0.0
+
+    def to_dict(self):
+        return {
+            "selected": self.selected,
+            "enriched": self.enriched,
+            "failed": self.failed,
+            "abandoned": self.abandoned,
+            "changed_titles": list(self.changed_titles),
+            "migrated_titles": list(self.migrated_titles),
+            "duration": round(self.duration, 3),
+        }
+
+
+# --- Sélection ---
+def ensure_enrichment_tables(conn):
+    """Crée l'index partiel des fiches incomplètes et le suivi des tentatives."""
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_instructions_placeholder
+        ON instructions(title) WHERE {PLACEHOLDER_CONDITION}
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_attempts (
+            title TEXT PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_status INTEGER,
+            last_error TEXT,
+            attempted_at TIMESTAMP,
+            next_attempt_at TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def placeholder_rows(conn, limit=DEFAULT_LIMIT, now=None):
+    """Fiches incomplètes à redemander maintenant : [(titre, lien)], les plus récentes d'abord.
+
+    Les fiches dont la dernière tentative est trop récente, ou qui ont épuisé
+    leurs tentatives, sont écartées.
+    """
+    return conn.execute(f"""
+        SELECT i.title, i.link
+        FROM instructions AS i
+        LEFT JOIN enrichment_attempts AS a ON a.title = i.title
+        WHERE {PLACEHOLDER_CONDITION}
+          AND i.link IS NOT NULL AND i.link != ''
+          AND (a.title IS NULL OR (a.attempts < :max_attempts AND a.next_attempt_at <= :now))
+        ORDER BY i.year DESC, i.week DESC
+        LIMIT :limit
+    """, {"max_attempts": MAX_ATTEMPTS, "now": now or datetime.now(), "limit": limit}).fetchall()
+
+
+def placeholder_count(conn):
+    """Nombre de fiches incomplètes, toutes tentatives confondues."""
+    return conn.execute(f"SELECT COUNT(*) FROM instructions WHERE {PLACEHOLDER_CONDITION}").fetchone()[0]
+
+
+def retry_delay(attempts):
+    """Délai avant la prochaine tentative après `attempts` échecs."""
+    return min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+
+
+# --- Écriture ---
+def _apply_details(conn, details, now):
+    """Met à jour en une requête les fiches dont la page a fourni un objet ou un résumé.
+
+    Seuls les champs restés à leur valeur par défaut sont remplacés ; la version
+    précédente est archivée dans l'historique et l'empreinte de contenu
+    recalculée. Retourne les titres modifiés ; la transaction reste ouverte.
+    """
+    params = {"objet": scraper.OBJET_PLACEHOLDER, "resume": scraper.RESUME_PLACEHOLDER, "now": now}
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS enriched (title TEXT PRIMARY KEY, objet TEXT, resume TEXT)")
+    conn.execute("DELETE FROM temp.enriched")
+    conn.executemany("INSERT INTO temp.enriched VALUES (?, ?, ?)", details)
+    conn.execute("""
+        INSERT INTO instruction_history
+            (instruction_id, title, change, changed_fields, link, pdf_link, objet, resume, content_hash, changed_at)
+        SELECT i.rowid, i.title, 'update',
+               rtrim(CASE WHEN i.objet = :objet AND e.objet != :objet THEN 'objet,' ELSE '' END
+                     || CASE WHEN i.resume = :resume AND e.resume != :resume THEN 'resume,' ELSE '' END, ','),
+               i.link, i.pdf_link, i.objet, i.resume, i.content_hash, :now
+        FROM instructions AS i JOIN temp.enriched AS e ON e.title = i.title
+        WHERE (i.objet = :objet AND e.objet != :objet) OR (i.resume = :resume AND e.resume != :resume)
+    """, params)
+    titles = [row[0] for row in conn.execute("""
+        UPDATE instructions
+        SET objet = CASE WHEN instructions.objet = :objet THEN e.objet ELSE instructions.objet END,
+            resume = CASE WHEN instructions.resume = :resume THEN e.resume ELSE instructions.resume END,
+            last_updated = :now
+        FROM temp.enriched AS e
+        WHERE instructions.title = e.title
+          AND ((instructions.objet = :objet AND e.objet != :objet)
+               OR (instructions.resume = :resume AND e.resume != :resume))
+        RETURNING instructions.title
+    """, params)]
+    conn.execute("""
+        UPDATE instructions SET content_hash = content_hash(link, pdf_link, objet, resume)
+        WHERE title IN (SELECT title FROM temp.enriched)
+    """)
+    return titles
+
+
+def _record_failures(conn, failures, now):
+    """Enregistre les échecs [(titre, statut, erreur)] et reprogramme chaque fiche.
+
+    Retourne le nombre de fiches qui ont épuisé leurs tentatives.
+    """
+    abandoned = 0
+    for title, status, error in failures:
+        row = conn.execute("SELECT attempts FROM enrichment_attempts WHERE title = ?", (title,)).fetchone()
+        # Page définitivement absente : tentatives épuisées d'emblée
+        attempts = MAX_ATTEMPTS if status in PERMANENT_STATUSES else (row[0] if row else 0) + 1
+        conn.execute("INSERT OR REPLACE INTO enrichment_attempts VALUES (?, ?, ?, ?, ?, ?)",
+                     (title, attempts, status, error, now, now + retry_delay(attempts)))
+        abandoned += attempts >= MAX_ATTEMPTS
+    return abandoned
+
+
+# --- Exécution ---
+def run(db_path=database.DB_PATH, limit=DEFAULT_LIMIT, workers=scraper.DEFAULT_MAX_IN_FLIGHT,
+        on_progress=None, now=None, **scraper_options):
+    """Redemande les pages de détail des fiches incomplètes et les complète.
+
+    Seules les fiches incomplètes sont lues (index partiel). Les pages sont
+    récupérées en parallèle, sans cache : la session réessaie les erreurs
+    passagères avec attente exponentielle, et une fiche toujours incomplète est
+    reprogrammée de plus en plus tard, jusqu'à `MAX_ATTEMPTS` tentatives (une
+    page absente, 404 ou 410, n'est pas reprogrammée). Les fiches complétées
+    sont mises à jour en une requête ; leur date de mise à jour change, ce qui
+    suffit à l'index de recherche pour ne réindexer qu'elles.
+
+    `on_progress(done, total, title, status)` est appelé après chaque page.
+    """
+    stats = EnrichStats()
+    started = time.perf_counter()
+    now = now or datetime.now()
+    scraper_options.setdefault("session", http_client.get_session())
+
+    conn = database.connect(db_path)
+    try:
+        stats.migrated_titles = [title for titles in migrations.apply_migrations(conn).values() for title in titles]
+        history.register_functions(conn)
+        ensure_enrichment_tables(conn)
+        rows = placeholder_rows(conn, limit, now)
+        stats.selected = len(rows)
+        if not rows:
+            return stats
+
+        done = []
+
+        def on_detail(title, status):
+            done.append(title)
+            if on_progress is not None:
+                on_progress(len(done), len(rows), title, status)
+
+        results = scraper.scrape_details(rows, on_detail=on_detail, max_in_flight=workers, **scraper_options)
+
+        details = [(title, objet, resume) for title, (status, objet, resume) in results.items() if status == 200]
+        stats.changed_titles = _apply_details(conn, details, now)
+        changed = set(stats.changed_titles)
+
+        # Fiches encore incomplètes (lecture de l'index partiel) : échecs à reprogrammer
+        incomplete = {row[0] for row in conn.execute(f"SELECT title FROM instructions WHERE {PLACEHOLDER_CONDITION}")}
+        failures = []
+        for title, (status, objet, resume) in results.items():
+            if title not in incomplete:
+                continue
+            if status is None:
+                error = "pas de réponse"
+            elif status != 200:
+                error = f"HTTP {status}"
+            else:
+                error = "objet ou résumé absent de la page"
+            failures.append((title, status, error))
+        conn.executemany("DELETE FROM enrichment_attempts WHERE title = ?",
+                         [(title,) for title in changed - incomplete])
+        stats.abandoned = _record_failures(conn, failures, now)
+        conn.commit()
+
+        stats.enriched = len(changed)
+        stats.failed = len(failures)
+    finally:
+        conn.close()
+        stats.duration = time.perf_counter() - started
+    return stats
@@ -0,0 +1,233 @@
+import csv
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+
+import database
+
+# --- Configuration ---
+EXPORT_DIR = "exports"
+
+# Lignes lues par lot depuis le curseur SQLite : la mémoire ne dépend pas de la taille de l'export
+CHUNK_SIZE = 5000
+
+# Fichiers d'export gardés sur disque (les plus anciens sont supprimés)
+EXPORT_CACHE_SIZE = 8
+
+COLUMNS = [column.strip() for column in database.FULL_COLUMNS.split(",")]
+
+# Formats proposés : clé -> (libellé, extension, type MIME, module requis)
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv", None),
+    "jsonl": ("JSON Lines", "jsonl", "application/x-ndjson", None),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet", "pyarrow"),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+}
+
+
+def available_formats():
+    """Formats dont la bibliothèque est installée."""
+    return [fmt for fmt, (_, _, _, module) in FORMATS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+
+# --- Lecture par lots ---
+def export_query(since=None, year=None, week=None):
+    """Requête d'export filtrée (date de mise à jour, année, semaine) : (sql, paramètres)."""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("last_updated > ?")
+        params.append(since)
+    if year is not None:
+        clauses.append("year = ?")
+        params.append(int(year))
+    if week is not None:
+        clauses.append("week = ?")
+        params.append(int(week))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {database.FULL_COLUMNS} FROM instructions {where} ORDER BY year, week, title", params
+
+
+def count_rows(conn, since=None, year=None, week=None):
+    """Nombre de lignes d'un export, sans les lire."""
+    query, params = export_query(since, year, week)
+    return conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+
+
+def iter_chunks(conn, chunk_size=CHUNK_SIZE, **filters):
+    """Parcourt les lignes d'un export par lots de `chunk_size` tuples."""
+    query, params = export_query(**filters)
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+# --- Écriture ---
+def _write_csv(chunks, path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+
+
+def _write_jsonl(chunks, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for rows in chunks:
+            f.writelines(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False, default=str) + "\n"
+                         for row in rows)
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Schéma fixe : un lot sans valeur dans une colonne garde le même type
+    schema = pa.schema([(column, pa.int64() if column in ("year", "week") else pa.string())
+                        for column in COLUMNS])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            arrays = []
+            for field, values in zip(schema, zip(*rows)):
+                # Typage souple de SQLite : une valeur non textuelle est convertie
+                if field.type == pa.string():
+                    values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    # Classeur en écriture seule : les lignes vont directement dans le fichier
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("instructions")
+    sheet.append(COLUMNS)
+    for rows in chunks:
+        for row in rows:
+            sheet.append([ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row])
+    workbook.save(path)
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+    "xlsx": _write_xlsx,
+}
+
+
+def write_export(conn, fmt, path, chunk_size=CHUNK_SIZE, **filters):
+    """Écrit un export dans `path`, lot par lot depuis le curseur SQLite.
+
+    Le fichier est écrit à côté puis renommé : un export interrompu ne laisse
+    jamais de fichier tronqué.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".export_", suffix=f".{FORMATS[fmt][1]}", dir=directory)
+    os.close(fd)
+    try:
+        WRITERS[fmt](iter_chunks(conn, chunk_size, **filters), tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# --- Cache des exports ---
+def _version_prefix(version):
+    """Préfixe des fichiers d'export d'une version des données."""
+    return hashlib.sha256(repr(version).encode('utf-8')).hexdigest()[:8] + "_"
+
+
+class ExportCache:
+    """Fichiers d'export déjà produits, indexés par (format, filtres, version des données).
+
+    Les exports d'une même version ne sont générés qu'une fois, y compris d'un
+    processus à l'autre : le nom du fichier dérive de sa clé. Les fichiers des
+    autres versions sont supprimés au premier export d'une version, les plus
+    anciens de la version courante au-delà de `maxsize`.
+    """
+
+    def __init__(self, export_dir=EXPORT_DIR, maxsize=EXPORT_CACHE_SIZE):
+        self.export_dir = export_dir
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._version = None
+
+    def _prune(self, version):
+        """Supprime les exports des autres versions des données (une fois par version)."""
+        if version == self._version:
+            return
+        os.makedirs(self.export_dir, exist_ok=True)
+        # Les fichiers temporaires d'un export en cours (`write_export`) sont laissés
+        keep = (_version_prefix(version), ".export_")
+        for name in os.listdir(self.export_dir):
+            if not name.startswith(keep):
+                try:
+                    os.remove(os.path.join(self.export_dir, name))
+                except FileNotFoundError:
+                    pass
+        self._entries = OrderedDict((key, path) for key, path in self._entries.items() if key[-1] == version)
+        self._version = version
+
+    def get(self, key, build):
+        """Chemin du fichier de `key`, produit par `build(path)` s'il n'existe pas encore.
+
+        La génération se fait sous verrou : deux clics simultanés ne produisent
+        pas deux fois le même fichier.
+        """
+        with self._lock:
+            self._prune(key[-1])
+            name = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:16]
+            path = os.path.join(self.export_dir, f"{_version_prefix(key[-1])}{name}.{FORMATS[key[0]][1]}")
+            if not os.path.exists(path):
+                build(path)
+            self._entries[key] = path
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                _, old_path = self._entries.popitem(last=False)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+            return path
+
+
+# Le module est importé une seule fois par processus : le cache survit aux reruns Streamlit
+export_cache = ExportCache()
+
+
+def export_file(fmt, version, db_path=database.DB_PATH, **filters):
+    """Chemin du fichier d'export pour ces filtres, généré au premier appel pour cette version."""
+    key = (fmt, tuple(sorted(filters.items())), version)
+
+    def _build(path):
+        with database.connect(db_path) as conn:
+            write_export(conn, fmt, path, **filters)
+
+    return export_cache.get(key, _build)
+
+
+def read_export(fmt, version, db_path=database.DB_PATH, **filters):
+    """Contenu d'un export, pour un bouton de téléchargement différé (généré au clic)."""
+    with open(export_file(fmt, version, db_path, **filters), 'rb') as f:
+        return f.read()
+
+
+def record_csv(record):
+    """Une fiche (dictionnaire) au format CSV."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(record), lineterminator="\n")
+    writer.writeheader()
+    writer.writerow(record)
+    return buffer.getvalue().encode('utf-8')
@@ -0,0 +1,89 @@
+import hashlib
+
+# --- Empreinte du contenu ---
+# Champs couverts par l'empreinte : une instruction n'est réécrite que si l'un
+# d'eux change (année et semaine sont comparées à part)
+CONTENT_FIELDS = ("link", "pdf_link", "objet", "resume")
+
+
+def content_hash(link, pdf_link, objet, resume):
+    """Empreinte SHA-256 du contenu d'une instruction (liens, objet, résumé)."""
+    payload = "\x1f".join("" if value is None else str(value) for value in (link, pdf_link, objet, resume))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def register_functions(conn):
+    """Rend `content_hash(lien, lien_pdf, objet, résumé)` disponible en SQL sur la connexion."""
+    conn.create_function("content_hash", 4, content_hash, deterministic=True)
+
+
+def ensure_history(conn):
+    """Ajoute la colonne d'empreinte et crée l'historique des versions.
+
+    Les empreintes manquantes sont calculées en une requête.
+    """
+    register_functions(conn)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(instructions)")}
+    if "content_hash" not in columns:
+        conn.execute("ALTER TABLE instructions ADD COLUMN content_hash TEXT")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS instruction_history (
+            id INTEGER PRIMARY KEY,
+            instruction_id INTEGER,
+            title TEXT NOT NULL,
+            change TEXT NOT NULL,
+            changed_fields TEXT,
+            link TEXT,
+            pdf_link TEXT,
+            objet TEXT,
+            resume TEXT,
+            content_hash TEXT,
+            changed_at TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_instruction_history_title ON instruction_history(title)")
+    conn.execute("""
+        UPDATE instructions SET content_hash = content_hash(link, pdf_link, objet, resume)
+        WHERE content_hash IS NULL
+    """)
+
+
+def changed_fields(old, new):
+    """Champs de contenu qui diffèrent entre deux versions (dictionnaires)."""
+    return [field for field in CONTENT_FIELDS if old.get(field) != new.get(field)]
+
+
+# --- Historique ---
+# Version précédente d'une instruction modifiée : la ligne actuelle, avant réécriture
+_ARCHIVE_COLUMNS = "instruction_id, title, change, changed_fields, link, pdf_link, objet, resume, content_hash, changed_at"
+
+
+def archive_version(conn, instruction_id, fields, now):
+    """Archive la version actuelle d'une instruction avant sa réécriture.
+
+    `fields` liste les champs modifiés. La transaction reste ouverte.
+    """
+    conn.execute(f"""
+        INSERT INTO instruction_history ({_ARCHIVE_COLUMNS})
+        SELECT rowid, title, 'update', ?, link, pdf_link, objet, resume, content_hash, ?
+        FROM instructions WHERE rowid = ?
+    """, (",".join(fields), now, instruction_id))
+
+
+def record_insert(conn, instruction_id, title, now):
+    """Note l'apparition d'une instruction dans l'historique. La transaction reste ouverte."""
+    conn.execute(f"""
+        INSERT INTO instruction_history ({_ARCHIVE_COLUMNS})
+        VALUES (?, ?, 'insert', NULL, NULL, NULL, NULL, NULL, NULL, ?)
+    """, (instruction_id, title, now))
+
+
+def versions(conn, title):
+    """Versions précédentes d'une instruction, de la plus récente à la plus ancienne."""
+    cursor = conn.execute(f"""
+        SELECT {_ARCHIVE_COLUMNS} FROM instruction_history
+        WHERE title = ? AND change = 'update'
+        ORDER BY id DESC
+    """, (title,))
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
@@ -0,0 +1,180 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+
+import requests
+
+import http_client
+
+# --- Configuration ---
+CACHE_PATH = "cache/http_cache.db"
+
+# Pages de semaine plus anciennes que cet horizon : servies depuis le cache sans requête
+HORIZON_WEEKS = 8
+
+# Pages de détail : servies depuis le cache, puis revalidées au-delà de cet âge
+DETAIL_MAX_AGE = timedelta(days=30)
+
+WEEK_URL_PATTERN = re.compile(r"/annee-(\d{4})/semaine-(\d{1,2})")
+
+
+class CacheMiss(requests.RequestException):
+    """URL absente du cache en mode hors ligne."""
+
+
+class CachedResponse:
+    """Réponse servie par le cache, compatible avec l'usage fait des réponses requests."""
+
+    def __init__(self, url, status_code, content, headers=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# --- Stockage ---
+class ResponseCache:
+    """Cache persistant des réponses HTTP 200 (corps compressé + validateurs), indexé par URL."""
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL
+                )
+            """)
+
+    def get(self, url):
+        """Retourne (corps, etag, last_modified, fetched_at) ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at = row
+        return zlib.decompress(body), etag, last_modified, fetched_at
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Enregistre une réponse."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, zlib.compress(content), etag, last_modified, time.time()),
+            )
+
+    def touch(self, url):
+        """Marque une réponse comme revalidée (réponse 304)."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Session avec cache ---
+class CachedSession:
+    """Enveloppe une session HTTP avec le cache de réponses.
+
+    - pages de semaine antérieures à l'horizon : servies sans requête ;
+    - pages de détail : servies sans requête tant qu'elles ont moins de `detail_max_age` ;
+    - autres cas : requête conditionnelle (If-None-Match / If-Modified-Since).
+    `revalidate=True` force la requête conditionnelle (semaine trouvée vide,
+    revérifiée pour capter une publication tardive).
+    En mode `offline`, aucune requête n'est émise et une URL absente lève `CacheMiss`.
+    """
+
+    def __init__(self, session=None, cache=None, horizon_weeks=HORIZON_WEEKS,
+                 detail_max_age=DETAIL_MAX_AGE, offline=False, today=None):
+        self.session = session or http_client.get_session()
+        self.cache = cache or ResponseCache()
+        self.horizon_weeks = horizon_weeks
+        self.detail_max_age = detail_max_age
+        self.offline = offline
+        self.today = today
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+
+    def _is_frozen(self, url, fetched_at):
+        """Indique si une réponse en cache peut être servie sans requête."""
+        match = WEEK_URL_PATTERN.search(url)
+        if match:
+            year, week = int(match.group(1)), int(match.group(2))
+            try:
+                week_start = date.fromisocalendar(year, week, 1)
+            except ValueError:
+                return False
+            today = self.today or date.today()
+            return today - week_start > timedelta(weeks=self.horizon_weeks)
+        return time.time() - fetched_at < self.detail_max_age.total_seconds()
+
+    def is_fresh(self, url, revalidate=False):
+        """Indique si l'URL sera servie depuis le cache, sans requête."""
+        cached = self.cache.get(url)
+        return cached is not None and (self.offline or (not revalidate and self._is_frozen(url, cached[3])))
+
+    def get(self, url, revalidate=False, **kwargs):
+        """GET avec cache : retourne une réponse requests ou une `CachedResponse`."""
+        cached = self.cache.get(url)
+
+        if cached is not None and (self.offline or (not revalidate and self._is_frozen(url, cached[3]))):
+            self.hits += 1
+            return CachedResponse(url, 200, cached[0])
+        if self.offline:
+            raise CacheMiss(url)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached is not None:
+            if cached[1]:
+                headers['If-None-Match'] = cached[1]
+            if cached[2]:
+                headers['If-Modified-Since'] = cached[2]
+
+        response = self.session.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            self.revalidated += 1
+            self.cache.touch(url)
+            return CachedResponse(url, 200, cached[0])
+
+        self.fetched += 1
+        if response.status_code == 200:
+            self.cache.put(url, response.content, response.headers.get('ETag'),
+                           response.headers.get('Last-Modified'))
+        return response
+
+
+_cached_session = None
+_cached_session_lock = threading.Lock()
+
+
+def get_cached_session():
+    """Retourne la session avec cache partagée du processus."""
+    global _cached_session
+    with _cached_session_lock:
+        if _cached_session is None:
+            _cached_session = CachedSession()
+        return _cached_session
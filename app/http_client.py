@@ -0,0 +1,123 @@
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Connexions gardées ouvertes par hôte (keep-alive)
+POOL_SIZE = 16
+
+# Nouvelles tentatives pour les GET idempotents : attente exponentielle
+# (backoff_factor * 2^n) avec une part aléatoire pour étaler les reprises
+# (`backoff_jitter` : urllib3 2 ou plus, voir requirements.txt)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+BACKOFF_JITTER = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_TIMEOUT = 15
+
+
+# --- Mesure des requêtes ---
+class RequestStats:
+    """Statistiques de durée des requêtes, par hôte."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: {"count": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0})
+
+    def record(self, url, elapsed, status_code):
+        """Enregistre la durée d'une réponse."""
+        with self._lock:
+            host = self._hosts[urlparse(url).netloc]
+            host["count"] += 1
+            host["total_time"] += elapsed
+            host["max_time"] = max(host["max_time"], elapsed)
+            if status_code >= 400:
+                host["errors"] += 1
+
+    def summary(self):
+        """Retourne {hôte: {count, errors, total_time, max_time, avg_time}}."""
+        with self._lock:
+            return {
+                host: dict(values, avg_time=values["total_time"] / values["count"] if values["count"] else 0.0)
+                for host, values in self._hosts.items()
+            }
+
+    def reset(self):
+        """Remet les compteurs à zéro."""
+        with self._lock:
+            self._hosts.clear()
+
+
+stats = RequestStats()
+
+
+def _record_timing(response, *args, **kwargs):
+    """Hook `response` de requests : mesure chaque réponse reçue."""
+    stats.record(response.url, response.elapsed.total_seconds(), response.status_code)
+
+
+class TimeoutSession(requests.Session):
+    """Session requests appliquant un délai d'attente par défaut."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+# --- Sessions ---
+def create_session(pool_size=POOL_SIZE, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                   timeout=DEFAULT_TIMEOUT):
+    """Crée une session avec pool de connexions, keep-alive et reprises bornées.
+
+    Seules les méthodes idempotentes (GET, HEAD) sont rejouées, sur erreur de
+    connexion ou statut 429/5xx ; l'en-tête Retry-After est respecté.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = TimeoutSession(timeout=timeout)
+    session.headers.update({"User-Agent": USER_AGENT})
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(_record_timing)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Retourne la session partagée du processus (connexions réutilisées entre appels)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def get(url, **kwargs):
+    """GET via la session partagée."""
+    return get_session().get(url, **kwargs)
@@ -0,0 +1,439 @@
+import time
+from datetime import datetime, timedelta
+
+import aggregates
+import database
+import history
+import jobs
+import migrations
+import scraper
+
+# --- Configuration ---
+# Sans historique exploitable, la recherche démarre 3 mois en arrière
+DEFAULT_LOOKBACK = timedelta(days=90)
+
+# Semaines réservées à la fois dans la file de récupération
+CHUNK_SIZE = 10
+
+# Semaines toujours revérifiées (publications tardives) : la semaine en cours
+# et la précédente
+RECENT_WEEKS = 2
+
+# Reconstruction complète : première semaine publiée et taille des tranches
+# (une année de semaines ISO par tranche, chargée en une transaction)
+BACKFILL_START = (2019, 1)
+BACKFILL_CHUNK = 53
+
+
+class IngestStats:
+    """Compteurs d'une exécution d'ingestion (sérialisables en JSON)."""
+
+    def __init__(self):
+        self.weeks_checked = 0
+        self.weeks_failed = 0
+        self.weeks_empty = 0
+        self.instructions_found = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.changed_titles = []
+        self.changed_ids = []
+        self.migrated_titles = []
+        self.duration = 0.0
+        self.dry_run = False
+
+    def to_dict(self):
+        return {
+            "weeks_checked": self.weeks_checked,
+            "weeks_failed": self.weeks_failed,
+            "weeks_empty": self.weeks_empty,
+            "instructions_found": self.instructions_found,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "changed_titles": list(self.changed_titles),
+            "changed_ids": list(self.changed_ids),
+            "migrated_titles": list(self.migrated_titles),
+            "duration": round(self.duration, 3),
+            "dry_run": self.dry_run,
+        }
+
+
+# --- Semaines à vérifier ---
+def start_date(conn, since=None, today=None):
+    """Date de départ : `since`, sinon la dernière mise à jour (au plus 3 mois en arrière)."""
+    today = today or datetime.now()
+    if since is not None:
+        return since
+
+    last_update_str = conn.execute("SELECT MAX(last_updated) FROM instructions").fetchone()[0]
+    default_start = today - DEFAULT_LOOKBACK
+    if not last_update_str:
+        return default_start
+    try:
+        last_update = datetime.strptime(last_update_str, '%Y-%m-%d %H:%M:%S.%f')
+    except ValueError:
+        return default_start
+    return max(last_update, default_start)
+
+
+def recent_weeks(today=None):
+    """Semaines ISO récentes, revérifiées à chaque exécution : la plus récente d'abord."""
+    today = today or datetime.now()
+    return [tuple((today - timedelta(weeks=n)).isocalendar()[:2]) for n in range(RECENT_WEEKS)]
+
+
+def candidate_weeks(conn, since=None, today=None):
+    """Semaines ISO à vérifier depuis la date de départ jusqu'à la semaine en cours.
+
+    Le calendrier des semaines est confronté aux instructions par une
+    anti-jointure SQL : les semaines qui ont déjà des instructions sont écartées,
+    sauf les semaines récentes. Les semaines récentes viennent en tête, puis
+    les plus récentes d'abord.
+    """
+    today = today or datetime.now()
+    start = start_date(conn, since, today)
+    recent = recent_weeks(today)
+    weeks = set(jobs.iso_weeks(tuple(start.isocalendar()[:2]), recent[0])) | set(recent)
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS calendar (year INTEGER, week INTEGER, recent INTEGER)")
+    conn.execute("DELETE FROM temp.calendar")
+    conn.executemany("INSERT INTO temp.calendar VALUES (?, ?, ?)",
+                     [(year, week, (year, week) in recent) for year, week in weeks])
+    return [tuple(row) for row in conn.execute("""
+        SELECT c.year, c.week FROM temp.calendar AS c
+        WHERE c.recent
+           OR NOT EXISTS (SELECT 1 FROM instructions AS i WHERE i.year = c.year AND i.week = c.week)
+        ORDER BY c.recent DESC, c.year DESC, c.week DESC
+    """)]
+
+
+# --- Écriture ---
+def _merged_text(new, old, placeholder):
+    """Un texte par défaut (détail inaccessible) n'écrase jamais un texte connu."""
+    return old if new == placeholder and old else new
+
+
+def prepare(conn):
+    """Prépare une base à l'écriture : index, file des semaines, migrations en attente,
+    agrégats par semaine (tenus à jour par déclencheurs).
+
+    Enregistre aussi la fonction SQL `content_hash` sur la connexion. Retourne
+    les titres réécrits par les migrations appliquées.
+    """
+    database.ensure_indexes(conn)
+    jobs.ensure_jobs_table(conn)
+    changes = migrations.apply_migrations(conn)
+    aggregates.ensure_week_counts(conn)
+    history.register_functions(conn)
+    return [title for titles in changes.values() for title in titles]
+
+
+def upsert_instructions(conn, year, week, instructions, now=None):
+    """Insère ou met à jour les instructions d'une semaine.
+
+    Retourne {'inserted', 'updated', 'unchanged'} (titres) et 'changed_ids'
+    (identifiants des lignes insérées ou modifiées). Les liens sont enregistrés
+    sous forme canonique (`scraper.canonical_links`). Une ligne existante n'est
+    réécrite que si son empreinte de contenu (ou sa semaine) change ; sa
+    version précédente est alors archivée avec la liste des champs modifiés.
+    Les textes par défaut n'écrasent pas un objet ou un résumé déjà récupérés.
+    """
+    now = now or datetime.now()
+    outcome = {"inserted": [], "updated": [], "unchanged": [], "changed_ids": []}
+    for title, link, pdf_link, objet, resume in instructions:
+        link, pdf_link = scraper.canonical_links(link, pdf_link)
+        current = conn.execute(
+            "SELECT rowid, year, week, link, pdf_link, objet, resume, content_hash FROM instructions WHERE title = ?",
+            (title,),
+        ).fetchone()
+        if current is None:
+            cursor = conn.execute(f"""
+                INSERT INTO instructions ({database.FULL_COLUMNS}, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (year, week, title, link, pdf_link, objet, resume, now,
+                  history.content_hash(link, pdf_link, objet, resume)))
+            history.record_insert(conn, cursor.lastrowid, title, now)
+            outcome["inserted"].append(title)
+            outcome["changed_ids"].append(cursor.lastrowid)
+            continue
+
+        instruction_id, old_year, old_week = current[:3]
+        old = dict(zip(history.CONTENT_FIELDS, current[3:7]))
+        new = {"link": link, "pdf_link": pdf_link,
+               "objet": _merged_text(objet, old["objet"], scraper.OBJET_PLACEHOLDER),
+               "resume": _merged_text(resume, old["resume"], scraper.RESUME_PLACEHOLDER)}
+        new_hash = history.content_hash(**new)
+        old_hash = current[7] or history.content_hash(**old)
+        if new_hash == old_hash and (year, week) == (old_year, old_week):
+            outcome["unchanged"].append(title)
+            continue
+
+        fields = history.changed_fields(old, new)
+        if fields:
+            history.archive_version(conn, instruction_id, fields, now)
+        conn.execute("""
+            UPDATE instructions
+            SET year = ?, week = ?, link = ?, pdf_link = ?, objet = ?, resume = ?, last_updated = ?,
+                content_hash = ?
+            WHERE rowid = ?
+        """, (year, week, new["link"], new["pdf_link"], new["objet"], new["resume"], now, new_hash, instruction_id))
+        outcome["updated"].append(title)
+        outcome["changed_ids"].append(instruction_id)
+    return outcome
+
+
+# Ligne connue à réécrire : contenu modifié ou instruction publiée une autre semaine
+_AMENDED = "s.content_hash != s.existing_hash OR s.year IS NOT s.existing_year OR s.week IS NOT s.existing_week"
+
+
+def bulk_load(conn, rows, now=None):
+    """Charge en masse des lignes (année, semaine, titre, lien, lien_pdf, objet, résumé).
+
+    Les liens sont mis sous forme canonique, puis les lignes passent par une
+    table temporaire et sont fusionnées par requêtes ensemblistes : les titres
+    connus dont l'empreinte de contenu change sont archivés puis mis à jour
+    (sans écraser un texte connu par un texte par défaut), ceux dont seule la
+    semaine change sont mis à jour sans archivage (comme `upsert_instructions`),
+    les autres insérés. Un titre vu plusieurs semaines du lot prend la plus
+    récente, comme d'un lot à l'autre. Retourne {'inserted', 'updated'}
+    (titres) et 'changed_ids' ; la transaction reste ouverte.
+    """
+    now = now or datetime.now()
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS staging (
+            year INTEGER, week INTEGER, title TEXT, link TEXT, pdf_link TEXT, objet TEXT, resume TEXT
+        )
+    """)
+    conn.execute("DELETE FROM staging")
+    conn.executemany("INSERT INTO staging VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [(year, week, title, *scraper.canonical_links(link, pdf_link), objet, resume)
+                      for year, week, title, link, pdf_link, objet, resume in rows])
+    conn.execute("DROP TABLE IF EXISTS temp.staged")
+    conn.execute("""
+        CREATE TEMP TABLE staged AS
+        SELECT *, content_hash(link, pdf_link, objet, resume) AS content_hash
+        FROM (
+            SELECT s.year, s.week, s.title, s.link, s.pdf_link,
+                   CASE WHEN s.objet = :objet AND i.objet IS NOT NULL THEN i.objet ELSE s.objet END AS objet,
+                   CASE WHEN s.resume = :resume AND i.resume IS NOT NULL THEN i.resume ELSE s.resume END AS resume,
+                   i.rowid AS existing_id, i.year AS existing_year, i.week AS existing_week,
+                   COALESCE(i.content_hash, content_hash(i.link, i.pdf_link, i.objet, i.resume)) AS existing_hash
+            FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY title ORDER BY year DESC, week DESC) AS rank FROM staging) AS s
+            LEFT JOIN instructions AS i ON i.title = s.title
+            WHERE s.rank = 1
+        )
+    """, {"objet": scraper.OBJET_PLACEHOLDER, "resume": scraper.RESUME_PLACEHOLDER})
+
+    amended = conn.execute(f"""
+        SELECT s.title, s.existing_id FROM staged AS s
+        WHERE s.existing_id IS NOT NULL AND ({_AMENDED})
+    """).fetchall()
+
+    # Versions précédentes archivées avant réécriture, avec les champs modifiés
+    conn.execute("""
+        INSERT INTO instruction_history
+            (instruction_id, title, change, changed_fields, link, pdf_link, objet, resume, content_hash, changed_at)
+        SELECT i.rowid, i.title, 'update',
+               rtrim(CASE WHEN i.link IS NOT s.link THEN 'link,' ELSE '' END
+                     || CASE WHEN i.pdf_link IS NOT s.pdf_link THEN 'pdf_link,' ELSE '' END
+                     || CASE WHEN i.objet IS NOT s.objet THEN 'objet,' ELSE '' END
+                     || CASE WHEN i.resume IS NOT s.resume THEN 'resume,' ELSE '' END, ','),
+               i.link, i.pdf_link, i.objet, i.resume, i.content_hash, :now
+        FROM staged AS s JOIN instructions AS i ON i.rowid = s.existing_id
+        WHERE s.content_hash != s.existing_hash
+    """, {"now": now})
+    conn.execute(f"""
+        UPDATE instructions
+        SET year = s.year, week = s.week, link = s.link, pdf_link = s.pdf_link, objet = s.objet,
+            resume = s.resume, last_updated = :now, content_hash = s.content_hash
+        FROM staged AS s
+        WHERE instructions.rowid = s.existing_id AND ({_AMENDED})
+    """, {"now": now})
+
+    inserted = [row[0] for row in conn.execute("SELECT title FROM staged WHERE existing_id IS NULL")]
+    conn.execute(f"""
+        INSERT INTO instructions ({database.FULL_COLUMNS}, content_hash)
+        SELECT year, week, title, link, pdf_link, objet, resume, :now, content_hash
+        FROM staged WHERE existing_id IS NULL
+        ORDER BY year, week, title
+    """, {"now": now})
+    inserted_ids = [row[0] for row in conn.execute("""
+        INSERT INTO instruction_history (instruction_id, title, change, changed_at)
+        SELECT i.rowid, i.title, 'insert', :now
+        FROM staged AS s JOIN instructions AS i ON i.title = s.title
+        WHERE s.existing_id IS NULL
+        RETURNING instruction_id
+    """, {"now": now})]
+    conn.execute("DROP TABLE temp.staged")
+    return {"inserted": inserted, "updated": [title for title, _ in amended],
+            "changed_ids": [instruction_id for _, instruction_id in amended] + inserted_ids}
+
+
+def _existing_titles(conn, titles):
+    placeholders = ", ".join("?" * len(titles))
+    rows = conn.execute(f"SELECT title FROM instructions WHERE title IN ({placeholders})", titles)
+    return {row[0] for row in rows}
+
+
+# --- Exécution ---
+def run(db_path=database.DB_PATH, since=None, max_weeks=None, workers=scraper.DEFAULT_MAX_IN_FLIGHT,
+        dry_run=False, on_progress=None, today=None, **scraper_options):
+    """Récupère, analyse et enregistre les nouvelles instructions.
+
+    Les semaines passent par la file persistante de `jobs` : une exécution
+    interrompue reprend là où elle s'était arrêtée. Le budget `max_weeks` va
+    d'abord aux semaines récentes et aux semaines jamais récupérées ; les
+    semaines trouvées vides ne sont revérifiées qu'à intervalles croissants, et
+    chaque semaine garde son observation (statut HTTP, nombre d'instructions,
+    durée). `on_progress(done, total,
+    year, week, instructions)` est appelé après chaque semaine (instructions
+    vaut None si la semaine n'a pas pu être récupérée). En `dry_run`, rien n'est
+    écrit : les semaines sont récupérées et les compteurs calculés. Les autres
+    options (session, base_url, rate...) sont transmises à `scraper.AsyncScraper`.
+
+    Les index et caches dérivés (Whoosh, statistiques) sont clés par la version
+    des données : ils sont reconstruits au prochain accès si la base a changé.
+    """
+    stats = IngestStats()
+    stats.dry_run = dry_run
+    started = time.perf_counter()
+    options = dict(scraper_options, max_in_flight=workers)
+
+    conn = database.connect(db_path)
+    try:
+        weeks = candidate_weeks(conn, since, today)
+        recent = recent_weeks(today)
+
+        if dry_run:
+            done = jobs.done_weeks(conn) - set(recent)
+            weeks = [w for w in weeks if w not in done][:max_weeks]
+            total = len(weeks)
+        else:
+            stats.migrated_titles = prepare(conn)
+            jobs.enqueue_weeks(conn, weeks, refresh=recent)
+            total = jobs.claimable_count(conn)
+            if max_weeks is not None:
+                total = min(total, max_weeks)
+
+        fetches = {}
+
+        def on_fetch(year, week, status, duration):
+            fetches[(year, week)] = (status, duration)
+
+        def on_week(year, week, instructions):
+            stats.weeks_checked += 1
+            if instructions is None:
+                stats.weeks_failed += 1
+            else:
+                stats.instructions_found += len(instructions)
+                stats.weeks_empty += not instructions
+                if dry_run:
+                    known = _existing_titles(conn, [item[0] for item in instructions]) if instructions else set()
+                    stats.inserted += len(instructions) - len(known)
+                    stats.unchanged += len(known)
+                else:
+                    outcome = upsert_instructions(conn, year, week, instructions)
+                    stats.inserted += len(outcome["inserted"])
+                    stats.updated += len(outcome["updated"])
+                    stats.unchanged += len(outcome["unchanged"])
+                    stats.changed_titles += outcome["inserted"] + outcome["updated"]
+                    stats.changed_ids += outcome["changed_ids"]
+
+            if not dry_run:
+                # Point de reprise : instructions et observation de la semaine validées ensemble
+                status, duration = fetches.pop((year, week), (None, None))
+                jobs.record_week(conn, year, week, instructions, http_status=status, duration=duration)
+            if on_progress is not None:
+                on_progress(stats.weeks_checked, total, year, week, instructions)
+
+        if dry_run:
+            if weeks:
+                scraper.scrape_weeks(weeks, on_week=on_week, on_fetch=on_fetch, **options)
+        else:
+            while max_weeks is None or stats.weeks_checked < max_weeks:
+                limit = CHUNK_SIZE if max_weeks is None else min(CHUNK_SIZE, max_weeks - stats.weeks_checked)
+                batch = jobs.claim_jobs(conn, limit)
+                if not batch:
+                    break
+                scraper.scrape_weeks(batch, on_week=on_week, on_fetch=on_fetch,
+                                     revalidate=jobs.empty_weeks(conn, batch), **options)
+    finally:
+        conn.close()
+
+    stats.duration = time.perf_counter() - started
+    return stats
+
+
+def backfill(db_path=database.DB_PATH, start=BACKFILL_START, chunk_weeks=BACKFILL_CHUNK, max_weeks=None,
+             workers=scraper.DEFAULT_MAX_IN_FLIGHT, on_progress=None, today=None, **scraper_options):
+    """Reconstruit l'historique complet, de `start` à la semaine en cours.
+
+    Toutes les semaines ISO (années à 53 semaines comprises) sont mises en file,
+    puis traitées par tranches de `chunk_weeks` : les pages de semaine et de
+    détail d'une tranche sont récupérées en parallèle par le moteur asyncio, sous
+    un budget de politesse unique par hôte, puis chargées en masse en une seule
+    transaction (`bulk_load`). Les tranches vont de la plus ancienne à la plus
+    récente : un titre publié plusieurs semaines garde la plus récente, dans une
+    tranche comme d'une tranche à l'autre (même règle que `upsert_instructions`).
+    Une tranche validée n'est jamais refaite : une reconstruction interrompue
+    reprend à la tranche suivante.
+    """
+    stats = IngestStats()
+    started = time.perf_counter()
+    options = dict(scraper_options, max_in_flight=workers)
+    recent = recent_weeks(today)
+    fetches = {}
+
+    conn = database.connect(db_path)
+    try:
+        stats.migrated_titles = prepare(conn)
+        jobs.enqueue_weeks(conn, jobs.iso_weeks(start, recent[0]), refresh=recent)
+        total = jobs.claimable_count(conn)
+        if max_weeks is not None:
+            total = min(total, max_weeks)
+
+        def on_week(year, week, instructions):
+            stats.weeks_checked += 1
+            if instructions is None:
+                stats.weeks_failed += 1
+            else:
+                stats.instructions_found += len(instructions)
+                stats.weeks_empty += not instructions
+            if on_progress is not None:
+                on_progress(stats.weeks_checked, total, year, week, instructions)
+
+        def on_fetch(year, week, status, duration):
+            fetches[(year, week)] = (status, duration)
+
+        while max_weeks is None or stats.weeks_checked < max_weeks:
+            limit = chunk_weeks if max_weeks is None else min(chunk_weeks, max_weeks - stats.weeks_checked)
+            batch = jobs.claim_jobs(conn, limit, oldest_first=True)
+            if not batch:
+                break
+
+            results = scraper.scrape_weeks(batch, on_week=on_week, on_fetch=on_fetch,
+                                           revalidate=jobs.empty_weeks(conn, batch), **options)
+            rows = [
+                (year, week) + tuple(instruction)
+                for (year, week), instructions in sorted(results.items())
+                for instruction in instructions or []
+            ]
+            outcome = bulk_load(conn, rows)
+            conn.commit()
+
+            stats.inserted += len(outcome["inserted"])
+            stats.updated += len(outcome["updated"])
+            stats.unchanged += len({row[2] for row in rows}) - len(outcome["inserted"]) - len(outcome["updated"])
+            stats.changed_titles += outcome["inserted"] + outcome["updated"]
+            stats.changed_ids += outcome["changed_ids"]
+
+            # Point de reprise : la tranche est chargée, ses semaines sont marquées
+            for (year, week), instructions in results.items():
+                status, duration = fetches.pop((year, week), (None, None))
+                jobs.record_week(conn, year, week, instructions, http_status=status, duration=duration)
+    finally:
+        conn.close()
+
+    stats.duration = time.perf_counter() - started
+    return stats
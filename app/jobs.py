@@ -0,0 +1,214 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+
+# --- États d'une semaine à récupérer ---
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ABANDONED = "abandoned"
+
+# Nouvelles tentatives : attente exponentielle, plafonnée, puis abandon
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = timedelta(minutes=30)
+RETRY_MAX_DELAY = timedelta(days=2)
+
+# Une semaine restée « running » plus longtemps que ce délai est considérée
+# comme interrompue (session fermée, workflow expiré) et peut être reprise
+STALE_AFTER = timedelta(minutes=30)
+
+# Semaine vide (aucune instruction publiée) : nouvelle vérification après un
+# délai qui double à chaque constat, plafonné
+EMPTY_RECHECK_BASE_DELAY = timedelta(days=1)
+EMPTY_RECHECK_MAX_DELAY = timedelta(days=90)
+
+# Observations ajoutées après coup : colonnes créées sur les files existantes
+_OBSERVATION_COLUMNS = {
+    "http_status": "INTEGER",
+    "fetch_duration": "REAL",
+    "empty_checks": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+def ensure_jobs_table(conn):
+    """Crée la table des semaines à récupérer."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            year INTEGER NOT NULL,
+            week INTEGER NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            fetched_at TIMESTAMP,
+            claimed_at TIMESTAMP,
+            next_attempt_at TIMESTAMP,
+            instructions_found INTEGER,
+            http_status INTEGER,
+            fetch_duration REAL,
+            empty_checks INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (year, week)
+        )
+    """)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(scrape_jobs)")}
+    for name, definition in _OBSERVATION_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE scrape_jobs ADD COLUMN {name} {definition}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_state ON scrape_jobs(state, next_attempt_at)")
+    conn.commit()
+
+
+def iso_weeks(start, end):
+    """Liste des semaines ISO (année, semaine) entre deux semaines incluses, semaines 53 comprises."""
+    current = date.fromisocalendar(start[0], start[1], 1)
+    last = date.fromisocalendar(end[0], end[1], 1)
+    weeks = []
+    while current <= last:
+        weeks.append(tuple(current.isocalendar()[:2]))
+        current += timedelta(weeks=1)
+    return weeks
+
+
+def enqueue_weeks(conn, weeks, refresh=()):
+    """Ajoute des semaines à la file sans toucher à celles déjà connues.
+
+    Les semaines de `refresh` (semaine en cours, par exemple) repassent en attente
+    même si elles ont déjà été traitées, pour capter les publications tardives.
+    """
+    conn.executemany(
+        "INSERT OR IGNORE INTO scrape_jobs (year, week, state) VALUES (?, ?, 'pending')",
+        [(int(year), int(week)) for year, week in list(weeks) + list(refresh)],
+    )
+    conn.executemany(
+        "UPDATE scrape_jobs SET state = 'pending', next_attempt_at = NULL WHERE year = ? AND week = ? AND state = 'done'",
+        [(int(year), int(week)) for year, week in refresh],
+    )
+    conn.commit()
+
+
+# Semaines éligibles : en attente, échecs dont le délai de reprise est écoulé,
+# semaines « running » abandonnées par une exécution interrompue, et semaines
+# trouvées vides dont la nouvelle vérification est due (anti-jointure : une
+# semaine qui a entre-temps des instructions en base n'est plus revérifiée)
+_CLAIMABLE = """
+    state = 'pending'
+    OR (state = 'failed' AND (next_attempt_at IS NULL OR next_attempt_at <= :now))
+    OR (state = 'running' AND claimed_at <= :stale)
+    OR (state = 'done' AND next_attempt_at <= :now
+        AND NOT EXISTS (SELECT 1 FROM instructions AS i
+                        WHERE i.year = scrape_jobs.year AND i.week = scrape_jobs.week))
+"""
+
+
+def claimable_count(conn, now=None):
+    """Nombre de semaines qui peuvent être réservées maintenant."""
+    now = now or datetime.now()
+    return conn.execute(f"SELECT COUNT(*) FROM scrape_jobs WHERE {_CLAIMABLE}",
+                        {"now": now, "stale": now - STALE_AFTER}).fetchone()[0]
+
+
+def claim_jobs(conn, limit, now=None, oldest_first=False):
+    """Réserve jusqu'à `limit` semaines éligibles, les plus récentes d'abord (ou les plus anciennes).
+
+    Les semaines jamais récupérées ou en échec passent avant les nouvelles
+    vérifications de semaines vides.
+    """
+    now = now or datetime.now()
+    order = "ASC" if oldest_first else "DESC"
+    rows = conn.execute(f"""
+        SELECT year, week FROM scrape_jobs
+        WHERE {_CLAIMABLE}
+        ORDER BY state = 'done', year {order}, week {order}
+        LIMIT :limit
+    """, {"now": now, "stale": now - STALE_AFTER, "limit": limit}).fetchall()
+
+    conn.executemany(
+        "UPDATE scrape_jobs SET state = 'running', claimed_at = ? WHERE year = ? AND week = ?",
+        [(now, year, week) for year, week in rows],
+    )
+    conn.commit()
+    return [(year, week) for year, week in rows]
+
+
+def complete_job(conn, year, week, instructions_found, now=None, http_status=None, duration=None):
+    """Marque une semaine comme traitée (point de reprise) et enregistre l'observation.
+
+    Une semaine vide est revérifiée plus tard, de plus en plus rarement
+    (`empty_recheck_delay`) ; une semaine avec des instructions ne l'est plus.
+    `attempts` compte les échecs consécutifs : il repart de zéro.
+    """
+    now = now or datetime.now()
+    empty_checks = 0
+    if not instructions_found:
+        empty_checks = conn.execute(
+            "SELECT empty_checks FROM scrape_jobs WHERE year = ? AND week = ?", (year, week)
+        ).fetchone()[0] + 1
+    next_attempt_at = now + empty_recheck_delay(empty_checks) if empty_checks else None
+    conn.execute("""
+        UPDATE scrape_jobs
+        SET state = 'done', attempts = 0, last_error = NULL, fetched_at = ?, claimed_at = NULL,
+            next_attempt_at = ?, instructions_found = ?, http_status = ?, fetch_duration = ?, empty_checks = ?
+        WHERE year = ? AND week = ?
+    """, (now, next_attempt_at, instructions_found, http_status, duration, empty_checks, year, week))
+    conn.commit()
+
+
+def empty_weeks(conn, weeks):
+    """Parmi `weeks`, les semaines déjà trouvées vides (nouvelles vérifications).
+
+    Leur page doit être revalidée auprès du serveur : servie depuis le cache,
+    une semaine ancienne resterait vide même après une publication tardive.
+    """
+    weeks = set(weeks)
+    return {(year, week) for year, week in conn.execute("SELECT year, week FROM scrape_jobs WHERE empty_checks > 0")
+            if (year, week) in weeks}
+
+
+def retry_delay(attempts):
+    """Délai avant la prochaine tentative après `attempts` échecs."""
+    return min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+
+
+def empty_recheck_delay(empty_checks):
+    """Délai avant de revérifier une semaine trouvée vide `empty_checks` fois de suite."""
+    return min(EMPTY_RECHECK_BASE_DELAY * (2 ** max(empty_checks - 1, 0)), EMPTY_RECHECK_MAX_DELAY)
+
+
+def fail_job(conn, year, week, error, now=None, http_status=None, duration=None):
+    """Enregistre un échec ; la semaine sera reprise plus tard, ou abandonnée."""
+    now = now or datetime.now()
+    attempts = conn.execute(
+        "SELECT attempts FROM scrape_jobs WHERE year = ? AND week = ?", (year, week)
+    ).fetchone()[0] + 1
+    state = ABANDONED if attempts >= MAX_ATTEMPTS else FAILED
+    conn.execute("""
+        UPDATE scrape_jobs
+        SET state = ?, attempts = ?, last_error = ?, claimed_at = NULL, next_attempt_at = ?,
+            http_status = ?, fetch_duration = ?
+        WHERE year = ? AND week = ?
+    """, (state, attempts, str(error), now + retry_delay(attempts), http_status, duration, year, week))
+    conn.commit()
+
+
+def record_week(conn, year, week, instructions, now=None, http_status=None, duration=None):
+    """Enregistre le résultat d'une semaine : liste d'instructions, ou None en cas d'échec.
+
+    `http_status` et `duration` décrivent la requête de la page de semaine.
+    """
+    if instructions is None:
+        error = f"page de semaine inaccessible (HTTP {http_status})" if http_status else "page de semaine inaccessible"
+        fail_job(conn, year, week, error, now, http_status, duration)
+    else:
+        complete_job(conn, year, week, len(instructions), now, http_status, duration)
+
+
+def done_weeks(conn):
+    """Semaines déjà traitées (ensemble vide si la file n'existe pas encore)."""
+    try:
+        return set(conn.execute("SELECT year, week FROM scrape_jobs WHERE state = 'done'").fetchall())
+    except sqlite3.OperationalError:
+        return set()
+
+
+def queue_summary(conn):
+    """Nombre de semaines par état."""
+    return dict(conn.execute("SELECT state, COUNT(*) FROM scrape_jobs GROUP BY state").fetchall())
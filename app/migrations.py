@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import history
+import scraper
+
+# --- Réparation des liens ---
+# Ancien scraper : lien absolu collé derrière l'adresse du site
+DOUBLED_PREFIX = scraper.BASE_URL + "https"
+
+
+def _repair_links(conn):
+    """Répare en deux requêtes les liens hérités des anciennes versions du scraper.
+
+    - préfixe dédoublé (`https://info.agriculture.gouv.frhttps://...`), sur le
+      lien et le lien PDF ;
+    - lien PDF absent ou identique au lien de la page : `<lien>/telechargement`.
+
+    Retourne les titres modifiés.
+    """
+    titles = [row[0] for row in conn.execute("""
+        UPDATE instructions
+        SET link = replace(link, :prefix, 'https'),
+            pdf_link = replace(pdf_link, :prefix, 'https')
+        WHERE substr(link, 1, length(:prefix)) = :prefix
+           OR substr(pdf_link, 1, length(:prefix)) = :prefix
+        RETURNING title
+    """, {"prefix": DOUBLED_PREFIX})]
+    titles += [row[0] for row in conn.execute("""
+        UPDATE instructions
+        SET pdf_link = rtrim(link, '/') || '/telechargement'
+        WHERE link IS NOT NULL AND link != ''
+          AND (pdf_link IS NULL OR pdf_link = '' OR pdf_link = link)
+        RETURNING title
+    """)]
+    return titles
+
+
+# --- Empreinte du contenu et historique ---
+def _content_hash(conn):
+    """Ajoute l'empreinte du contenu (calculée pour toutes les lignes) et l'historique des versions."""
+    history.ensure_history(conn)
+    return []
+
+
+# Migrations de données, appliquées une seule fois chacune, dans l'ordre
+MIGRATIONS = [
+    ("0001_repair_links", _repair_links),
+    ("0002_content_hash", _content_hash),
+]
+
+
+# --- Application ---
+def ensure_migrations_table(conn):
+    """Crée le registre des migrations appliquées."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMP,
+            rows_changed INTEGER
+        )
+    """)
+
+
+def applied_migrations(conn):
+    """Noms des migrations déjà appliquées."""
+    ensure_migrations_table(conn)
+    return {row[0] for row in conn.execute("SELECT name FROM schema_migrations")}
+
+
+def apply_migrations(conn, now=None):
+    """Applique les migrations non encore enregistrées : {nom: titres modifiés}.
+
+    Chaque migration et son enregistrement sont validés dans la même
+    transaction : une migration interrompue est rejouée au prochain appel, une
+    migration enregistrée ne l'est plus jamais.
+    """
+    done = applied_migrations(conn)
+    conn.commit()
+    changes = {}
+    for name, migration in MIGRATIONS:
+        if name in done:
+            continue
+        titles = migration(conn)
+        conn.execute("INSERT INTO schema_migrations VALUES (?, ?, ?)",
+                     (name, now or datetime.now(), len(titles)))
+        conn.commit()
+        changes[name] = titles
+    return changes
@@ -0,0 +1,100 @@
+import os
+import re
+from functools import lru_cache
+
+# --- Configuration ---
+# Ressources NLTK locales : préparées au déploiement (scripts/fetch_nltk_data.py)
+# ou, à défaut, téléchargées une seule fois par processus à la première
+# recherche. Rien n'est vérifié ni téléchargé au démarrage.
+NLTK_DATA_DIR = "data/nltk_data"
+
+# Ressources utilisées -> chemin recherché par nltk.data.find
+RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "wordnet": "corpora/wordnet",
+    "omw-1.4": "corpora/omw-1.4",
+}
+
+# Découpage de repli quand le tokeniseur punkt est absent
+WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=None)
+def _nltk():
+    """Importe NLTK au premier usage (import coûteux), ressources livrées en tête du chemin."""
+    import nltk
+
+    data_dir = os.path.abspath(NLTK_DATA_DIR)
+    if data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    return nltk
+
+
+def _find(resource):
+    try:
+        _nltk().data.find(RESOURCES[resource])
+    except LookupError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _download_missing():
+    """Télécharge dans `NLTK_DATA_DIR` les ressources absentes, une seule fois par processus."""
+    nltk = _nltk()
+    data_dir = os.path.abspath(NLTK_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    for resource in RESOURCES:
+        if not _find(resource):
+            nltk.download(resource, download_dir=data_dir, quiet=True)
+
+
+@lru_cache(maxsize=None)
+def available(resource):
+    """Vrai si la ressource est présente ; au premier manque, les ressources absentes
+    sont téléchargées (une seule tentative par processus)."""
+    if _find(resource):
+        return True
+    _download_missing()
+    return _find(resource)
+
+
+def missing_resources():
+    """Ressources toujours absentes (hors ligne) : la recherche fonctionne, en mode dégradé."""
+    return [resource for resource in RESOURCES if not available(resource)]
+
+
+@lru_cache(maxsize=None)
+def _lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+
+def tokenize(text):
+    """Découpe un texte en mots (punkt, ou expression régulière en repli)."""
+    if available("punkt"):
+        from nltk.tokenize import word_tokenize
+        return word_tokenize(text)
+    return WORD_RE.findall(text)
+
+
+def normalize_text(text):
+    """Normalise le texte : minuscules, puis lemmes si WordNet est disponible."""
+    words = tokenize(text.lower())
+    if available("wordnet"):
+        lemmatizer = _lemmatizer()
+        words = [lemmatizer.lemmatize(word) for word in words]
+    return ' '.join(words)
+
+
+def get_synonyms(word):
+    """Récupère les synonymes français d'un mot (aucun sans WordNet multilingue)."""
+    if not (available("wordnet") and available("omw-1.4")):
+        return set()
+    from nltk.corpus import wordnet
+
+    synonyms = set()
+    for syn in wordnet.synsets(word, lang='fra'):
+        for lemma in syn.lemmas(lang='fra'):
+            synonyms.add(lemma.name().lower())
+    return synonyms
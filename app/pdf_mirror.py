@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import requests
+import urllib3
+
+import database
+import http_client
+from pdf_store import MANIFEST_PATH, MIRROR_DIR, OBJECTS_DIR, blob_path
+
+# --- Configuration ---
+PARTIAL_DIR = os.path.join(MIRROR_DIR, "partial")
+
+# Téléchargements simultanés (politesse envers le site du ministère)
+DEFAULT_WORKERS = 4
+
+CHUNK_SIZE = 64 * 1024
+TIMEOUT = 60
+
+
+class MirrorError(Exception):
+    """Téléchargement incomplet ou contenu invalide."""
+
+
+# --- Stockage ---
+def open_manifest(path=MANIFEST_PATH):
+    """Ouvre le manifeste du miroir : instruction → PDF (empreinte)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pdf_mirror (
+            title TEXT PRIMARY KEY,
+            pdf_link TEXT,
+            sha256 TEXT,
+            size INTEGER,
+            etag TEXT,
+            last_modified TEXT,
+            mirrored_at TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pdf_mirror_sha256 ON pdf_mirror(sha256)")
+    conn.commit()
+    return conn
+
+
+def file_sha256(path):
+    """Empreinte SHA-256 d'un fichier, lu par blocs."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Téléchargement avec reprise ---
+def _partial_paths(url, partial_dir):
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(partial_dir, f"{key}.part"), os.path.join(partial_dir, f"{key}.json")
+
+
+def _content_range_total(header):
+    """Taille totale annoncée par un en-tête Content-Range (`bytes a-b/total`)."""
+    if header and "/" in header:
+        total = header.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    return None
+
+
+def _iter_received(response):
+    """Parcourt le corps d'une réponse au fil de la réception.
+
+    `read1` rend les octets dès qu'ils arrivent : en cas de coupure, tout ce qui a
+    été reçu a déjà été écrit et peut servir de point de reprise (`iter_content`
+    perdrait le dernier bloc incomplet).
+    """
+    read1 = getattr(response.raw, 'read1', None)
+    if read1 is None:
+        yield from response.iter_content(CHUNK_SIZE)
+        return
+    try:
+        while True:
+            chunk = read1(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    except (urllib3.exceptions.HTTPError, OSError) as e:
+        raise requests.ConnectionError(e)
+
+
+def download(session, url, objects_dir=OBJECTS_DIR, partial_dir=PARTIAL_DIR, timeout=TIMEOUT):
+    """Télécharge un PDF dans le miroir, en reprenant un téléchargement interrompu.
+
+    Le fichier partiel est conservé entre deux appels avec les validateurs de la
+    réponse ; la suite est demandée par `Range` + `If-Range`, et le serveur renvoie
+    le fichier entier s'il a changé entre-temps. Le contenu complet est vérifié
+    (taille annoncée, signature PDF) puis rangé sous son empreinte : un PDF
+    identique déjà présent n'est pas dupliqué.
+
+    Retourne {'sha256', 'size', 'etag', 'last_modified', 'resumed', 'deduplicated'}.
+    """
+    os.makedirs(partial_dir, exist_ok=True)
+    part_path, meta_path = _partial_paths(url, partial_dir)
+
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = meta.get("etag") or meta.get("last_modified")
+    if meta.get("url") != url or not validator:
+        offset = 0
+
+    headers = {}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        headers['If-Range'] = validator
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416 and offset:
+            # Rien à ajouter : le fichier partiel est peut-être déjà complet
+            expected = _content_range_total(response.headers.get('Content-Range'))
+            resumed, mode = True, None
+        elif response.status_code == 206 and offset:
+            expected = _content_range_total(response.headers.get('Content-Range'))
+            resumed, mode = True, 'ab'
+        else:
+            response.raise_for_status()
+            length = response.headers.get('Content-Length')
+            expected = int(length) if length and length.isdigit() else None
+            resumed, mode = False, 'wb'
+            meta = {"url": url, "etag": response.headers.get('ETag'),
+                    "last_modified": response.headers.get('Last-Modified')}
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+
+        if mode is not None:
+            with open(part_path, mode) as f:
+                for chunk in _iter_received(response):
+                    f.write(chunk)
+
+    size = os.path.getsize(part_path)
+    if expected is not None and size != expected:
+        # Le fichier partiel est gardé : le prochain appel reprendra à cet octet
+        raise MirrorError(f"Téléchargement incomplet ({size}/{expected} octets) : {url}")
+    with open(part_path, 'rb') as f:
+        if f.read(5) != b"%PDF-":
+            os.remove(part_path)
+            os.remove(meta_path)
+            raise MirrorError(f"Contenu reçu qui n'est pas un PDF : {url}")
+
+    sha256 = file_sha256(part_path)
+    target = blob_path(sha256, objects_dir)
+    deduplicated = os.path.exists(target)
+    if deduplicated:
+        os.remove(part_path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(part_path, target)
+    os.remove(meta_path)
+
+    return {"sha256": sha256, "size": size, "etag": meta.get("etag"),
+            "last_modified": meta.get("last_modified"), "resumed": resumed, "deduplicated": deduplicated}
+
+
+# --- Miroir ---
+def mirror_pdfs(db_path=database.DB_PATH, titles=None, workers=DEFAULT_WORKERS, session=None,
+                manifest_path=MANIFEST_PATH, objects_dir=OBJECTS_DIR, partial_dir=PARTIAL_DIR,
+                on_progress=None):
+    """Met en miroir les PDF des instructions absents du miroir ou dont le lien a changé.
+
+    Les téléchargements s'exécutent en parallèle (`workers`) ; le manifeste est
+    mis à jour au fil de l'eau. `on_progress(done, total, title, status)` est appelé
+    pour chaque PDF traité. Retourne les compteurs.
+    """
+    session = session or http_client.get_session()
+    stats = {"total": 0, "mirrored": 0, "deduplicated": 0, "resumed": 0, "skipped": 0, "failed": 0}
+
+    conn = database.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT title, pdf_link FROM instructions WHERE pdf_link IS NOT NULL AND pdf_link != ''"
+        ).fetchall()
+    finally:
+        conn.close()
+    if titles is not None:
+        wanted = set(titles)
+        rows = [row for row in rows if row[0] in wanted]
+
+    manifest = open_manifest(manifest_path)
+    try:
+        known = {title: (pdf_link, sha256) for title, pdf_link, sha256 in
+                 manifest.execute("SELECT title, pdf_link, sha256 FROM pdf_mirror")}
+        todo = []
+        for title, pdf_link in rows:
+            entry = known.get(title)
+            if entry and entry[0] == pdf_link and os.path.exists(blob_path(entry[1], objects_dir)):
+                stats["skipped"] += 1
+            else:
+                todo.append((title, pdf_link))
+        stats["total"] = len(rows)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(download, session, pdf_link, objects_dir, partial_dir): (title, pdf_link)
+                       for title, pdf_link in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                title, pdf_link = futures[future]
+                try:
+                    result = future.result()
+                except (requests.RequestException, MirrorError, OSError):
+                    status = "failed"
+                else:
+                    manifest.execute(
+                        "INSERT OR REPLACE INTO pdf_mirror VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (title, pdf_link, result["sha256"], result["size"], result["etag"],
+                         result["last_modified"], datetime.now()),
+                    )
+                    manifest.commit()
+                    status = "deduplicated" if result["deduplicated"] else "mirrored"
+                    stats["resumed"] += result["resumed"]
+                stats[status] += 1
+                if on_progress is not None:
+                    on_progress(done, len(todo), title, status)
+    finally:
+        manifest.close()
+    return stats
+
+
+def verify_mirror(manifest_path=MANIFEST_PATH, objects_dir=OBJECTS_DIR):
+    """Recalcule l'empreinte des PDF du miroir et retire les fichiers altérés.
+
+    Les instructions concernées seront retéléchargées au prochain `mirror_pdfs`.
+    Retourne la liste des empreintes retirées.
+    """
+    manifest = open_manifest(manifest_path)
+    try:
+        removed = []
+        for (sha256,) in manifest.execute("SELECT DISTINCT sha256 FROM pdf_mirror").fetchall():
+            path = blob_path(sha256, objects_dir)
+            if os.path.exists(path) and file_sha256(path) != sha256:
+                os.remove(path)
+                removed.append(sha256)
+        manifest.executemany("DELETE FROM pdf_mirror WHERE sha256 = ?", [(sha,) for sha in removed])
+        manifest.commit()
+        return removed
+    finally:
+        manifest.close()
+
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+
+# --- Configuration ---
+# Emplacement du miroir des PDF ; lecture seule ici (l'interface n'a pas besoin
+# de la pile HTTP de `pdf_mirror` pour servir une copie locale)
+MIRROR_DIR = "mirror"
+OBJECTS_DIR = os.path.join(MIRROR_DIR, "objects")
+MANIFEST_PATH = os.path.join(MIRROR_DIR, "manifest.db")
+
+
+# --- Stockage ---
+def blob_path(sha256, objects_dir=OBJECTS_DIR):
+    """Chemin d'un PDF du miroir, adressé par son empreinte SHA-256."""
+    return os.path.join(objects_dir, sha256[:2], f"{sha256}.pdf")
+
+
+# --- Lecture ---
+def local_pdf(title, manifest_path=MANIFEST_PATH, objects_dir=OBJECTS_DIR):
+    """Chemin de la copie locale du PDF d'une instruction, ou None."""
+    if not os.path.exists(manifest_path):
+        return None
+    conn = sqlite3.connect(manifest_path)
+    try:
+        row = conn.execute("SELECT sha256 FROM pdf_mirror WHERE title = ?", (title,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    path = blob_path(row[0], objects_dir)
+    return path if os.path.exists(path) else None
+
+
+def read_pdf(path):
+    """Contenu d'une copie locale, pour un bouton de téléchargement différé (lu au clic)."""
+    with open(path, 'rb') as f:
+        return f.read()
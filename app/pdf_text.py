@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import requests
+
+import database
+import http_client
+import scraper
+
+# --- Configuration ---
+# Téléchargements simultanés et débit par hôte (politesse envers le site du ministère)
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = scraper.DEFAULT_RATE
+DEFAULT_BURST = scraper.DEFAULT_BURST
+
+# Nouvelles tentatives par PDF en échec : attente exponentielle, plafonnée, puis abandon
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(days=1)
+RETRY_MAX_DELAY = timedelta(days=60)
+
+# Statuts définitifs : le PDF n'existe plus, inutile de réessayer
+PERMANENT_STATUSES = (404, 410)
+
+# Taille maximale d'un PDF téléchargé
+MAX_PDF_BYTES = 50 * 1024 * 1024
+
+# PDF téléchargés en attente d'extraction, par processus d'extraction : au-delà,
+# les téléchargements attendent qu'une extraction se termine (mémoire bornée)
+QUEUED_EXTRACTIONS_PER_PROCESS = 2
+
+CHUNK_SIZE = 64 * 1024
+TIMEOUT = 60
+
+
+# --- Extraction (exécutée dans un processus séparé) ---
+def extract_text(content):
+    """Extrait le texte d'un PDF : (texte, nombre de pages)."""
+    from pypdf import PdfReader
+
+    # Les avertissements de pypdf sur les PDF malformés remontent en exception ou sont sans effet
+    logging.getLogger("pypdf").setLevel(logging.ERROR)
+    reader = PdfReader(io.BytesIO(content))
+    pages = [page.extract_text() or "" for page in reader.pages]
+    return "\n".join(pages).strip(), len(pages)
+
+
+# --- Téléchargement ---
+def download_pdf(session, url, etag=None, last_modified=None, timeout=TIMEOUT):
+    """Télécharge un PDF en flux, avec requête conditionnelle.
+
+    Retourne None si le serveur répond 304, sinon (contenu, sha256, etag, last_modified).
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        digest = hashlib.sha256()
+        buffer = io.BytesIO()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            digest.update(chunk)
+            buffer.write(chunk)
+            if buffer.tell() > MAX_PDF_BYTES:
+                raise requests.RequestException(f"PDF trop volumineux : {url}")
+        return (buffer.getvalue(), digest.hexdigest(),
+                response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+
+async def _download_all(session, items, on_result, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                        burst=DEFAULT_BURST):
+    """Télécharge des PDF en parallèle : `items` est une liste de (clé, url, etag, last_modified).
+
+    Un seau à jetons par hôte (`scraper.TokenBucket`) borne le débit et un
+    sémaphore le nombre de téléchargements en vol. `on_result(key, result,
+    error)` est appelé dans la boucle après chaque PDF, avec le résultat de
+    `download_pdf` ou l'exception levée.
+    """
+    buckets = {}
+    semaphore = asyncio.Semaphore(workers)
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        async def _run(key, url, etag, last_modified):
+            host = urlparse(url).netloc
+            if host not in buckets:
+                buckets[host] = scraper.TokenBucket(rate, burst)
+            await buckets[host].acquire()
+            async with semaphore:
+                try:
+                    result = await loop.run_in_executor(executor, download_pdf, session, url, etag, last_modified)
+                except requests.RequestException as e:
+                    on_result(key, None, e)
+                    return
+            on_result(key, result, None)
+
+        await asyncio.gather(*(_run(*item) for item in items))
+
+
+def retry_delay(attempts):
+    """Délai avant la prochaine tentative après `attempts` échecs."""
+    return min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+
+
+# --- Sélection ---
+def pending_titles(conn, now=None):
+    """Instructions dont le PDF reste à traiter : jamais traité, lien modifié, ou
+    nouvelle tentative due après un échec. Les autres ne sont redemandées que si
+    leur fiche a changé."""
+    return [row[0] for row in conn.execute("""
+        SELECT i.title
+        FROM instructions AS i LEFT JOIN pdf_documents AS d ON d.title = i.title
+        WHERE i.pdf_link IS NOT NULL AND i.pdf_link != ''
+          AND (d.title IS NULL OR d.pdf_link IS NOT i.pdf_link
+               OR (d.error IS NOT NULL AND d.attempts < :max_attempts AND d.next_attempt_at <= :now))
+    """, {"max_attempts": MAX_ATTEMPTS, "now": now or datetime.now()})]
+
+
+# --- Lecture ---
+def load_text(conn, title):
+    """Texte extrait du PDF d'une instruction, ou None."""
+    row = conn.execute("""
+        SELECT t.text FROM pdf_documents AS d JOIN pdf_texts AS t ON t.sha256 = d.sha256
+        WHERE d.title = ?
+    """, (title,)).fetchone()
+    return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+
+# --- Pipeline ---
+def run(db_path=database.DB_PATH, titles=None, workers=DEFAULT_WORKERS, processes=None,
+        session=None, on_progress=None, now=None, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+    """Télécharge les PDF des instructions et en extrait le texte.
+
+    `titles` restreint le passage à ces instructions (la mise à jour hebdomadaire
+    passe les fiches modifiées et `pending_titles`) ; sans `titles`, tout le
+    corpus est revérifié. Les PDF en échec ne sont redemandés qu'à leur date de
+    nouvelle tentative (attente exponentielle, abandon après `MAX_ATTEMPTS`, ou
+    d'emblée sur 404/410), sauf si leur lien a changé.
+
+    Les téléchargements (bornés à `workers`, `rate` par seconde et par hôte)
+    s'exécutent dans des threads, l'extraction dans un pool de `processes`
+    processus ; les PDF en attente d'extraction sont bornés
+    (`QUEUED_EXTRACTIONS_PER_PROCESS`). Un PDF inchangé n'est pas retraité : le serveur répond 304 aux
+    requêtes conditionnelles, ou l'empreinte du contenu téléchargé est déjà
+    connue ; seul `checked_at` est alors noté, pas `changed_at`.
+    `on_progress(done, total, title, status)` est appelé pour chaque instruction.
+    Retourne les compteurs et les titres dont le texte a changé (`changed_titles`).
+    """
+    session = session or http_client.get_session()
+    now = now or datetime.now()
+    stats = {"total": 0, "deferred": 0, "not_modified": 0, "unchanged": 0, "extracted": 0, "failed": 0,
+             "bytes": 0}
+    started = time.perf_counter()
+
+    conn = database.connect(db_path)
+    try:
+        database.ensure_pdf_tables(conn)
+        conn.commit()
+        rows = conn.execute("""
+            SELECT i.title, i.pdf_link, d.pdf_link, d.etag, d.last_modified,
+                   d.title IS NULL OR d.pdf_link IS NOT i.pdf_link OR d.attempts = 0
+                   OR (d.attempts < :max_attempts AND d.next_attempt_at <= :now) AS due
+            FROM instructions AS i LEFT JOIN pdf_documents AS d ON d.title = i.title
+            WHERE i.pdf_link IS NOT NULL AND i.pdf_link != ''
+        """, {"max_attempts": MAX_ATTEMPTS, "now": now}).fetchall()
+        if titles is not None:
+            wanted = set(titles)
+            rows = [row for row in rows if row[0] in wanted]
+        due = [row[:5] for row in rows if row[5]]
+        stats["deferred"] = len(rows) - len(due)
+        rows = due
+        known_texts = {row[0] for row in conn.execute("SELECT sha256 FROM pdf_texts")}
+        stats["total"] = len(rows)
+        done = 0
+
+        def _finish(title, status):
+            nonlocal done
+            done += 1
+            stats[status] += 1
+            if on_progress is not None:
+                on_progress(done, len(rows), title, status)
+
+        def _record(title, pdf_link, sha256=None, size=None, etag=None, last_modified=None):
+            # Vérification réussie : `changed_at` ne bouge que si l'empreinte change
+            conn.execute("""
+                INSERT INTO pdf_documents (title, pdf_link, sha256, size, etag, last_modified,
+                                           changed_at, checked_at, attempts, next_attempt_at, error)
+                VALUES (:title, :pdf_link, :sha256, :size, :etag, :last_modified,
+                        CASE WHEN :sha256 IS NULL THEN NULL ELSE :now END, :now, 0, NULL, NULL)
+                ON CONFLICT(title) DO UPDATE SET
+                    pdf_link = excluded.pdf_link,
+                    sha256 = COALESCE(excluded.sha256, pdf_documents.sha256),
+                    size = COALESCE(excluded.size, pdf_documents.size),
+                    etag = COALESCE(excluded.etag, pdf_documents.etag),
+                    last_modified = COALESCE(excluded.last_modified, pdf_documents.last_modified),
+                    changed_at = CASE WHEN COALESCE(excluded.sha256, pdf_documents.sha256) IS pdf_documents.sha256
+                                      THEN pdf_documents.changed_at ELSE excluded.checked_at END,
+                    checked_at = excluded.checked_at,
+                    attempts = 0,
+                    next_attempt_at = NULL,
+                    error = NULL
+            """, {"title": title, "pdf_link": pdf_link, "sha256": sha256, "size": size, "etag": etag,
+                  "last_modified": last_modified, "now": now})
+            conn.commit()
+
+        def _record_failure(title, pdf_link, error, status=None, unreadable=False):
+            # Échec : nouvelle tentative de plus en plus tard ; un PDF illisible perd
+            # son empreinte et ses validateurs (texte retiré, retéléchargement complet)
+            row = conn.execute("SELECT attempts, sha256 FROM pdf_documents WHERE title = ?", (title,)).fetchone()
+            attempts = MAX_ATTEMPTS if status in PERMANENT_STATUSES else (row[0] if row else 0) + 1
+            conn.execute("""
+                INSERT INTO pdf_documents (title, pdf_link, checked_at, attempts, next_attempt_at, error)
+                VALUES (:title, :pdf_link, :now, :attempts, :next_attempt_at, :error)
+                ON CONFLICT(title) DO UPDATE SET
+                    pdf_link = excluded.pdf_link,
+                    checked_at = excluded.checked_at,
+                    attempts = excluded.attempts,
+                    next_attempt_at = excluded.next_attempt_at,
+                    error = excluded.error
+            """, {"title": title, "pdf_link": pdf_link, "now": now, "attempts": attempts,
+                  "next_attempt_at": now + retry_delay(attempts), "error": error})
+            if unreadable:
+                conn.execute("""
+                    UPDATE pdf_documents
+                    SET sha256 = NULL, etag = NULL, last_modified = NULL,
+                        changed_at = CASE WHEN sha256 IS NULL THEN changed_at ELSE :now END
+                    WHERE title = :title
+                """, {"title": title, "now": now})
+            conn.commit()
+
+        with ProcessPoolExecutor(max_workers=processes) as extractors:
+            links = {title: pdf_link for title, pdf_link, _, _, _ in rows}
+            # Extraction en cours → (empreinte, instructions qui partagent ce PDF)
+            extractions = {}
+            extracting = {}
+            max_queued = QUEUED_EXTRACTIONS_PER_PROCESS * (processes or os.cpu_count() or 1)
+
+            def _store(future):
+                sha256, documents = extractions.pop(future)
+                del extracting[sha256]
+                try:
+                    text, pages = future.result()
+                except Exception as e:
+                    # PDF illisible : il sera retéléchargé à sa prochaine tentative
+                    for title, pdf_link, _, _, _ in documents:
+                        _record_failure(title, pdf_link, f"Extraction impossible : {e}", unreadable=True)
+                        _finish(title, "failed")
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO pdf_texts (sha256, text, pages, extracted_at) VALUES (?, ?, ?, ?)",
+                    (sha256, zlib.compress(text.encode('utf-8')), pages, now),
+                )
+                # Empreinte connue une fois le texte enregistré : un échec sera retenté
+                known_texts.add(sha256)
+                for title, pdf_link, size, etag, last_modified in documents:
+                    _record(title, pdf_link, sha256, size, etag, last_modified)
+                    _finish(title, "extracted")
+
+            def on_download(title, result, error):
+                pdf_link = links[title]
+                if error is not None:
+                    response = getattr(error, "response", None)
+                    _record_failure(title, pdf_link, str(error), response.status_code if response is not None else None)
+                    _finish(title, "failed")
+                    return
+                if result is None:
+                    _record(title, pdf_link)
+                    _finish(title, "not_modified")
+                    return
+
+                content, sha256, etag, last_modified = result
+                stats["bytes"] += len(content)
+                if sha256 in known_texts:
+                    _record(title, pdf_link, sha256, len(content), etag, last_modified)
+                    _finish(title, "unchanged")
+                    return
+                document = (title, pdf_link, len(content), etag, last_modified)
+                if sha256 in extracting:
+                    # Même PDF qu'une extraction en cours : son texte servira aux deux
+                    extractions[extracting[sha256]][1].append(document)
+                    return
+                while len(extractions) >= max_queued:
+                    finished, _ = wait(extractions, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        _store(future)
+                extraction = extractors.submit(extract_text, content)
+                extractions[extraction] = (sha256, [document])
+                extracting[sha256] = extraction
+
+            # Lien modifié : les validateurs de l'ancien lien ne s'appliquent pas
+            items = [(title, pdf_link, etag, last_modified) if known_link == pdf_link else (title, pdf_link, None, None)
+                     for title, pdf_link, known_link, etag, last_modified in rows]
+            if items:
+                asyncio.run(_download_all(session, items, on_download, workers, rate, burst))
+
+            while extractions:
+                finished, _ = wait(extractions, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    _store(future)
+
+        # Textes nouveaux, modifiés ou retirés : publiés dans le changeset de la mise à jour
+        stats["changed_titles"] = [row[0] for row in conn.execute(
+            "SELECT title FROM pdf_documents WHERE changed_at = ? ORDER BY title", (now,))]
+    finally:
+        conn.close()
+
+    stats["duration"] = round(time.perf_counter() - started, 3)
+    return stats
@@ -0,0 +1,283 @@
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+
+import lxml.html
+import requests
+from bs4 import UnicodeDammit
+from lxml import etree
+
+import http_cache
+
+# --- Configuration ---
+BASE_URL = "https://info.agriculture.gouv.fr"
+
+# Politesse envers le serveur : requêtes par seconde et par hôte, rafale autorisée
+DEFAULT_RATE = 4.0
+DEFAULT_BURST = 4
+
+# Nombre maximal de requêtes simultanées
+DEFAULT_MAX_IN_FLIGHT = 4
+
+TIMEOUT = 15
+
+OBJET_PLACEHOLDER = "OBJET : Inconnu"
+RESUME_PLACEHOLDER = "RESUME : Inconnu"
+
+
+# --- Analyse des pages ---
+def week_url(year, week, base_url=BASE_URL):
+    """URL de la page d'une semaine du Bulletin Officiel."""
+    return f"{base_url}/boagri/historique/annee-{year}/semaine-{week}"
+
+
+def pdf_link_for(link):
+    """Lien de téléchargement du PDF d'une instruction (`<lien>/telechargement`)."""
+    if "/detail" in link:
+        return link.replace("/detail", "/telechargement")
+    return link.rstrip("/") + "/telechargement"
+
+
+# Lien absolu collé derrière l'adresse du site (`https://info.agriculture.gouv.frhttps://...`)
+_DOUBLED_PREFIX = re.compile(r"^https?://[^/]*?(?=https?:)")
+
+
+def canonical_link(link):
+    """Forme canonique d'un lien : préfixe dédoublé retiré, schéma et hôte en
+    minuscules, https pour le site du ministère, sans fragment ni barre finale."""
+    if not link:
+        return link
+    parts = urlsplit(_DOUBLED_PREFIX.sub("", link.strip()))
+    scheme, host = parts.scheme.lower(), parts.netloc.lower()
+    if host == urlsplit(BASE_URL).netloc:
+        scheme = "https"
+    path = parts.path.rstrip("/") if parts.path != "/" else parts.path
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def canonical_links(link, pdf_link):
+    """Liens canoniques d'une instruction : (lien, lien PDF).
+
+    Un lien PDF absent ou identique au lien de la page est recalculé.
+    """
+    link = canonical_link(link)
+    pdf_link = canonical_link(pdf_link)
+    if link and (not pdf_link or pdf_link == link):
+        pdf_link = pdf_link_for(link)
+    return link, pdf_link
+
+
+# Sélecteurs XPath précompilés : seuls les nœuds utiles sont parcourus, en C
+_SDSSA_LINKS = etree.XPath("//a[@href][contains(string(.), 'SDSSA')]")
+_LABEL_TAG = etree.XPath("//b[string(.) = $label]")
+
+
+def _document(content):
+    """Construit l'arbre lxml d'une page (décodage identique à BeautifulSoup), ou None."""
+    if isinstance(content, bytes):
+        content = UnicodeDammit(content, ['utf-8']).unicode_markup
+    if not content or not content.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(content)
+    except etree.ParserError:
+        return None
+
+
+def parse_week_listing(content, base_url=BASE_URL):
+    """Extrait les liens SDSSA d'une page de semaine : [(titre, lien, lien_pdf)]."""
+    document = _document(content)
+    if document is None:
+        return []
+
+    listing = []
+    for a in _SDSSA_LINKS(document):
+        link = urljoin(base_url + "/", a.get('href'))
+        listing.append((a.text_content(), link, pdf_link_for(link)))
+    return listing
+
+
+def _labelled_text(document, label, placeholder):
+    """Texte qui suit immédiatement la balise <b> portant le libellé donné."""
+    tags = _LABEL_TAG(document, label=label)
+    if tags and tags[0].tail is not None:
+        return tags[0].tail.strip()
+    return placeholder
+
+
+def parse_detail(content):
+    """Extrait l'objet et le résumé d'une page de détail."""
+    document = _document(content)
+    if document is None:
+        return OBJET_PLACEHOLDER, RESUME_PLACEHOLDER
+    return (_labelled_text(document, "OBJET : ", OBJET_PLACEHOLDER),
+            _labelled_text(document, "RESUME : ", RESUME_PLACEHOLDER))
+
+
+# --- Limitation de débit ---
+class TokenBucket:
+    """Seau à jetons asynchrone : `rate` requêtes par seconde, rafales de `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# --- Moteur de scraping concurrent ---
+class AsyncScraper:
+    """Récupère pages de semaine et pages de détail en parallèle.
+
+    Les requêtes HTTP (bloquantes) s'exécutent dans un pool de threads piloté par
+    asyncio ; un seau à jetons par hôte borne le débit et un sémaphore borne le
+    nombre de requêtes en vol. Par défaut les pages passent par le cache de
+    réponses (`http_cache`) : les réponses servies depuis le cache ne consomment
+    pas de jeton.
+    """
+
+    def __init__(self, session=None, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, base_url=BASE_URL, timeout=TIMEOUT):
+        self.session = session or http_cache.get_cached_session()
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.base_url = base_url
+        self.timeout = timeout
+        self.requests_made = 0
+        self._buckets = {}
+        self._on_fetch = None
+        self._revalidate = set()
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    async def fetch(self, url, revalidate=False):
+        """Télécharge une URL en respectant débit et concurrence : (statut, contenu).
+
+        `revalidate` : avec une session à cache, la réponse en cache n'est pas
+        servie telle quelle mais revalidée par le serveur.
+        """
+        is_fresh = getattr(self.session, 'is_fresh', None)
+        options = {'revalidate': True} if revalidate and is_fresh else {}
+        if not (is_fresh and is_fresh(url, **options)):
+            await self._bucket(url).acquire()
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(
+                self._executor, lambda: self.session.get(url, timeout=self.timeout, **options)
+            )
+            self.requests_made += 1
+            return response.status_code, response.content
+
+    async def fetch_detail(self, title, link, pdf_link):
+        """Récupère objet et résumé d'une instruction (valeurs par défaut en cas d'échec)."""
+        try:
+            status, content = await self.fetch(link)
+            if status == 200:
+                objet, resume = parse_detail(content)
+                return title, link, pdf_link, objet, resume
+        except requests.RequestException:
+            pass
+        return title, link, pdf_link, OBJET_PLACEHOLDER, RESUME_PLACEHOLDER
+
+    async def scrape_week(self, year, week):
+        """Récupère les instructions d'une semaine, détails compris.
+
+        Retourne la liste des instructions, ou None si la page de semaine est inaccessible.
+        """
+        started = time.perf_counter()
+        try:
+            status, content = await self.fetch(week_url(year, week, self.base_url),
+                                               revalidate=(year, week) in self._revalidate)
+        except requests.RequestException:
+            status = None
+        if self._on_fetch is not None:
+            self._on_fetch(year, week, status, time.perf_counter() - started)
+        if status != 200:
+            return None
+
+        listing = parse_week_listing(content, self.base_url)
+        return list(await asyncio.gather(*(self.fetch_detail(*item) for item in listing)))
+
+    async def scrape_weeks(self, weeks, on_week=None, on_fetch=None, revalidate=()):
+        """Récupère plusieurs semaines en parallèle : {(année, semaine): instructions ou None}.
+
+        `on_week(year, week, instructions)` est appelé à la fin de chaque semaine ;
+        `on_fetch(year, week, status, duration)` dès la réponse de la page de
+        semaine (statut None si le serveur n'a pas répondu). Les pages des
+        semaines de `revalidate` ne sont jamais servies du cache sans requête.
+        """
+        self._on_fetch = on_fetch
+        self._revalidate = set(revalidate)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        results = {}
+
+        async def _run(year, week):
+            instructions = await self.scrape_week(year, week)
+            results[(year, week)] = instructions
+            if on_week is not None:
+                on_week(year, week, instructions)
+
+        try:
+            await asyncio.gather(*(_run(year, week) for year, week in weeks))
+        finally:
+            self._executor.shutdown(wait=False)
+        return results
+
+    async def scrape_details(self, items, on_detail=None):
+        """Récupère des pages de détail en parallèle : {titre: (statut, objet, résumé)}.
+
+        `items` est une liste de (titre, lien). Le statut vaut None si le serveur
+        n'a pas répondu ; objet et résumé valent alors None. `on_detail(title,
+        status)` est appelé après chaque page.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        results = {}
+
+        async def _run(title, link):
+            try:
+                status, content = await self.fetch(link)
+            except requests.RequestException:
+                status, content = None, None
+            objet, resume = parse_detail(content) if status == 200 else (None, None)
+            results[title] = (status, objet, resume)
+            if on_detail is not None:
+                on_detail(title, status)
+
+        try:
+            await asyncio.gather(*(_run(title, link) for title, link in items))
+        finally:
+            self._executor.shutdown(wait=False)
+        return results
+
+
+def scrape_weeks(weeks, on_week=None, on_fetch=None, revalidate=(), **options):
+    """Point d'entrée synchrone du moteur concurrent (voir `AsyncScraper`)."""
+    return asyncio.run(AsyncScraper(**options).scrape_weeks(weeks, on_week=on_week, on_fetch=on_fetch,
+                                                            revalidate=revalidate))
+
+
+def scrape_details(items, on_detail=None, **options):
+    """Point d'entrée synchrone de `AsyncScraper.scrape_details`."""
+    return asyncio.run(AsyncScraper(**options).scrape_details(items, on_detail=on_detail))
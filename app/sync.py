@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from collections import namedtuple
+
+import changesets
+import http_client
+from database import DB_PATH, integrity_error
+
+# --- Configuration ---
+GITHUB_RAW_URL = "https://raw.githubusercontent.com/M00N69/sdssa-instructions-app/main/data/sdssa_instructions.db"
+CHANGESET_BASE_URL = "https://raw.githubusercontent.com/M00N69/sdssa-instructions-app/main/data/changesets"
+
+CHUNK_SIZE = 64 * 1024
+
+# Statuts possibles d'une synchronisation
+NOT_MODIFIED = "not_modified"  # Réponse 304 : rien n'a été téléchargé
+UNCHANGED = "unchanged"        # Fichier téléchargé mais identique à la copie locale
+UPDATED = "updated"            # Nouvelle version installée
+PATCHED = "patched"            # Changesets appliqués sur la base locale
+
+SyncResult = namedtuple("SyncResult", ["status", "sha256", "bytes_downloaded"])
+
+
+class SyncError(Exception):
+    """Erreur de synchronisation (HTTP, fichier corrompu...)."""
+
+
+# --- État de synchronisation ---
+def state_path(local_path):
+    """Chemin du fichier d'état (validateurs HTTP et empreinte) associé à la base."""
+    return f"{local_path}.sync.json"
+
+
+def load_state(local_path):
+    """Lit l'état de la dernière synchronisation, ou un état vide."""
+    try:
+        with open(state_path(local_path), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(local_path, state):
+    """Enregistre l'état de synchronisation de façon atomique."""
+    path = state_path(local_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path):
+    """Calcule l'empreinte SHA-256 d'un fichier par blocs."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_integrity(path):
+    """Vérifie qu'un fichier est une base SQLite saine (`PRAGMA integrity_check`)."""
+    error = integrity_error(path)
+    if error is not None:
+        raise SyncError(f"Fichier téléchargé invalide: {error}")
+
+
+# --- Synchronisation ---
+def sync_database(url=GITHUB_RAW_URL, local_path=DB_PATH, force=False, session=None,
+                  before_replace=None, timeout=30):
+    """Synchronise la base locale avec la version distante.
+
+    La requête est conditionnelle (If-None-Match / If-Modified-Since) : si rien n'a
+    changé, une seule réponse 304 est échangée. Sinon le fichier est téléchargé par
+    blocs dans un fichier temporaire en calculant son empreinte au fil de l'eau,
+    vérifié avec `PRAGMA integrity_check`, puis installé atomiquement avec `os.replace`.
+
+    `before_replace(local_path)` est appelé avant le remplacement d'une base existante
+    (sauvegarde). `force=True` ignore les validateurs et réinstalle le fichier.
+    """
+    http = session or http_client.get_session()
+    state = load_state(local_path)
+    local_exists = os.path.exists(local_path)
+
+    headers = {}
+    # Les validateurs ne valent que pour l'URL qui les a fournis
+    if local_exists and not force and state.get('url') == url:
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+    with http.get(url, headers=headers, stream=True, timeout=timeout, allow_redirects=True) as response:
+        if response.status_code == 304:
+            return SyncResult(NOT_MODIFIED, state.get('sha256'), 0)
+        if response.status_code != 200:
+            raise SyncError(f"Erreur HTTP {response.status_code}")
+
+        directory = os.path.dirname(os.path.abspath(local_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".sync_", suffix=".part", dir=directory)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            new_hash = digest.hexdigest()
+            validators = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'sha256': new_hash,
+            }
+
+            if local_exists and not force:
+                local_hash = state.get('sha256') or file_sha256(local_path)
+                if new_hash == local_hash:
+                    os.remove(tmp_path)
+                    state.update(validators)
+                    save_state(local_path, state)
+                    return SyncResult(UNCHANGED, new_hash, size)
+
+            check_integrity(tmp_path)
+
+            if local_exists and before_replace is not None:
+                before_replace(local_path)
+
+            os.replace(tmp_path, local_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    state.update(validators)
+    save_state(local_path, state)
+    return SyncResult(UPDATED, new_hash, size)
+
+
+# --- Synchronisation par changesets ---
+def _fetch(http, url, timeout):
+    with http.get(url, timeout=timeout) as response:
+        if response.status_code != 200:
+            raise SyncError(f"Erreur HTTP {response.status_code} ({url})")
+        return response.content
+
+
+def sync_changesets(base_url=CHANGESET_BASE_URL, local_path=DB_PATH, session=None,
+                    max_behind=changesets.MAX_CHANGESETS_BEHIND, timeout=30):
+    """Met à jour la base locale en appliquant uniquement les changesets manquants.
+
+    Le manifeste est lu avec une requête conditionnelle (une réponse 304 si rien n'a
+    été publié). Retourne None si la base doit être remplacée par la version
+    complète (version locale inconnue, retard trop important).
+    """
+    http = session or http_client.get_session()
+    state = load_state(local_path)
+    manifest_url = f"{base_url}/{changesets.MANIFEST_NAME}"
+
+    conn = sqlite3.connect(local_path)
+    try:
+        local_version = changesets.get_version(conn)
+        if local_version is None:
+            return None
+
+        headers = {}
+        if state.get('manifest_url') == manifest_url and state.get('manifest_version') == local_version:
+            if state.get('manifest_etag'):
+                headers['If-None-Match'] = state['manifest_etag']
+            if state.get('manifest_last_modified'):
+                headers['If-Modified-Since'] = state['manifest_last_modified']
+
+        with http.get(manifest_url, headers=headers, timeout=timeout) as response:
+            if response.status_code == 304:
+                return SyncResult(NOT_MODIFIED, state.get('sha256'), 0)
+            if response.status_code == 404:
+                # Aucun changeset publié : seule la base complète est disponible
+                return None
+            if response.status_code != 200:
+                raise SyncError(f"Erreur HTTP {response.status_code} ({manifest_url})")
+            manifest = response.json()
+            manifest_etag = response.headers.get('ETag')
+            manifest_last_modified = response.headers.get('Last-Modified')
+
+        pending = changesets.plan_changesets(manifest, local_version, max_behind=max_behind)
+        if pending is None:
+            return None
+
+        size = 0
+        for entry in pending:
+            payload = _fetch(http, f"{base_url}/{entry['file']}", timeout)
+            size += len(payload)
+            records = changesets.parse_changeset(payload, entry.get('sha256'))
+            # Texte des PDF modifiés (recherche plein texte), publié dans un fichier voisin
+            pdf_records = []
+            if entry.get('pdf_file'):
+                pdf_payload = _fetch(http, f"{base_url}/{entry['pdf_file']}", timeout)
+                size += len(pdf_payload)
+                pdf_records = changesets.parse_changeset(pdf_payload, entry.get('pdf_sha256'), changesets.PDF_OPS)
+            changesets.apply_changeset(conn, records, entry['version'], pdf_records)
+            local_version = entry['version']
+    except changesets.ChangesetError as e:
+        raise SyncError(str(e)) from e
+    finally:
+        conn.close()
+
+    state.update({
+        'manifest_url': manifest_url,
+        'manifest_etag': manifest_etag,
+        'manifest_last_modified': manifest_last_modified,
+        'manifest_version': local_version,
+    })
+    save_state(local_path, state)
+    return SyncResult(PATCHED if pending else UNCHANGED, state.get('sha256'), size)
+
+
+def update_local_database(local_path=DB_PATH, force=False, session=None, before_replace=None,
+                          url=GITHUB_RAW_URL, base_url=CHANGESET_BASE_URL):
+    """Synchronise la base locale : changesets publiés sous `base_url` si possible,
+    sinon base complète téléchargée depuis `url`."""
+    if not force and os.path.exists(local_path):
+        result = sync_changesets(base_url=base_url, local_path=local_path, session=session)
+        if result is not None:
+            return result
+    return sync_database(url=url, local_path=local_path, force=force, session=session,
+                         before_replace=before_replace)
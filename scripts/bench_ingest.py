@@ -0,0 +1,109 @@
+"""Benchmark de bout en bout de l'ingestion, sans réseau.
+
+Démarre le faux site de `mock_boagri` (latence et taux d'erreur réglables) et
+exécute `scripts/update_script.py` contre lui, sur une base vide dans un
+répertoire temporaire, en trois passages :
+
+1. rattrapage : toutes les semaines depuis --weeks semaines, cache HTTP froid ;
+2. reprise : les semaines en échec sont retentées (délai de reprise avancé) ;
+3. relance : nouvelle exécution, cache HTTP chaud.
+
+Pour chaque passage : durée, requêtes reçues par le faux site, requêtes/s,
+semaines en échec et instructions ajoutées.
+
+    python scripts/bench_ingest.py --weeks 26 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from mock_boagri import MockConfig, MockServer
+
+UPDATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "update_script.py")
+DB_NAME = "data/bench.db"
+
+
+def create_database(workdir):
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    conn = sqlite3.connect(os.path.join(workdir, DB_NAME))
+    conn.execute("""
+        CREATE TABLE instructions (
+            year INTEGER, week INTEGER, title TEXT, link TEXT, pdf_link TEXT,
+            objet TEXT, resume TEXT, last_updated TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+def run_update(workdir, base_url, since, workers):
+    """Exécute la CLI de mise à jour : (durée, statistiques JSON)."""
+    command = [sys.executable, UPDATE_SCRIPT, "--db", DB_NAME, "--json", "--base-url", base_url,
+               "--since", since.strftime("%Y-%m-%d"), "--workers", str(workers)]
+    start = time.perf_counter()
+    output = subprocess.run(command, cwd=workdir, check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - start, json.loads(output[output.index("{"):])
+
+
+def retry_now(workdir):
+    """Avance le délai de reprise des semaines en échec (équivaut à attendre)."""
+    conn = sqlite3.connect(os.path.join(workdir, DB_NAME))
+    conn.execute("UPDATE scrape_jobs SET next_attempt_at = NULL WHERE state = 'failed'")
+    conn.commit()
+    conn.close()
+
+
+def report(label, elapsed, served, stats):
+    requests_count = sum(served.values())
+    print(f"  {label:<26} {elapsed:7.2f} s  {requests_count:5d} requêtes  {requests_count / elapsed:7.1f} req/s  "
+          f"{stats['weeks_checked']:3d} semaines  {stats['weeks_failed']:3d} en échec  "
+          f"{stats['inserted']:4d} ajoutées")
+    return {"label": label, "elapsed": round(elapsed, 3), "requests": requests_count,
+            "responses": {str(k): v for k, v in served.items()},
+            **{k: stats[k] for k in ("weeks_checked", "weeks_failed", "inserted", "updated")}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=26, help="semaines à rattraper")
+    parser.add_argument("--per-week", type=int, default=3, help="instructions SDSSA par semaine")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence par requête (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="latence aléatoire supplémentaire (s)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="part des réponses 503")
+    parser.add_argument("--page-size", type=int, default=20000, help="taille des pages HTML (octets)")
+    parser.add_argument("--workers", type=int, default=4, help="requêtes simultanées")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="afficher les résultats au format JSON")
+    args = parser.parse_args()
+
+    config = MockConfig(per_week=args.per_week, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, page_size=args.page_size, seed=args.seed)
+    since = datetime.now() - timedelta(weeks=args.weeks)
+    results = []
+
+    with MockServer(config) as server, tempfile.TemporaryDirectory() as workdir:
+        create_database(workdir)
+        print(f"⏱ Ingestion de {args.weeks} semaines sur {server.base_url} "
+              f"(latence {args.latency}s, erreurs {args.error_rate:.0%})")
+
+        for label, prepare in (("rattrapage (cache froid)", None),
+                               ("reprise des échecs", retry_now),
+                               ("relance (cache chaud)", retry_now)):
+            if prepare is not None:
+                prepare(workdir)
+            server.stats.clear()
+            elapsed, stats = run_update(workdir, server.base_url, since, args.workers)
+            results.append(report(label, elapsed, dict(server.stats), stats))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark et contrôle de référence de l'analyse HTML des pages boagri.
+
+Compare, sur les pages enregistrées de scripts/fixtures/boagri, l'analyse
+historique (BeautifulSoup sur la page entière) à l'analyse lxml de `scraper`.
+Le script échoue si les deux analyses n'extraient pas exactement les mêmes
+valeurs, puis affiche le temps moyen par page.
+
+    python scripts/bench_parsing.py --repeat 200
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "boagri")
+
+
+# 📌 Analyse historique (référence)
+def legacy_parse_week_listing(content, base_url=scraper.BASE_URL):
+    soup = BeautifulSoup(content, 'html.parser')
+    instructions = soup.find_all('a', href=True)
+    result = []
+    for a in [a for a in instructions if 'SDSSA' in a.text]:
+        href = a['href']
+        if not href.startswith(('http://', 'https://')):
+            href = f"{base_url}{href}"
+        result.append((a.text, href, scraper.pdf_link_for(href)))
+    return result
+
+
+def legacy_parse_detail(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    objet_tag = soup.find('b', string="OBJET : ")
+    objet = objet_tag.next_sibling.strip() if objet_tag and objet_tag.next_sibling else scraper.OBJET_PLACEHOLDER
+    resume_tag = soup.find('b', string="RESUME : ")
+    resume = resume_tag.next_sibling.strip() if resume_tag and resume_tag.next_sibling else scraper.RESUME_PLACEHOLDER
+    return objet, resume
+
+
+def load_fixtures(prefix):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, f"{prefix}*.html"))):
+        with open(path, 'rb') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+# 📌 Contrôle de référence
+def check_golden(listings, details):
+    failures = 0
+    for name, content in listings.items():
+        expected, actual = legacy_parse_week_listing(content), scraper.parse_week_listing(content)
+        status = "OK" if expected == actual else "ÉCART"
+        print(f"  {status:<6} {name}: {len(actual)} liens SDSSA")
+        failures += expected != actual
+    for name, content in details.items():
+        expected, actual = legacy_parse_detail(content), scraper.parse_detail(content)
+        status = "OK" if expected == actual else "ÉCART"
+        print(f"  {status:<6} {name}: objet={actual[0][:40]!r}")
+        failures += expected != actual
+    return failures
+
+
+def bench(label, func, pages, repeat):
+    total = 0.0
+    for content in pages.values():
+        total += timeit.timeit(lambda: func(content), number=repeat)
+    per_page = total / (repeat * len(pages)) * 1000
+    print(f"  {label:<28} {per_page:8.3f} ms/page")
+    return per_page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="nombre d'analyses par page")
+    args = parser.parse_args()
+
+    listings = load_fixtures("week_")
+    details = load_fixtures("detail_")
+
+    print("🔎 Contrôle de référence (extraction identique)")
+    failures = check_golden(listings, details)
+    if failures:
+        print(f"❌ {failures} page(s) extraites différemment")
+        sys.exit(1)
+
+    print("⏱ Pages de semaine")
+    legacy = bench("BeautifulSoup (historique)", legacy_parse_week_listing, listings, args.repeat)
+    fast = bench("lxml + XPath", scraper.parse_week_listing, listings, args.repeat)
+    print(f"  gain x{legacy / fast:.1f}")
+
+    print("⏱ Pages de détail")
+    legacy = bench("BeautifulSoup (historique)", legacy_parse_detail, details, args.repeat)
+    fast = bench("lxml + XPath", scraper.parse_detail, details, args.repeat)
+    print(f"  gain x{legacy / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
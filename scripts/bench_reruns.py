@@ -0,0 +1,135 @@
+"""Mesure du temps de rerun de l'application, par interaction.
+
+Lance `app/app.py` avec le testeur de Streamlit (`AppTest`) sur une copie de
+la base dans un répertoire temporaire, puis chronomètre le premier affichage
+et une série d'interactions courantes : saisie d'une recherche, page suivante
+du tableau, choix d'une année, ouverture des onglets Visualisation et Mise à
+jour, changement de format d'export.
+
+Pour chaque interaction, deux durées sont comparées :
+
+- rerun complet : le testeur relance toujours tout le script, comme le
+  faisait chaque interaction avant le découpage en fragments ;
+- fragment seul : durée de la région (fragment) qui contient le widget,
+  relevée par l'application (`run_timings`) pendant ce même rerun ; c'est ce
+  qu'exécute un navigateur quand le widget ne relance que son fragment.
+
+Les changements d'onglet relancent toute l'application : pas de fragment.
+
+    python scripts/bench_reruns.py [--repeat 3] [--json]
+
+Chaque interaction est répétée `--repeat` fois ; la médiane est affichée.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+APP_PATH = os.path.join(ROOT, "app", "app.py")
+DB_PATH = os.path.join(ROOT, "data", "sdssa_instructions.db")
+
+
+def timed(action):
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+
+def find(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+def select_tab(at, label):
+    """Ouvre un onglet (les onglets paresseux ne calculent que l'onglet ouvert).
+
+    Le testeur ne sait pas cliquer sur un onglet : l'onglet actif est posé
+    dans l'état de session, sous la clé des onglets de l'application.
+    """
+    at.session_state["active_tab"] = label
+    return at.run()
+
+
+def interactions():
+    """Interactions mesurées : (libellé, fragment du widget ou None, action sur l'application déjà affichée)."""
+    return [
+        ("saisie d'une recherche", "Onglet Recherche", lambda at: at.text_input[0].input("hygiène").run()),
+        ("effacement de la recherche", "Onglet Recherche", lambda at: at.text_input[0].input("").run()),
+        ("page suivante", "Onglet Recherche",
+         lambda at: next(b for b in at.button if b.label.startswith("Suivante")).click().run()),
+        ("choix d'une année", "Onglet Recherche", lambda at: find(at.selectbox, "Année").select(2024).run()),
+        ("onglet Visualisation", None, lambda at: select_tab(at, "📊 Visualisation")),
+        ("détail d'une année", "Onglet Visualisation",
+         lambda at: find(at.selectbox, "Détailler une année").select(2024).run()),
+        ("onglet Mise à jour", None, lambda at: select_tab(at, "⚙️ Mise à jour")),
+        ("format d'export", "Export", lambda at: find(at.selectbox, "Format").select("jsonl").run()),
+    ]
+
+
+def region_time(at, region):
+    """Durée (s) de la dernière exécution d'une région, relevée par l'application."""
+    return at.session_state["run_timings"][region][0]
+
+
+def median(values):
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure du temps de rerun par interaction")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions de chaque scénario")
+    parser.add_argument("--json", action="store_true", help="Affiche les médianes en JSON")
+    args = parser.parse_args()
+
+    full, fragment = {}, {}
+    cwd = os.getcwd()
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Copie de la base : l'application crée ses index et tables dérivées
+            os.makedirs(os.path.join(tmp, "data"))
+            shutil.copy(DB_PATH, os.path.join(tmp, "data"))
+            os.chdir(tmp)
+            try:
+                at = AppTest.from_file(APP_PATH, default_timeout=300)
+                full.setdefault("premier affichage", []).append(timed(at.run))
+                full.setdefault("rerun sans changement", []).append(timed(at.run))
+                for label, region, action in interactions():
+                    full.setdefault(label, [])
+                    fragment.setdefault(label, [])
+                    try:
+                        full[label].append(timed(lambda: action(at)))
+                    except StopIteration:
+                        continue
+                    if at.exception:
+                        print(f"⚠️ {label}: {at.exception[0].value}")
+                    elif region is not None:
+                        fragment[label].append(region_time(at, region))
+            finally:
+                os.chdir(cwd)
+
+    medians = {label: {"full_rerun": median(values), "fragment": median(fragment.get(label, []))}
+               for label, values in full.items()}
+    if args.json:
+        print(json.dumps(medians, ensure_ascii=False, indent=2))
+        return
+
+    def ms(value):
+        return f"{value * 1000:8.0f} ms" if value is not None else f"{'—':>11}"
+
+    print(f"⏱️ Temps de rerun (médiane sur {args.repeat} passages)")
+    print(f"  {'':<28} {'rerun complet':>14} {'fragment seul':>14}")
+    for label, value in medians.items():
+        if value["full_rerun"] is None:
+            print(f"  {label:<28} {'indisponible':>14}")
+            continue
+        print(f"  {label:<28} {ms(value['full_rerun']):>14} {ms(value['fragment']):>14}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
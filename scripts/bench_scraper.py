@@ -0,0 +1,77 @@
+"""Benchmark du scraping : parcours séquentiel historique vs moteur asyncio.
+
+Les deux parcours interrogent le faux site boagri local de `mock_boagri` (aucun
+accès réseau) avec une latence simulée par requête.
+
+    python scripts/bench_scraper.py --weeks 20 --per-week 3 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import http_client
+import scraper
+from mock_boagri import start_mock_server
+
+
+# 📌 Parcours séquentiel (comportement historique de l'application)
+def scrape_sequential(weeks, base_url, delay):
+    session = requests.Session()
+    results = {}
+    request_count = 0
+    for year, week in weeks:
+        response = session.get(scraper.week_url(year, week, base_url), timeout=scraper.TIMEOUT)
+        request_count += 1
+        instructions = []
+        for title, link, pdf_link in scraper.parse_week_listing(response.content, base_url):
+            detail = session.get(link, timeout=scraper.TIMEOUT)
+            request_count += 1
+            instructions.append((title, link, pdf_link) + scraper.parse_detail(detail.content))
+            time.sleep(delay)
+        results[(year, week)] = instructions
+    return results, request_count
+
+
+def report(label, elapsed, request_count, instruction_count):
+    print(f"{label:<12} {elapsed:8.2f} s  {request_count:5d} requêtes  "
+          f"{request_count / elapsed:7.1f} req/s  {instruction_count:4d} instructions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=20, help="nombre de semaines à rattraper")
+    parser.add_argument("--per-week", type=int, default=3, help="instructions SDSSA par semaine")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence simulée par requête (s)")
+    parser.add_argument("--delay", type=float, default=0.5, help="pause du parcours séquentiel (s)")
+    parser.add_argument("--rate", type=float, default=scraper.DEFAULT_RATE, help="requêtes/s par hôte (asyncio)")
+    parser.add_argument("--burst", type=int, default=scraper.DEFAULT_BURST, help="rafale autorisée (asyncio)")
+    parser.add_argument("--max-in-flight", type=int, default=scraper.DEFAULT_MAX_IN_FLIGHT,
+                        help="requêtes simultanées (asyncio)")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.per_week, args.latency)
+    weeks = [(2024, week) for week in range(1, args.weeks + 1)]
+    try:
+        start = time.perf_counter()
+        results, request_count = scrape_sequential(weeks, base_url, args.delay)
+        report("séquentiel", time.perf_counter() - start, request_count,
+               sum(len(v) for v in results.values()))
+
+        # Session sans cache de réponses : chaque requête atteint le faux site
+        engine = scraper.AsyncScraper(session=http_client.create_session(), rate=args.rate, burst=args.burst,
+                                      max_in_flight=args.max_in_flight, base_url=base_url)
+        start = time.perf_counter()
+        results = asyncio.run(engine.scrape_weeks(weeks))
+        report("asyncio", time.perf_counter() - start, engine.requests_made,
+               sum(len(v or []) for v in results.values()))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Mesure et garde-fou du temps d'import au démarrage de l'application.
+
+Rejoue, dans un processus neuf lancé avec `python -X importtime`, les imports
+de premier niveau de `app/app.py` (ceux exécutés avant le premier affichage).
+Dans ce même passage, le socle incompressible (streamlit et pandas, importés
+en premier) est séparé du surcoût de l'application : temps cumulé des autres
+imports de premier niveau, qui ne comptent que les modules qu'ils chargent
+en plus du socle. Les modules chargés par le démarrage de l'interpréteur
+(`site`, `encodings`..., relevés par un passage `python -c pass`) sont exclus
+des deux mesures. Contrôles :
+
+1. aucun module différé (NLTK, Whoosh, scraping, PDF, images) n'est importé
+   au démarrage ;
+2. le surcoût des imports propres à l'application reste sous `--max-extra-ms`.
+
+Le passage est répété `--repeat` fois ; la médiane de chaque mesure est
+retenue. Le script échoue si un contrôle n'est pas respecté.
+
+    python scripts/bench_startup.py [--repeat 5] [--max-extra-ms 50] [--top 10] [--json]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+# Socle importé par toute page Streamlit : hors du périmètre de l'application
+BASELINE_MODULES = ("streamlit", "pandas")
+
+# Paquets chargés seulement au premier usage (recherche, mise à jour, PDF)
+DEFERRED_PACKAGES = ("nltk", "whoosh", "bs4", "lxml", "requests", "urllib3", "PIL", "pypdf")
+
+
+def startup_imports():
+    """Imports de premier niveau de app.py, dans l'ordre du fichier."""
+    with open(APP_PATH, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), APP_PATH)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_times(code):
+    """Lance `code` sous `-X importtime` : {module: temps cumulé en µs} des imports de premier niveau, modules chargés."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True)
+    top_level, loaded = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        loaded.add(name.strip())
+        # Les imports imbriqués sont indentés : seul le premier niveau est additionné
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, loaded
+
+
+def interpreter_modules():
+    """Modules chargés par le seul démarrage de l'interpréteur (`python -c pass`)."""
+    return import_times("pass")[1]
+
+
+def measure(code, repeat):
+    """Médianes (ms) du socle et du surcoût de l'application, mesurés dans les mêmes
+    passages ; détail du dernier passage, hors démarrage de l'interpréteur."""
+    interpreter = interpreter_modules()
+    baselines, extras = [], []
+    for _ in range(repeat):
+        top_level, loaded = import_times(code)
+        top_level = {name: us for name, us in top_level.items() if name not in interpreter}
+        baselines.append(sum(us for name, us in top_level.items() if name in BASELINE_MODULES) / 1000)
+        extras.append(sum(us for name, us in top_level.items() if name not in BASELINE_MODULES) / 1000)
+    return statistics.median(baselines), statistics.median(extras), top_level, loaded
+
+
+def check(label, ok):
+    print(f"  {'OK' if ok else 'ÉCART':<6} {label}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage de l'application")
+    parser.add_argument("--repeat", type=int, default=5, help="Répétitions de chaque mesure")
+    parser.add_argument("--max-extra-ms", type=float, default=50, help="Surcoût maximal des imports de l'application")
+    parser.add_argument("--top", type=int, default=10, help="Nombre de modules les plus coûteux affichés")
+    parser.add_argument("--json", action="store_true", help="Affiche les mesures en JSON")
+    args = parser.parse_args()
+
+    code = startup_imports()
+    # Le socle est importé en premier : les imports suivants ne mesurent que leur surcoût
+    code = "\n".join(f"import {name}" for name in BASELINE_MODULES) + "\n" + code
+    baseline, extra, top_level, loaded = measure(code, args.repeat)
+    deferred = sorted(name for name in loaded if name.split(".")[0] in DEFERRED_PACKAGES)
+    deferred_roots = sorted({name.split(".")[0] for name in deferred})
+    heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "baseline_ms": round(baseline, 1),
+            "extra_ms": round(extra, 1),
+            "deferred_loaded": deferred_roots,
+            "heaviest": {name: round(us / 1000, 1) for name, us in heaviest},
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"⏱️ Imports au démarrage (médiane sur {args.repeat} passages)")
+        print(f"  socle streamlit + pandas   {baseline:8.0f} ms")
+        print(f"  surcoût de l'application   {extra:8.0f} ms")
+        print("📦 Modules de premier niveau les plus coûteux")
+        for name, us in heaviest:
+            print(f"  {name:<26} {us / 1000:8.0f} ms")
+
+    ok = check(f"modules différés absents au démarrage: {', '.join(deferred_roots) or 'aucun'}", not deferred)
+    ok &= check(f"surcoût {extra:.0f} ms ≤ {args.max_extra_ms:.0f} ms", extra <= args.max_extra_ms)
+    if not ok:
+        print("❌ Démarrage trop lent")
+        sys.exit(1)
+    print("✅ Démarrage conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Contrôle des agrégats par semaine de l'onglet Visualisation.
+
+Construit une base temporaire (schéma d'origine, avec des instructions), puis
+vérifie qu'après chaque écriture les agrégats tenus à jour par déclencheurs
+sont identiques à un recalcul complet depuis la table des instructions :
+
+1. premier calcul sur la base existante ;
+2. insertion et changement de semaine (`upsert_instructions`) ;
+3. chargement en masse (`bulk_load`) ;
+4. mise à jour de la seule date (complétion d'une fiche) ;
+5. suppression d'une instruction (semaine vidée).
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_aggregates.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import aggregates
+import database
+import ingest
+from checks import LAST_UPDATED, create_database
+
+BASE = "https://info.agriculture.gouv.fr/boagri/instruction-2024-"
+
+
+def instruction(n, objet=None):
+    return (f"DGAL/SDSSA/2024-{n}", f"{BASE}{n}", f"{BASE}{n}/telechargement", objet or f"Objet {n}", f"Résumé {n}")
+
+
+def recomputed(conn):
+    return conn.execute("""
+        SELECT year, week, COUNT(*), MAX(last_updated) FROM instructions GROUP BY year, week ORDER BY year, week
+    """).fetchall()
+
+
+def maintained(conn):
+    return conn.execute("SELECT year, week, count, last_updated FROM week_counts ORDER BY year, week").fetchall()
+
+
+def check(label, conn):
+    actual, expected = maintained(conn), recomputed(conn)
+    status = "OK" if actual == expected else "ÉCART"
+    print(f"  {status:<6} {label}: {len(actual)} semaines, {sum(row[2] for row in actual)} instructions")
+    if actual != expected:
+        print(f"         attendu : {expected}\n         obtenu  : {actual}")
+    return actual == expected
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, [(2024, 10 + n % 3) + instruction(n) + (LAST_UPDATED,) for n in range(100, 110)])
+        conn = database.connect(db_path)
+
+        print("🔎 Agrégats par semaine")
+        ingest.prepare(conn)
+        ok &= check("premier calcul", conn)
+
+        ingest.upsert_instructions(conn, 2024, 12, [instruction(100), instruction(200)],
+                                   now=datetime(2024, 3, 20, 9))
+        conn.commit()
+        ok &= check("insertion et changement de semaine", conn)
+
+        ingest.bulk_load(conn, [(2024, 13, *instruction(n)) for n in range(300, 305)]
+                         + [(2024, 11, *instruction(101, "Objet 101 (modifié)"))], now=datetime(2024, 3, 27, 9))
+        conn.commit()
+        ok &= check("chargement en masse", conn)
+
+        conn.execute("UPDATE instructions SET last_updated = '2024-04-02 08:00:00.000000' WHERE title = ?",
+                     (instruction(102)[0],))
+        conn.commit()
+        ok &= check("date de mise à jour seule", conn)
+
+        conn.execute("DELETE FROM instructions WHERE week = 12")
+        conn.commit()
+        ok &= check("semaine vidée", conn)
+
+        cube = aggregates.load_week_counts(conn)
+        summary = aggregates.summary(cube)
+        total = conn.execute("SELECT COUNT(*) FROM instructions").fetchone()[0]
+        status = "OK" if summary['total'] == total else "ÉCART"
+        print(f"  {status:<6} total: {summary['total']}")
+        ok &= summary['total'] == total
+        conn.close()
+
+    if not ok:
+        print("❌ Agrégats incorrects")
+        sys.exit(1)
+    print("✅ Agrégats conformes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare une base SQLite au jeu de référence CSV des instructions.
+
+Vérifie qu'une base reconstruite (update_script.py --backfill) contient les
+mêmes instructions que data/sdssa_instructions_2019_2025.csv : mêmes titres,
+mêmes année/semaine, liens, objet et résumé (aux fins de ligne près). Les
+instructions publiées après la période du CSV sont ignorées. Le script échoue
+s'il trouve un écart.
+
+Pour une base reconstruite depuis le faux site (scripts/mock_boagri.py), les
+liens sont ramenés sur le site de référence avec `--base-url`.
+
+    python scripts/update_script.py --backfill --db data/rebuild.db
+    python scripts/check_backfill.py data/rebuild.db [--base-url http://127.0.0.1:8765]
+"""
+import argparse
+import sqlite3
+import sys
+
+import pandas as pd
+
+CSV_PATH = "data/sdssa_instructions_2019_2025.csv"
+COLUMNS = ["year", "week", "title", "link", "pdf_link", "objet", "resume"]
+
+# Site dont proviennent les liens du jeu de référence
+REFERENCE_BASE_URL = "https://info.agriculture.gouv.fr"
+LINK_COLUMNS = ["link", "pdf_link"]
+
+
+def load_database(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query(f"SELECT {', '.join(COLUMNS)} FROM instructions", conn)
+    finally:
+        conn.close()
+
+
+def rebase_links(frame, base_url):
+    """Ramène sur le site de référence les liens d'une base reconstruite depuis `base_url`."""
+    base_url = base_url.rstrip("/")
+    if base_url == REFERENCE_BASE_URL:
+        return frame
+    frame = frame.copy()
+    for column in LINK_COLUMNS:
+        frame[column] = [REFERENCE_BASE_URL + value[len(base_url):]
+                         if isinstance(value, str) and value.startswith(base_url + "/") else value
+                         for value in frame[column]]
+    return frame
+
+
+def _normalized(value):
+    """Valeur comparable : l'analyse HTML convertit les fins de ligne Windows."""
+    return str(value).replace("\r\n", "\n").strip()
+
+
+def compare(expected, actual):
+    """Retourne la liste des écarts (titre, colonne, attendu, obtenu)."""
+    expected = expected.set_index("title")
+    last_week = max(expected[["year", "week"]].itertuples(index=False, name=None))
+    actual = actual[[week <= last_week for week in actual[["year", "week"]].itertuples(index=False, name=None)]]
+    actual = actual.set_index("title")
+
+    differences = []
+    for title in expected.index.difference(actual.index):
+        differences.append((title, "absente", "", ""))
+    for title in actual.index.difference(expected.index):
+        differences.append((title, "en trop", "", ""))
+    for title in expected.index.intersection(actual.index):
+        for column in COLUMNS:
+            if column == "title":
+                continue
+            left, right = expected.at[title, column], actual.at[title, column]
+            if _normalized(left) != _normalized(right):
+                differences.append((title, column, left, right))
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db", help="base SQLite à contrôler")
+    parser.add_argument("--csv", default=CSV_PATH, help="jeu de référence")
+    parser.add_argument("--base-url", default=REFERENCE_BASE_URL,
+                        help="site depuis lequel la base a été reconstruite (faux site local)")
+    args = parser.parse_args()
+
+    expected = pd.read_csv(args.csv)[COLUMNS]
+    actual = rebase_links(load_database(args.db), args.base_url)
+    differences = compare(expected, actual)
+
+    for title, column, left, right in differences[:50]:
+        print(f"  ÉCART {title} [{column}] {str(left)[:40]!r} ≠ {str(right)[:40]!r}")
+    if differences:
+        print(f"❌ {len(differences)} écart(s) sur {len(expected)} instructions de référence")
+        sys.exit(1)
+    print(f"✅ {len(expected)} instructions identiques au jeu de référence")
+
+
+if __name__ == "__main__":
+    main()
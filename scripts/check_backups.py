@@ -0,0 +1,118 @@
+"""Contrôle du magasin de sauvegardes (dédupliqué, compressé, borné).
+
+Dans un répertoire temporaire, sauvegarde puis restaure une base de test :
+
+1. déduplication : une base inchangée n'ajoute ni sauvegarde ni fichier, seule
+   sa date est rafraîchie ;
+2. rétention : au-delà de `KEEP_BACKUPS` versions distinctes, les plus
+   anciennes et leurs fichiers sont supprimés ;
+3. restauration : la base retrouve le contenu sauvegardé, la base remplacée est
+   elle-même sauvegardée ; une sauvegarde corrompue est refusée sans toucher à
+   la base ;
+4. reprise des anciennes copies `backups/*.db`.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_backups.py
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import backups
+from checks import check
+
+
+def write_version(db_path, version):
+    """Base de test dont le contenu dépend de `version`."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS instructions (title TEXT PRIMARY KEY, resume TEXT)")
+    conn.execute("INSERT OR REPLACE INTO instructions VALUES ('DGAL/SDSSA/2024-100', ?)", (f"Version {version}",))
+    conn.commit()
+    conn.close()
+
+
+def read_version(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT resume FROM instructions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def stored_objects():
+    return len([name for name in os.listdir(backups.OBJECTS_DIR) if name.endswith(".db.gz")])
+
+
+def main():
+    ok = True
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Les chemins du magasin sont relatifs au répertoire de l'application
+        os.chdir(tmp)
+        try:
+            os.makedirs(backups.BACKUP_DIR)
+            db_path = "instructions.db"
+
+            print("🔎 Déduplication")
+            write_version(db_path, 1)
+            first = backups.create_backup(db_path, created_at="2024-03-01T10:00:00")
+            again = backups.create_backup(db_path, created_at="2024-03-02T10:00:00")
+            ok &= check("même empreinte", again["sha256"], first["sha256"])
+            ok &= check("sauvegardes / fichiers", (len(backups.list_backups()), stored_objects()), (1, 1))
+            ok &= check("date rafraîchie", backups.list_backups()[0]["created_at"], "2024-03-02T10:00:00")
+
+            print("🔎 Rétention")
+            for version in range(2, 9):
+                write_version(db_path, version)
+                backups.create_backup(db_path, created_at=f"2024-03-{version + 1:02d}T10:00:00")
+            entries = backups.list_backups()
+            ok &= check("sauvegardes gardées", len(entries), backups.KEEP_BACKUPS)
+            ok &= check("fichiers gardés", stored_objects(), backups.KEEP_BACKUPS)
+            ok &= check("plus récentes d'abord", [entry["created_at"][8:10] for entry in entries],
+                        ["09", "08", "07", "06", "05"])
+
+            print("🔎 Restauration")
+            oldest = entries[-1]
+            backups.restore_backup(oldest["sha256"], db_path)
+            ok &= check("contenu restauré", read_version(db_path), "Version 4")
+            labels = [entry["label"] for entry in backups.list_backups()]
+            ok &= check("base remplacée sauvegardée", (labels.count("pre_restore"), len(labels)),
+                        (1, backups.KEEP_BACKUPS))
+            ok &= check("téléchargement", gzip.decompress(backups.read_backup(oldest["sha256"]))[:15],
+                        b"SQLite format 3")
+
+            corrupted = backups.list_backups()[-1]["sha256"]
+            with gzip.open(backups.object_path(corrupted), 'wb') as f:
+                f.write(b"pas une base SQLite" * 100)
+            try:
+                backups.restore_backup(corrupted, db_path)
+                refused = False
+            except backups.BackupError:
+                refused = True
+            ok &= check("sauvegarde corrompue refusée", (refused, read_version(db_path)), (True, "Version 4"))
+
+            print("🔎 Anciennes copies")
+            write_version(db_path, 9)
+            shutil.copy(db_path, os.path.join(backups.BACKUP_DIR, "sdssa_instructions_20240320_101500.db"))
+            backups.import_legacy_backups()
+            imported = [(entry["created_at"], entry["label"]) for entry in backups.list_backups()
+                        if entry["created_at"].startswith("2024-03-20")]
+            ok &= check("copie intégrée", imported, [("2024-03-20T10:15:00", "auto")])
+            ok &= check("copie supprimée", [name for name in os.listdir(backups.BACKUP_DIR) if name.endswith(".db")],
+                        [])
+        finally:
+            os.chdir(cwd)
+
+    if not ok:
+        print("❌ Sauvegardes incorrectes")
+        sys.exit(1)
+    print("✅ Sauvegardes conformes")
+
+
+if __name__ == "__main__":
+    main()
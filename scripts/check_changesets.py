@@ -0,0 +1,137 @@
+"""Contrôle de la production et de l'application des changesets.
+
+Sans réseau (le transport est contrôlé par scripts/check_sync.py), publie des
+changesets depuis une base source puis les applique sur une copie :
+
+1. plan : base à jour, changesets manquants dans l'ordre, et repli sur la base
+   complète (version inconnue, version en avance, changeset purgé, retard
+   supérieur à `MAX_CHANGESETS_BEHIND`) ;
+2. application : mises à jour et insertions, empreinte de contenu effacée,
+   version enregistrée ;
+3. changeset corrompu (empreinte ou ligne invalide) : rejeté, la base et sa
+   version restent inchangées ;
+4. rétention : seuls les `KEEP_CHANGESETS` derniers fichiers sont gardés.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_changesets.py
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import changesets
+from checks import check
+
+
+def create_source(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE instructions ({', '.join(changesets.CHANGESET_FIELDS)}, content_hash TEXT)")
+    conn.executemany(
+        "INSERT INTO instructions (year, week, title, resume, content_hash) VALUES (2024, 10, ?, 'Initial', 'h')",
+        [(f"DGAL/SDSSA/2024-{n}",) for n in range(100, 103)],
+    )
+    conn.commit()
+    return conn
+
+
+def read_changeset(directory, entry):
+    with open(os.path.join(directory, entry["file"]), 'rb') as f:
+        return f.read()
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "changesets")
+        source_path = os.path.join(tmp, "source.db")
+        client_path = os.path.join(tmp, "client.db")
+        source = create_source(source_path)
+        changesets.write_changeset(source, [f"DGAL/SDSSA/2024-{n}" for n in range(100, 103)], directory)
+        source.close()
+        shutil.copy(source_path, client_path)
+
+        print("🔎 Plan des changesets")
+        source = sqlite3.connect(source_path)
+        source.execute("UPDATE instructions SET resume = 'Modifié' WHERE title = 'DGAL/SDSSA/2024-100'")
+        source.execute("INSERT INTO instructions (year, week, title, resume) "
+                       "VALUES (2024, 11, 'DGAL/SDSSA/2024-110', 'Nouvelle')")
+        changesets.write_changeset(source, ["DGAL/SDSSA/2024-100", "DGAL/SDSSA/2024-110"], directory)
+        source.execute("UPDATE instructions SET resume = 'Modifié deux fois' WHERE title = 'DGAL/SDSSA/2024-101'")
+        changesets.write_changeset(source, ["DGAL/SDSSA/2024-101"], directory)
+        manifest = changesets.load_manifest(directory)
+
+        def versions(local_version, max_behind=changesets.MAX_CHANGESETS_BEHIND, plan_manifest=manifest):
+            pending = changesets.plan_changesets(plan_manifest, local_version, max_behind=max_behind)
+            return None if pending is None else [entry["version"] for entry in pending]
+
+        ok &= check("base à jour", versions(3), [])
+        ok &= check("changesets manquants", versions(1), [2, 3])
+        ok &= check("version inconnue", versions(None), None)
+        ok &= check("version en avance", versions(4), None)
+        ok &= check("retard trop important", versions(1, max_behind=1), None)
+        purged = dict(manifest, changesets=[entry for entry in manifest["changesets"] if entry["version"] != 2])
+        ok &= check("changeset purgé", versions(1, plan_manifest=purged), None)
+
+        print("🔎 Application")
+        client = sqlite3.connect(client_path)
+        for entry in changesets.plan_changesets(manifest, changesets.get_version(client)):
+            records = changesets.parse_changeset(read_changeset(directory, entry), entry["sha256"])
+            changesets.apply_changeset(client, records, entry["version"])
+        rows = {title: (resume, content_hash) for title, resume, content_hash in
+                client.execute("SELECT title, resume, content_hash FROM instructions")}
+        ok &= check("version appliquée", changesets.get_version(client), 3)
+        ok &= check("instructions", (rows["DGAL/SDSSA/2024-100"], rows["DGAL/SDSSA/2024-101"],
+                                     rows["DGAL/SDSSA/2024-102"], rows["DGAL/SDSSA/2024-110"][0]),
+                    (("Modifié", None), ("Modifié deux fois", None), ("Initial", "h"), "Nouvelle"))
+
+        print("🔎 Changeset corrompu")
+        source.execute("UPDATE instructions SET resume = 'Jamais appliqué' WHERE title = 'DGAL/SDSSA/2024-102'")
+        changesets.write_changeset(source, ["DGAL/SDSSA/2024-102"], directory)
+        entry = changesets.load_manifest(directory)["changesets"][-1]
+        payload = read_changeset(directory, entry)
+        rejected = []
+        for label, corrupted, sha256 in (("empreinte", payload.replace(b"Jamais", b"Parfois"), entry["sha256"]),
+                                         ("ligne", payload + b"{\"op\": \"delete\", \"title\": \"x\"}\n", None)):
+            try:
+                changesets.parse_changeset(corrupted, sha256)
+            except changesets.ChangesetError:
+                rejected.append(label)
+        ok &= check("changesets rejetés", rejected, ["empreinte", "ligne"])
+
+        # Dernière ligne impossible à écrire : tout le changeset est annulé
+        records = changesets.parse_changeset(payload, entry["sha256"])
+        records.append({"op": "upsert", "title": "DGAL/SDSSA/2024-120", "year": [2024]})
+        try:
+            changesets.apply_changeset(client, records, entry["version"])
+        except sqlite3.Error:
+            pass
+        resume = client.execute("SELECT resume FROM instructions WHERE title = 'DGAL/SDSSA/2024-102'").fetchone()[0]
+        ok &= check("échec d'application annulé", (resume, changesets.get_version(client)), ("Initial", 3))
+        client.close()
+
+        print("🔎 Rétention")
+        keep = changesets.KEEP_CHANGESETS
+        changesets.KEEP_CHANGESETS = 3
+        try:
+            for _ in range(5):
+                changesets.write_changeset(source, ["DGAL/SDSSA/2024-100"], directory)
+        finally:
+            changesets.KEEP_CHANGESETS = keep
+        manifest = changesets.load_manifest(directory)
+        files = sorted(name for name in os.listdir(directory) if name != changesets.MANIFEST_NAME)
+        ok &= check("fichiers gardés", files, [entry["file"] for entry in manifest["changesets"]])
+        ok &= check("versions gardées", [entry["version"] for entry in manifest["changesets"]], [7, 8, 9])
+        source.close()
+
+    if not ok:
+        print("❌ Changesets incorrects")
+        sys.exit(1)
+    print("✅ Changesets conformes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Contrôle de l'interface en ligne de commande (scripts/update_script.py).
+
+Lance le script dans un répertoire temporaire, sur une base vide et le faux
+site local (`mock_boagri`), et vérifie :
+
+1. `--json` : la sortie standard est un unique document JSON ;
+2. `--dry-run` : les compteurs annoncent les insertions, mais la base n'est pas
+   modifiée (ni instructions, ni file des semaines) ;
+3. exécution réelle : elle insère exactement ce que `--dry-run` annonçait ;
+4. un nouveau `--dry-run` ne trouve plus rien à insérer.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_cli.py
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from checks import check, create_database
+from mock_boagri import MockConfig, MockServer
+
+UPDATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "update_script.py")
+PER_WEEK = 2
+
+
+def run_cli(workdir, *args):
+    """Lance le script ; retourne (code de sortie, JSON décodé ou None, sortie brute)."""
+    result = subprocess.run([sys.executable, UPDATE_SCRIPT, "--json", *args],
+                            cwd=workdir, capture_output=True, text=True)
+    try:
+        return result.returncode, json.loads(result.stdout), result.stdout
+    except ValueError:
+        return result.returncode, None, result.stdout + result.stderr
+
+
+def database_state(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = sorted(row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        return tables, conn.execute("SELECT COUNT(*) FROM instructions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main():
+    since = (datetime.now() - timedelta(weeks=3)).strftime("%Y-%m-%d")
+
+    ok = True
+    with MockServer(MockConfig(per_week=PER_WEEK, pdf=False)) as server, tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path)
+        options = ["--db", db_path, "--since", since, "--base-url", server.base_url]
+
+        print(f"🔎 update_script.py depuis le {since}")
+        before = database_state(db_path)
+        code, planned, output = run_cli(tmp, "--dry-run", *options)
+        ok &= check("--dry-run --json : code et JSON", (code, planned is not None), (0, True))
+        if planned is None:
+            print(output)
+            sys.exit(1)
+        ok &= check("--dry-run : insertions annoncées", (planned["dry_run"], planned["inserted"] > 0), (True, True))
+        ok &= check("--dry-run : base inchangée", database_state(db_path), before)
+
+        code, stats, output = run_cli(tmp, *options)
+        ok &= check("exécution : code et JSON", (code, stats is not None), (0, True))
+        if stats is None:
+            print(output)
+            sys.exit(1)
+        ok &= check("exécution : comme annoncé",
+                    {key: stats[key] for key in ("weeks_checked", "inserted", "dry_run")},
+                    {"weeks_checked": planned["weeks_checked"], "inserted": planned["inserted"], "dry_run": False})
+        ok &= check("exécution : instructions en base", database_state(db_path)[1], planned["inserted"])
+
+        code, replanned, _ = run_cli(tmp, "--dry-run", *options)
+        ok &= check("nouveau --dry-run", (code, replanned and replanned["inserted"]), (0, 0))
+
+    if not ok:
+        print("❌ Interface en ligne de commande incorrecte")
+        sys.exit(1)
+    print("✅ Interface en ligne de commande conforme")
+
+
+if __name__ == "__main__":
+    main()
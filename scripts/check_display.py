@@ -0,0 +1,83 @@
+"""Contrôle des colonnes d'affichage des tableaux de résultats.
+
+Construit une base temporaire (objet absent, vide, court ou long ; semaines à
+un et deux chiffres) et vérifie :
+
+1. `affichage_date` au format `2024-S07` ;
+2. `objet_court` : extrait de `SHORT_TEXT_LENGTH` caractères suivi de `...`,
+   vide (et non None) si l'objet est absent ;
+3. la liste complète (`load_list_frame`) et une page lue par SQLite
+   (`list_page`) portent les mêmes colonnes d'affichage ;
+4. sur une liste de `--rows` lignes, le calcul vectorisé reste sous
+   `--max-ms`.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_display.py [--rows 50000] [--max-ms 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import database
+from checks import check, create_database
+
+LONG_OBJET = "Objet très long " * 20
+
+# (semaine, titre, objet) -> (affichage_date, objet_court) attendus
+CASES = {
+    (7, "DGAL/SDSSA/2024-100", None): ("2024-S07", ""),
+    (7, "DGAL/SDSSA/2024-101", ""): ("2024-S07", ""),
+    (12, "DGAL/SDSSA/2024-102", "Objet court"): ("2024-S12", "Objet court"),
+    (52, "DGAL/SDSSA/2024-103", LONG_OBJET): ("2024-S52", LONG_OBJET[:database.SHORT_TEXT_LENGTH] + "..."),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle des colonnes d'affichage")
+    parser.add_argument("--rows", type=int, default=50000, help="Lignes de la liste mesurée")
+    parser.add_argument("--max-ms", type=float, default=200, help="Durée maximale du calcul des colonnes")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, [(2024,) + case for case in CASES], ("year", "week", "title", "objet"))
+        with database.connect(db_path) as conn:
+            frame = database.load_list_frame(conn)
+            page, _ = database.list_page(conn, sort="title", descending=False)
+
+        print("🔎 Colonnes d'affichage")
+        displayed = {title: (date, objet) for date, title, objet in
+                     frame[database.DISPLAY_COLUMNS].itertuples(index=False, name=None)}
+        for (week, title, objet), expected in CASES.items():
+            ok &= check(f"{title} (objet {'absent' if objet is None else len(objet)})",
+                        displayed[title], expected)
+        ok &= check("liste et page identiques",
+                    frame.sort_values("title")[database.DISPLAY_COLUMNS].reset_index(drop=True)
+                    .equals(page[database.DISPLAY_COLUMNS].reset_index(drop=True)), True)
+
+    print(f"⏱️ Calcul sur {args.rows} lignes")
+    large = pd.DataFrame({
+        "year": [2019 + n % 7 for n in range(args.rows)],
+        "week": [1 + n % 53 for n in range(args.rows)],
+        "objet_court": [None if n % 9 == 0 else f"Objet {n}" for n in range(args.rows)],
+    })
+    started = time.perf_counter()
+    database.add_display_columns(large)
+    duration = (time.perf_counter() - started) * 1000
+    ok &= check(f"{duration:.0f} ms ≤ {args.max_ms:.0f} ms", duration <= args.max_ms, True)
+
+    if not ok:
+        print("❌ Colonnes d'affichage incorrectes")
+        sys.exit(1)
+    print("✅ Colonnes d'affichage conformes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Contrôle de la complétion des fiches incomplètes.
+
+Construit une base temporaire dont certaines fiches sont restées à « OBJET :
+Inconnu » / « RESUME : Inconnu », avec des liens vers le faux site local
+(`mock_boagri`), une page absente (404) et un serveur injoignable, puis vérifie :
+
+1. la sélection passe par l'index partiel des fiches incomplètes ;
+2. premier passage : les pages disponibles complètent leur fiche (seuls les
+   champs par défaut sont remplacés), la page absente est abandonnée d'emblée,
+   le serveur injoignable est reprogrammé ;
+3. deuxième passage immédiat : rien n'est redemandé (attente) ;
+4. passage un jour plus tard : seule la fiche reprogrammée est redemandée ;
+5. seules les fiches complétées sont à réindexer.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_enrich.py
+"""
+import os
+import socket
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import database
+import enrich
+import http_client
+import scraper
+
+from checks import LAST_UPDATED, check, create_database
+from mock_boagri import MockConfig, MockServer
+
+OBJET, RESUME = scraper.OBJET_PLACEHOLDER, scraper.RESUME_PLACEHOLDER
+
+
+def unreachable_url():
+    """URL d'un port local libre : aucune réponse."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def instruction_rows(base_url):
+    """Fiches de test : incomplètes (page disponible, absente, injoignable) et complète."""
+    rows = [
+        ("DGAL/SDSSA/2024-1001", f"{base_url}/boagri/instruction-2024-1001", OBJET, RESUME),
+        ("DGAL/SDSSA/2024-1002", f"{base_url}/boagri/instruction-2024-1002", "Objet déjà connu", RESUME),
+        ("DGAL/SDSSA/2024-1003", f"{base_url}/boagri/absente/page/supprimee", OBJET, RESUME),
+        ("DGAL/SDSSA/2024-1004", f"{unreachable_url()}/boagri/instruction-2024-1004", OBJET, RESUME),
+        ("DGAL/SDSSA/2024-1005", f"{base_url}/boagri/instruction-2024-1005", "Objet complet", "Résumé complet"),
+    ]
+    return [(2024, 10, title, link, link + "/telechargement", objet, resume, LAST_UPDATED)
+            for title, link, objet, resume in rows]
+
+
+def main():
+    ok = True
+    now = datetime.now()
+    with MockServer(MockConfig()) as server, tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, instruction_rows(server.base_url))
+        options = dict(session=http_client.create_session(max_retries=0, backoff_factor=0), workers=2)
+
+        print("🔎 Complétion des fiches incomplètes")
+        conn = database.connect(db_path)
+        enrich.ensure_enrichment_tables(conn)
+        plan = " ".join(row[-1] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT title FROM instructions WHERE {enrich.PLACEHOLDER_CONDITION}"))
+        ok &= check("index partiel utilisé", "idx_instructions_placeholder" in plan, True)
+        watermark = database.index_watermark(conn)
+        conn.close()
+
+        stats = enrich.run(db_path, now=now, **options)
+        ok &= check("premier passage", {k: v for k, v in stats.to_dict().items() if k in
+                                        ("selected", "enriched", "failed", "abandoned")},
+                    {"selected": 4, "enriched": 2, "failed": 2, "abandoned": 1})
+
+        conn = database.connect(db_path)
+        objet = conn.execute("SELECT objet FROM instructions WHERE title = 'DGAL/SDSSA/2024-1002'").fetchone()[0]
+        ok &= check("objet connu conservé", objet, "Objet déjà connu")
+        ok &= check("fiches encore incomplètes", enrich.placeholder_count(conn), 2)
+        ok &= check("fiches à réindexer", sorted(database.titles_changed_since(conn, watermark)),
+                    sorted(stats.changed_titles))
+        conn.close()
+
+        stats = enrich.run(db_path, now=now + timedelta(minutes=5), **options)
+        ok &= check("deuxième passage immédiat", stats.selected, 0)
+
+        stats = enrich.run(db_path, now=now + timedelta(days=1), **options)
+        ok &= check("un jour plus tard", {"selected": stats.selected, "failed": stats.failed}, {"selected": 1, "failed": 1})
+
+        conn = database.connect(db_path)
+        attempts = conn.execute("SELECT title, attempts FROM enrichment_attempts ORDER BY title").fetchall()
+        conn.close()
+        ok &= check("tentatives", attempts,
+                    [("DGAL/SDSSA/2024-1003", enrich.MAX_ATTEMPTS), ("DGAL/SDSSA/2024-1004", 2)])
+
+    if not ok:
+        print("❌ Complétion incorrecte")
+        sys.exit(1)
+    print("✅ Complétion conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Contrôle des exports lus par lots.
+
+Construit une base temporaire de 100 000 instructions puis, pour chaque format
+disponible, exporte une sélection filtrée et vérifie :
+
+1. le fichier relu contient exactement les lignes de la sélection ;
+2. la mémoire allouée pendant l'export reste bornée (lecture par lots) ;
+3. un deuxième export pour la même version est servi par le cache ;
+4. un nouveau processus réutilise les fichiers de la version courante et ne
+   supprime que ceux des versions précédentes.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_exports.py [--rows 100000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import exports
+from checks import LAST_UPDATED, check, create_database
+
+# Mémoire maximale allouée pendant un export, quelle que soit sa taille
+MAX_PEAK_MB = 64
+
+
+def instruction_rows(rows):
+    """Lignes générées : 25 années, liens PDF absents, textes avec séparateurs et retours à la ligne."""
+    return (
+        (2000 + n % 25, 1 + n % 52, f"DGAL/SDSSA/{2000 + n % 25}-{n}", f"https://example.org/{n}",
+         None if n % 11 == 0 else f"https://example.org/{n}/telechargement",
+         f"Objet {n} ; « guillemets », virgules", "Résumé\nsur deux lignes " * 20, LAST_UPDATED)
+        for n in range(rows)
+    )
+
+
+def read_back(fmt, path):
+    """Nombre de lignes relues dans un export."""
+    if fmt == "csv":
+        return len(pd.read_csv(path))
+    if fmt == "jsonl":
+        with open(path, encoding='utf-8') as f:
+            return sum(1 for line in f if json.loads(line))
+    if fmt == "parquet":
+        return len(pd.read_parquet(path))
+    from openpyxl import load_workbook
+    return load_workbook(path, read_only=True)["instructions"].max_row - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle des exports lus par lots")
+    parser.add_argument("--rows", type=int, default=100000, help="Nombre d'instructions de la base de test")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, instruction_rows(args.rows))
+        export_dir = os.path.join(tmp, "exports")
+        exports.export_cache = exports.ExportCache(export_dir)
+        # Sélection filtrée couvrant toute la base : le cas le plus lourd
+        filters = {"since": "2024-01-01"}
+        with sqlite3.connect(db_path) as conn:
+            expected = exports.count_rows(conn, **filters)
+
+        print(f"🔎 Exports de {expected} lignes sur {args.rows} ({', '.join(exports.available_formats())})")
+        for fmt in exports.available_formats():
+            tracemalloc.start()
+            started = time.perf_counter()
+            path = exports.export_file(fmt, "v1", db_path, **filters)
+            duration = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            ok &= check(f"{fmt} : lignes ({duration:.2f} s, {os.path.getsize(path) / 1e6:.1f} Mo)",
+                        read_back(fmt, path), expected)
+            ok &= check(f"{fmt} : pic mémoire {peak:.1f} Mo ≤ {MAX_PEAK_MB} Mo", peak <= MAX_PEAK_MB, True)
+
+            started = time.perf_counter()
+            cached = exports.export_file(fmt, "v1", db_path, **filters)
+            ok &= check(f"{fmt} : deuxième export servi par le cache",
+                        cached == path and time.perf_counter() - started < 0.05, True)
+
+        # Nouveau processus : cache vide en mémoire, fichiers déjà sur disque
+        fmt = exports.available_formats()[0]
+        exports.export_cache = exports.ExportCache(export_dir)
+        path = exports.export_file(fmt, "v1", db_path, **filters)
+        mtime = os.stat(path).st_mtime_ns
+        files = len(os.listdir(export_dir))
+        exports.export_cache = exports.ExportCache(export_dir)
+        reused = exports.export_file(fmt, "v1", db_path, **filters)
+        ok &= check("fichiers de la version courante réutilisés après redémarrage",
+                    (reused == path, os.stat(reused).st_mtime_ns == mtime, len(os.listdir(export_dir)) == files),
+                    (True, True, True))
+        newer = exports.export_file(fmt, "v2", db_path, **filters)
+        ok &= check("fichiers des versions précédentes supprimés", os.listdir(export_dir), [os.path.basename(newer)])
+
+    if not ok:
+        print("❌ Exports incorrects")
+        sys.exit(1)
+    print("✅ Exports conformes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Contrôle de l'empreinte de contenu et de l'historique des versions.
+
+Construit une base temporaire (schéma d'origine, sans empreinte) puis vérifie :
+
+1. la migration calcule l'empreinte de toutes les lignes existantes ;
+2. réécrire les mêmes instructions ne modifie rien (aucune écriture, date de
+   mise à jour inchangée) ;
+3. une instruction amendée est réécrite seule : sa version précédente est
+   archivée avec la liste des champs modifiés, son identifiant est signalé ;
+4. le chargement en masse suit les mêmes règles (inchangées ignorées,
+   amendées archivées, nouvelles notées dans l'historique) ; un titre vu
+   plusieurs semaines prend la plus récente, dans un lot comme d'un lot à
+   l'autre.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_history.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import database
+import history
+import ingest
+from checks import LAST_UPDATED, check, create_database
+
+BASE = "https://info.agriculture.gouv.fr/boagri/instruction-2024-"
+ROWS = [
+    (f"DGAL/SDSSA/2024-{n}", f"{BASE}{n}", f"{BASE}{n}/telechargement", f"Objet {n}", f"Résumé {n}")
+    for n in range(100, 105)
+]
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, [(2024, 10) + row + (LAST_UPDATED,) for row in ROWS[:3]])
+        conn = database.connect(db_path)
+        ingest.prepare(conn)
+
+        print("🔎 Empreinte de contenu et historique")
+        missing = conn.execute("SELECT COUNT(*) FROM instructions WHERE content_hash IS NULL").fetchone()[0]
+        ok &= check("empreintes calculées par la migration", missing, 0)
+
+        changes = conn.total_changes
+        outcome = ingest.upsert_instructions(conn, 2024, 10, ROWS[:3])
+        conn.commit()
+        ok &= check("réécriture à l'identique", (len(outcome["unchanged"]), outcome["changed_ids"]), (3, []))
+        ok &= check("aucune écriture", conn.total_changes - changes, 0)
+
+        current = ROWS[:1] + [ROWS[1][:4] + ("Résumé 101 (modifié)",)] + ROWS[2:3]
+        outcome = ingest.upsert_instructions(conn, 2024, 10, current)
+        conn.commit()
+        amended_id = conn.execute("SELECT rowid FROM instructions WHERE title = ?", (ROWS[1][0],)).fetchone()[0]
+        ok &= check("instruction amendée", (outcome["updated"], outcome["changed_ids"]), ([ROWS[1][0]], [amended_id]))
+        versions = history.versions(conn, ROWS[1][0])
+        ok &= check("version archivée", [(v["changed_fields"], v["resume"]) for v in versions],
+                    [("resume", "Résumé 101")])
+
+        print("🔎 Chargement en masse")
+        amended = ROWS[2][:3] + ("Objet 102 (modifié)",) + ROWS[2][4:]
+        rows = [(2024, 10) + row for row in current[:2] + [amended]] + [(2024, 11) + row for row in ROWS[3:]]
+        outcome = ingest.bulk_load(conn, rows)
+        conn.commit()
+        ids = dict(conn.execute("SELECT title, rowid FROM instructions"))
+        ok &= check("insérées / modifiées", (sorted(outcome["inserted"]), outcome["updated"]),
+                    ([ROWS[3][0], ROWS[4][0]], [ROWS[2][0]]))
+        ok &= check("identifiants signalés", sorted(outcome["changed_ids"]),
+                    sorted(ids[title] for title in (ROWS[2][0], ROWS[3][0], ROWS[4][0])))
+        ok &= check("champs modifiés", [v["changed_fields"] for v in history.versions(conn, ROWS[2][0])], ["objet"])
+        ok &= check("entrées « insert »", conn.execute(
+            "SELECT COUNT(*) FROM instruction_history WHERE change = 'insert'").fetchone()[0], 2)
+
+        stored = conn.execute("SELECT content_hash, link, pdf_link, objet, resume FROM instructions").fetchall()
+        ok &= check("empreintes à jour", all(row[0] == history.content_hash(*row[1:]) for row in stored), True)
+
+        outcome = ingest.bulk_load(conn, rows)
+        conn.commit()
+        ok &= check("rechargement à l'identique", outcome["changed_ids"], [])
+
+        outcome = ingest.bulk_load(conn, [(2024, 12) + current[0]])
+        conn.commit()
+        week = conn.execute("SELECT year, week FROM instructions WHERE title = ?", (ROWS[0][0],)).fetchone()
+        ok &= check("changement de semaine seul", (outcome["updated"], week, len(history.versions(conn, ROWS[0][0]))),
+                    ([ROWS[0][0]], (2024, 12), 0))
+
+        ingest.bulk_load(conn, [(2024, 14) + current[0], (2024, 13) + current[0]])
+        conn.commit()
+        week = conn.execute("SELECT year, week FROM instructions WHERE title = ?", (ROWS[0][0],)).fetchone()
+        ok &= check("plusieurs semaines dans un lot", week, (2024, 14))
+        conn.close()
+
+    if not ok:
+        print("❌ Historique incorrect")
+        sys.exit(1)
+    print("✅ Historique conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Contrôle du cache des réponses boagri (horizon, revalidation, rejeu hors ligne).
+
+Parcourt trois semaines du faux site local (`mock_boagri`) avec le moteur de
+scraping et une `CachedSession` sur un cache temporaire, à une date fixée :
+
+1. cache vide : toutes les pages sont téléchargées et mises en cache ;
+2. deuxième passage : les semaines antérieures à l'horizon et les pages de
+   détail récentes sont servies sans requête, la semaine récente est revalidée
+   (304) ;
+3. pages de détail trop anciennes : revalidées par requête conditionnelle ;
+4. serveur arrêté, mode hors ligne : le parcours est rejoué à l'identique
+   depuis le cache, une semaine jamais vue est signalée inaccessible.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_http_cache.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import http_cache
+import http_client
+import scraper
+from checks import check
+from mock_boagri import MockConfig, MockServer
+
+TODAY = date(2024, 6, 3)
+# Deux semaines antérieures à l'horizon de 8 semaines, une semaine récente
+WEEKS = [(2024, 10), (2024, 11), (2024, 21)]
+PER_WEEK = 3
+
+
+def scrape(session, base_url, weeks=WEEKS):
+    engine = scraper.AsyncScraper(session=session, rate=1000, burst=100, base_url=base_url)
+    return asyncio.run(engine.scrape_weeks(weeks))
+
+
+def counters(session):
+    return {"hits": session.hits, "revalidated": session.revalidated, "fetched": session.fetched}
+
+
+def main():
+    ok = True
+    pages = len(WEEKS) * (1 + PER_WEEK)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = http_cache.ResponseCache(os.path.join(tmp, "http_cache.db"))
+        http = http_client.create_session(max_retries=0)
+
+        def cached_session(**options):
+            return http_cache.CachedSession(session=http, cache=cache, today=TODAY, **options)
+
+        server = MockServer(MockConfig(per_week=PER_WEEK, pdf=False)).start()
+        try:
+            print(f"🔎 Cache des réponses ({len(WEEKS)} semaines, {pages} pages)")
+            session = cached_session()
+            reference = scrape(session, server.base_url)
+            ok &= check("cache vide", counters(session), {"hits": 0, "revalidated": 0, "fetched": pages})
+
+            session = cached_session()
+            results = scrape(session, server.base_url)
+            ok &= check("horizon et détails récents", counters(session),
+                        {"hits": pages - 1, "revalidated": 1, "fetched": 0})
+            ok &= check("réponse 304 du serveur", server.stats[304], 1)
+            ok &= check("résultats identiques", results == reference, True)
+
+            session = cached_session(detail_max_age=timedelta(0))
+            scrape(session, server.base_url)
+            ok &= check("détails à revalider", counters(session),
+                        {"hits": 2, "revalidated": pages - 2, "fetched": 0})
+        finally:
+            server.stop()
+
+        print("🔎 Rejeu hors ligne (serveur arrêté)")
+        session = cached_session(offline=True)
+        results = scrape(session, server.base_url, WEEKS + [(2024, 30)])
+        ok &= check("pages servies par le cache", counters(session), {"hits": pages, "revalidated": 0, "fetched": 0})
+        ok &= check("résultats identiques", {week: results[week] for week in WEEKS} == reference, True)
+        ok &= check("semaine jamais vue", results[(2024, 30)], None)
+        http.close()
+        cache.close()
+
+    if not ok:
+        print("❌ Cache des réponses incorrect")
+        sys.exit(1)
+    print("✅ Cache des réponses conforme")
+
+
+if __name__ == "__main__":
+    main()
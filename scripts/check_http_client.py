@@ -0,0 +1,110 @@
+"""Contrôle de la politique de reprise de la session HTTP partagée.
+
+Interroge un faux serveur local avec une session `http_client.create_session`
+et vérifie :
+
+1. une erreur passagère (503) est reprise et la réponse finale est 200 ;
+2. les reprises sont bornées à `MAX_RETRIES`, la dernière réponse est rendue ;
+3. l'attente croît exponentiellement entre les tentatives (au moins
+   `backoff_factor * 2^n`, plus une part aléatoire bornée) ;
+4. l'en-tête Retry-After d'une réponse 429 est respecté ;
+5. ni un 404 ni un POST ne sont rejoués ;
+6. chaque appel est mesuré une fois par hôte (`http_client.stats`).
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_http_client.py
+"""
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import http_client
+from checks import check
+
+# Facteur d'attente réduit pour un contrôle rapide
+BACKOFF_FACTOR = 0.1
+
+
+# 📌 Faux serveur : /flaky/<n> (n erreurs 503 puis 200), /down (503), /missing (404), /busy (429 puis 200)
+def make_handler(hits):
+    class FlakyHandler(BaseHTTPRequestHandler):
+        def _reply(self):
+            hits[self.path].append(time.perf_counter())
+            count = len(hits[self.path])
+            if self.path.startswith("/flaky/"):
+                status = 503 if count <= int(self.path.rsplit("/", 1)[1]) else 200
+            elif self.path == "/busy":
+                status = 429 if count == 1 else 200
+            else:
+                status = {"/down": 503, "/missing": 404}.get(self.path, 200)
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        do_GET = _reply
+        do_POST = _reply
+
+        def log_message(self, format, *args):
+            pass
+
+    return FlakyHandler
+
+
+def main():
+    hits = defaultdict(list)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(hits))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    session = http_client.create_session(backoff_factor=BACKOFF_FACTOR)
+    http_client.stats.reset()
+
+    ok = True
+    try:
+        print("🔎 Reprises de la session HTTP")
+        response = session.get(f"{base}/flaky/2")
+        ok &= check("erreur passagère reprise", (response.status_code, len(hits["/flaky/2"])), (200, 3))
+
+        response = session.get(f"{base}/down")
+        ok &= check("reprises bornées", (response.status_code, len(hits["/down"])),
+                    (503, http_client.MAX_RETRIES + 1))
+
+        times = hits["/down"]
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        # urllib3 : première reprise immédiate, puis facteur * 2^n plus au plus BACKOFF_JITTER
+        minimums = [0] + [BACKOFF_FACTOR * 2 ** n for n in range(1, len(gaps))]
+        growing = all(minimum <= gap <= minimum + http_client.BACKOFF_JITTER + 0.2
+                      for gap, minimum in zip(gaps, minimums))
+        ok &= check(f"attente exponentielle ({', '.join(f'{gap:.2f}' for gap in gaps)} s)", growing, True)
+
+        started = time.perf_counter()
+        response = session.get(f"{base}/busy")
+        waited = time.perf_counter() - started
+        ok &= check(f"Retry-After respecté ({waited:.2f} s)", (response.status_code, waited >= 1), (200, True))
+
+        response = session.get(f"{base}/missing")
+        ok &= check("404 non rejoué", (response.status_code, len(hits["/missing"])), (404, 1))
+        response = session.post(f"{base}/flaky/5")
+        ok &= check("POST non rejoué", (response.status_code, len(hits["/flaky/5"])), (503, 1))
+
+        host = http_client.stats.summary()[f"127.0.0.1:{server.server_address[1]}"]
+        ok &= check("appels mesurés / en erreur", (host["count"], host["errors"]), (5, 3))
+    finally:
+        server.shutdown()
+        session.close()
+
+    if not ok:
+        print("❌ Politique de reprise incorrecte")
+        sys.exit(1)
+    print("✅ Politique de reprise conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Contrôle de la file persistante des semaines à récupérer (`scrape_jobs`).
+
+1. reprise : une reconstruction (`ingest.backfill`) découpée en exécutions
+   courtes (`max_weeks`) sur le faux site local reprend exactement où la
+   précédente s'était arrêtée, sans refaire une semaine ; une exécution
+   suivante ne revérifie que les semaines récentes ;
+2. exécution interrompue : une semaine restée « running » n'est reprise
+   qu'après `STALE_AFTER` ;
+3. échecs : chaque nouvelle tentative attend `retry_delay` (délai doublé),
+   la semaine est abandonnée après `MAX_ATTEMPTS` échecs ;
+4. semaines vides : revérifiées à délai croissant, plus du tout dès que des
+   instructions de cette semaine sont en base ;
+5. publication tardive : la nouvelle vérification d'une semaine vide
+   antérieure à l'horizon du cache de réponses interroge bien le serveur et
+   trouve les instructions publiées entre-temps.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_jobs.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import http_cache
+import http_client
+import ingest
+import jobs
+
+from checks import check, create_database
+from mock_boagri import MockConfig, MockServer
+
+TODAY = datetime(2024, 3, 4)
+START = (2024, 1)
+PER_WEEK = 2
+MAX_WEEKS = 4
+
+# Date du cache de réponses : toutes les semaines reconstruites sont antérieures à l'horizon
+CACHE_TODAY = date(2024, 6, 3)
+
+# Date de référence des contrôles de la file
+NOW = datetime(2024, 6, 1, 12)
+SECOND = timedelta(seconds=1)
+
+
+def claimable_at(conn, *moments):
+    """Nombre de semaines réservables à chacun des instants donnés."""
+    return [jobs.claimable_count(conn, moment) for moment in moments]
+
+
+def main():
+    weeks = jobs.iso_weeks(START, tuple(TODAY.isocalendar()[:2]))
+    recent = sorted(ingest.recent_weeks(TODAY))
+
+    ok = True
+    with MockServer(MockConfig(per_week=PER_WEEK, pdf=False)) as server, tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path)
+        options = dict(start=START, chunk_weeks=3, max_weeks=MAX_WEEKS, today=TODAY, base_url=server.base_url,
+                       session=http_client.create_session(max_retries=0))
+
+        print(f"🔎 Reprise d'une reconstruction ({len(weeks)} semaines, {MAX_WEEKS} par exécution)")
+        runs = []
+        for _ in range(-(-len(weeks) // MAX_WEEKS)):
+            seen = []
+            ingest.backfill(db_path, on_progress=lambda done, total, year, week, items: seen.append((year, week)),
+                            **options)
+            runs.append(sorted(seen))
+        ok &= check("semaines par exécution", runs,
+                    [weeks[i:i + MAX_WEEKS] for i in range(0, len(weeks), MAX_WEEKS)])
+        conn = sqlite3.connect(db_path)
+        ok &= check("file terminée", (jobs.queue_summary(conn),
+                                      conn.execute("SELECT COUNT(*) FROM instructions").fetchone()[0]),
+                    ({jobs.DONE: len(weeks)}, len(weeks) * PER_WEEK))
+        conn.close()
+
+        seen = []
+        ingest.backfill(db_path, on_progress=lambda done, total, year, week, items: seen.append((year, week)),
+                        **options)
+        ok &= check("exécution suivante : semaines récentes seules", sorted(seen), recent)
+
+        print("🔎 Exécution interrompue")
+        conn = sqlite3.connect(db_path)
+        conn.execute("DELETE FROM scrape_jobs")
+        jobs.enqueue_weeks(conn, [(2024, 20)])
+        jobs.claim_jobs(conn, 1, now=NOW)
+        ok &= check("reprise après STALE_AFTER",
+                    claimable_at(conn, NOW + timedelta(minutes=10), NOW + jobs.STALE_AFTER), [0, 1])
+
+        print("🔎 Échecs et nouvelles tentatives")
+        moment, delays, due = NOW, [], []
+        for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+            jobs.claim_jobs(conn, 1, now=moment)
+            jobs.fail_job(conn, 2024, 20, "HTTP 503", now=moment)
+            delay = jobs.retry_delay(attempt)
+            delays.append(delay)
+            due.append(claimable_at(conn, moment + delay - SECOND, moment + delay))
+            moment += delay
+        ok &= check("délais doublés", [delay / jobs.RETRY_BASE_DELAY for delay in delays],
+                    [min(2 ** n, jobs.RETRY_MAX_DELAY / jobs.RETRY_BASE_DELAY) for n in range(jobs.MAX_ATTEMPTS)])
+        ok &= check("reprise à l'échéance", due[:-1], [[0, 1]] * (jobs.MAX_ATTEMPTS - 1))
+        state = conn.execute("SELECT state, attempts FROM scrape_jobs WHERE week = 20").fetchone()
+        ok &= check("abandon", (state, claimable_at(conn, moment + timedelta(days=365))),
+                    ((jobs.ABANDONED, jobs.MAX_ATTEMPTS), [0]))
+
+        print("🔎 Semaines vides")
+        jobs.enqueue_weeks(conn, [(2024, 21)])
+        moment, due = NOW, []
+        for checks in (1, 2):
+            jobs.claim_jobs(conn, 1, now=moment)
+            jobs.complete_job(conn, 2024, 21, 0, now=moment)
+            delay = jobs.empty_recheck_delay(checks)
+            due.append((delay.days, claimable_at(conn, moment + delay - SECOND, moment + delay)))
+            moment += delay
+        ok &= check("revérifications (jours, dues)", due, [(1, [0, 1]), (2, [0, 1])])
+        conn.execute("INSERT INTO instructions (year, week, title) VALUES (2024, 21, 'DGAL/SDSSA/2024-2101')")
+        conn.commit()
+        ok &= check("plus revérifiée une fois publiée", claimable_at(conn, moment + timedelta(days=365)), [0])
+        conn.close()
+
+    print("🔎 Publication tardive d'une semaine vide ancienne")
+    with MockServer(MockConfig(per_week=0, pdf=False)) as server, tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path)
+        http = http_client.create_session(max_retries=0)
+        cache = http_cache.ResponseCache(os.path.join(tmp, "http_cache.db"))
+        options = dict(start=START, today=TODAY, base_url=server.base_url,
+                       session=http_cache.CachedSession(session=http, cache=cache, today=CACHE_TODAY))
+        ingest.backfill(db_path, **options)
+
+        server.config.per_week = PER_WEEK
+        requested = server.stats[200] + server.stats[304]
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE scrape_jobs SET next_attempt_at = ?", (datetime.now() - SECOND,))
+        conn.commit()
+        stats = ingest.backfill(db_path, **options)
+        ok &= check("pages de semaine redemandées",
+                    server.stats[200] + server.stats[304] - requested - stats.inserted, len(weeks))
+        ok &= check("instructions publiées trouvées",
+                    conn.execute("SELECT COUNT(*) FROM instructions").fetchone()[0], len(weeks) * PER_WEEK)
+        conn.close()
+        http.close()
+        cache.close()
+
+    if not ok:
+        print("❌ File des semaines incorrecte")
+        sys.exit(1)
+    print("✅ File des semaines conforme")
+
+
+if __name__ == "__main__":
+    main()
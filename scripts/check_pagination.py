@@ -0,0 +1,99 @@
+"""Contrôle de la pagination par clé des tableaux de résultats.
+
+Construit une base temporaire riche en ex aequo (nombreuses instructions par
+semaine, titres en double) et, pour chaque tri proposé, parcourt la liste page
+par page avec `list_page` en repartant de la clé de la dernière ligne :
+
+1. les pages mises bout à bout donnent exactement la liste triée, sans ligne
+   répétée ni oubliée, y compris aux frontières tombant au milieu d'ex aequo ;
+2. la dernière page est incomplète et la suivante est vide (clé None) ;
+3. même contrôle avec un filtre (année, semaine), compté par `count_list` ;
+4. le tri suit un index (pas de tri temporaire dans le plan SQLite) ;
+5. `frame_page` découpe un jeu de résultats en mémoire de la même façon.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_pagination.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import database
+from checks import check, create_database
+
+PAGE_SIZE = 7
+
+# Tris de l'application : (clé, ordre décroissant)
+SORTS = [("date", True), ("date", False), ("title", False), ("title", True)]
+
+
+# Nombreux ex aequo : trois semaines par année, titres répétés
+ROWS = [(2023 + n % 2, 1 + n % 3, f"DGAL/SDSSA/{2023 + n % 2}-{n % 20:03d}") for n in range(61)]
+
+
+def expected_order(frame, sort, descending):
+    columns = ["id" if key == "rowid" else key for key in database.SORT_KEYS[sort]]
+    return frame.sort_values(columns, ascending=not descending)["id"].tolist()
+
+
+def walk(conn, sort, descending, **filters):
+    """Parcourt toutes les pages : (identifiants dans l'ordre, tailles des pages, page suivante vide)."""
+    ids, sizes, after = [], [], None
+    while True:
+        page, last = database.list_page(conn, sort=sort, descending=descending, after=after,
+                                        limit=PAGE_SIZE, **filters)
+        if last is None:
+            return ids, sizes, page.empty
+        ids += page["id"].tolist()
+        sizes.append(len(page))
+        after = last
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, ROWS, ("year", "week", "title"))
+        conn = database.connect(db_path)
+        database.ensure_indexes(conn)
+        frame = database.load_list_frame(conn)
+        total = len(frame)
+        pages = [PAGE_SIZE] * (total // PAGE_SIZE) + ([total % PAGE_SIZE] if total % PAGE_SIZE else [])
+
+        print(f"🔎 Pagination par clé ({total} lignes, pages de {PAGE_SIZE})")
+        for sort, descending in SORTS:
+            label = f"{sort} {'décroissant' if descending else 'croissant'}"
+            ids, sizes, last_empty = walk(conn, sort, descending)
+            ok &= check(f"{label} : ordre complet", ids == expected_order(frame, sort, descending), True)
+            ok &= check(f"{label} : pages", (sizes, last_empty), (pages, True))
+
+            subset = frame[(frame["year"] == 2024) & (frame["week"] == 2)]
+            ids, _, _ = walk(conn, sort, descending, year=2024, week=2)
+            ok &= check(f"{label} : filtre année et semaine",
+                        (ids == expected_order(subset, sort, descending), len(ids)),
+                        (True, database.count_list(conn, 2024, 2)))
+
+            keys = database.SORT_KEYS[sort]
+            order = ", ".join(f"{key} {'DESC' if descending else 'ASC'}" for key in keys)
+            plan = " ".join(row[3] for row in conn.execute(
+                f"EXPLAIN QUERY PLAN {database.LIST_QUERY} WHERE ({', '.join(keys)}) < ({', '.join('?' for _ in keys)}) "
+                f"ORDER BY {order} LIMIT {PAGE_SIZE}", [0] * len(keys)))
+            ok &= check(f"{label} : tri par index", "TEMP B-TREE" not in plan, True)
+
+            in_memory = [database.frame_page(frame, sort, descending, page, PAGE_SIZE)["id"].tolist()
+                         for page in range(len(pages) + 1)]
+            ok &= check(f"{label} : frame_page",
+                        ([len(page) for page in in_memory], sum(in_memory, []) == expected_order(frame, sort, descending)),
+                        (pages + [0], True))
+        conn.close()
+
+    if not ok:
+        print("❌ Pagination incorrecte")
+        sys.exit(1)
+    print("✅ Pagination conforme")
+
+
+if __name__ == "__main__":
+    main()
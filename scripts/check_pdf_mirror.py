@@ -0,0 +1,145 @@
+"""Contrôle du miroir local des PDF (reprise, empreintes, déduplication).
+
+Sert les PDF de scripts/fixtures/pdf depuis un faux site local qui gère
+`Range` / `If-Range` et coupe la connexion au milieu du premier envoi de chaque
+fichier, puis vérifie :
+
+1. premier passage : téléchargements interrompus, fichiers partiels conservés ;
+2. deuxième passage : reprise à l'octet près (réponses 206), PDF rangés sous leur
+   empreinte, deux instructions au même PDF partagent un seul fichier ;
+3. `local_pdf` retrouve la copie locale et `verify_mirror` écarte un fichier altéré.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_pdf_mirror.py
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import http_client
+import pdf_mirror
+import pdf_store
+from checks import check, create_database
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pdf")
+
+# Instructions de test → PDF servi (deux instructions partagent le même PDF)
+INSTRUCTIONS = {
+    "DGAL/SDSSA/2024-600": "instruction-2024-600",
+    "DGAL/SDSSA/2024-601": "instruction-2024-600",
+    "DGAL/SDSSA/2024-603": "instruction-2024-603",
+}
+
+
+# 📌 Faux site : /boagri/<titre>/telechargement, coupure au premier envoi
+def make_handler(state):
+    class RangeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            title = "DGAL/SDSSA/" + self.path.split("/")[2]
+            if title not in INSTRUCTIONS:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            with open(os.path.join(FIXTURES_DIR, f"{INSTRUCTIONS[title]}.pdf"), 'rb') as f:
+                payload = f.read()
+            etag = f'"{hashlib.sha256(payload).hexdigest()[:16]}"'
+
+            start = 0
+            range_header = self.headers.get("Range", "")
+            if range_header.startswith("bytes=") and self.headers.get("If-Range") == etag:
+                start = int(range_header[len("bytes="):].split("-")[0])
+                state["ranges"] += 1
+
+            body = payload[start:]
+            self.send_response(206 if start else 200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            if start:
+                self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+            self.end_headers()
+
+            if title not in state["cut"]:
+                # Premier envoi : la moitié du fichier, puis coupure
+                state["cut"].add(title)
+                self.wfile.write(body[:len(body) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return RangeHandler
+
+
+def instruction_rows(base_url):
+    """(titre, lien, lien du PDF) de chaque instruction de test."""
+    return [(title, f"{base_url}/boagri/{title.split('/')[-1]}",
+             f"{base_url}/boagri/{title.split('/')[-1]}/telechargement") for title in INSTRUCTIONS]
+
+
+def main():
+    state = {"cut": set(), "ranges": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path, instruction_rows(base_url), ("title", "link", "pdf_link"))
+        options = dict(
+            session=http_client.create_session(max_retries=0), workers=1,
+            manifest_path=os.path.join(tmp, "mirror", "manifest.db"),
+            objects_dir=os.path.join(tmp, "mirror", "objects"),
+            partial_dir=os.path.join(tmp, "mirror", "partial"),
+        )
+        lookup = dict(manifest_path=options["manifest_path"], objects_dir=options["objects_dir"])
+        try:
+            print("🔎 Miroir local des PDF")
+            stats = pdf_mirror.mirror_pdfs(db_path, **options)
+            ok &= check("premier passage (coupures)", {k: stats[k] for k in ("failed", "mirrored")},
+                        {"failed": 3, "mirrored": 0})
+            ok &= check("fichiers partiels", len([f for f in os.listdir(options["partial_dir"]) if f.endswith(".part")]), 3)
+
+            stats = pdf_mirror.mirror_pdfs(db_path, **options)
+            ok &= check("reprise", {k: stats[k] for k in ("resumed", "mirrored", "deduplicated", "failed")},
+                        {"resumed": 3, "mirrored": 2, "deduplicated": 1, "failed": 0})
+            ok &= check("requêtes Range acceptées", state["ranges"], 3)
+
+            blobs = [os.path.join(root, f) for root, _, files in os.walk(options["objects_dir"]) for f in files]
+            ok &= check("fichiers stockés", len(blobs), 2)
+            ok &= check("empreintes", all(pdf_mirror.file_sha256(path) in path for path in blobs), True)
+
+            stats = pdf_mirror.mirror_pdfs(db_path, **options)
+            ok &= check("troisième passage", stats["skipped"], 3)
+
+            path = pdf_store.local_pdf("DGAL/SDSSA/2024-603", **lookup)
+            with open(os.path.join(FIXTURES_DIR, "instruction-2024-603.pdf"), 'rb') as f:
+                ok &= check("copie locale identique", pdf_store.read_pdf(path) == f.read(), True)
+
+            with open(path, 'ab') as f:
+                f.write(b"corrompu")
+            ok &= check("fichiers altérés retirés", len(pdf_mirror.verify_mirror(**lookup)), 1)
+            ok &= check("copie altérée ignorée", pdf_store.local_pdf("DGAL/SDSSA/2024-603", **lookup), None)
+        finally:
+            server.shutdown()
+
+    if not ok:
+        print("❌ Miroir incorrect")
+        sys.exit(1)
+    print("✅ Miroir conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Contrôle de la chaîne d'extraction du texte des PDF.
+
+Sert les PDF de scripts/fixtures/pdf depuis un faux site local (avec ETag),
+construit une base temporaire dont les instructions pointent vers ce site, puis
+exécute `pdf_text.run` plusieurs fois :
+
+1. premier passage : les PDF lisibles sont extraits, le PDF corrompu et le PDF
+   absent (404) échouent ;
+2. deuxième passage : le serveur répond 304, aucun PDF n'est retraité, les
+   échecs sont reportés et le repère de l'index de recherche ne bouge pas ;
+3. passage sans ETag : les PDF sont retéléchargés mais reconnus par empreinte,
+   le repère ne bouge toujours pas ;
+4. passage à la date de nouvelle tentative : seul le PDF corrompu est redemandé,
+   le PDF absent est abandonné d'emblée ;
+5. PDF partagés par plusieurs instructions, une seule extraction en attente à
+   la fois : chaque PDF est extrait une fois, et toutes les instructions du
+   PDF corrompu sont en échec (aucune n'est notée inchangée sans texte).
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_pdf_text.py
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import database
+import pdf_text
+from checks import check, create_database
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pdf")
+
+# Textes attendus dans les PDF lisibles
+EXPECTED = {
+    "instruction-2024-600": "norovirus",
+    "instruction-2024-603": "traçabilité",
+}
+
+# Instruction dont le PDF n'existe pas sur le faux site (404)
+MISSING = "instruction-2024-999"
+
+# Instructions pointant vers chaque PDF (contrôle des PDF partagés)
+COPIES = 3
+
+# Colonnes renseignées dans la base de test
+COLUMNS = ("year", "week", "title", "link", "pdf_link")
+
+
+# 📌 Faux site : /boagri/<nom>/telechargement → fixtures/pdf/<nom>.pdf
+def make_handler(state):
+    class PdfHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"] += 1
+            name = self.path.strip("/").split("/")[1] if self.path.count("/") >= 3 else ""
+            path = os.path.join(FIXTURES_DIR, f"{name}.pdf")
+            if not os.path.isfile(path):
+                self.send_response(404)
+                self.end_headers()
+                return
+            with open(path, 'rb') as f:
+                payload = f.read()
+            etag = f'"{hashlib.sha256(payload).hexdigest()[:16]}"'
+            if state["etag"] and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(payload)))
+            if state["etag"]:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PdfHandler
+
+
+def instruction_rows(base_url, copies=1):
+    """Une instruction par PDF de test (plus un PDF absent), chaque PDF partagé par `copies` instructions."""
+    names = sorted(os.path.splitext(f)[0] for f in os.listdir(FIXTURES_DIR) if f.endswith(".pdf")) + [MISSING]
+    return [(2024, 10, f"DGAL/SDSSA/{name[len('instruction-'):]}" + (f"-{copy}" if copy else ""),
+             f"{base_url}/boagri/{name}", f"{base_url}/boagri/{name}/telechargement")
+            for name in names for copy in range(copies)]
+
+
+def check_stats(label, stats, **expected):
+    """Compare les compteurs attendus d'un passage (les autres sont ignorés)."""
+    return check(label, {key: stats[key] for key in expected}, expected)
+
+
+def main():
+    state = {"etag": True, "requests": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "instructions.db")
+        rows = instruction_rows(base_url)
+        create_database(db_path, rows, COLUMNS)
+        total = len(rows)
+        readable = len(EXPECTED)
+        try:
+            print("🔎 Extraction du texte des PDF de test")
+            stats = pdf_text.run(db_path, workers=2, processes=2)
+            ok &= check_stats("premier passage", stats, extracted=readable, failed=total - readable)
+
+            conn = database.connect(db_path)
+            for name, needle in EXPECTED.items():
+                text = pdf_text.load_text(conn, f"DGAL/SDSSA/{name[len('instruction-'):]}") or ""
+                found = needle in text
+                print(f"  {'OK' if found else 'ÉCART':<6} {name}: {needle!r} {'trouvé' if found else 'absent'}")
+                ok &= found
+            documents = [doc for doc in database.iter_documents(conn) if doc[3]]
+            conn.close()
+            ok &= check_stats("documents indexables", {"with_text": len(documents)}, with_text=readable)
+
+            conn = database.connect(db_path)
+            watermark = database.index_watermark(conn)
+            conn.close()
+
+            def changed_since_first_pass():
+                with database.connect(db_path) as conn:
+                    return {"changed": len(database.titles_changed_since(conn, watermark))}
+
+            stats = pdf_text.run(db_path, workers=2, processes=2)
+            ok &= check_stats("réponses 304", stats, not_modified=readable, extracted=0, deferred=total - readable)
+            ok &= check_stats("repère après 304", changed_since_first_pass(), changed=0)
+
+            state["etag"] = False
+            stats = pdf_text.run(db_path, workers=2, processes=2)
+            ok &= check_stats("sans ETag", stats, unchanged=readable, extracted=0)
+            ok &= check_stats("repère après contenu identique", changed_since_first_pass(), changed=0)
+
+            with database.connect(db_path) as conn:
+                pending = {"pending": len(pdf_text.pending_titles(conn)),
+                           "pending_later": len(pdf_text.pending_titles(conn, datetime.now() + timedelta(days=2)))}
+            ok &= check_stats("PDF en attente", pending, pending=0, pending_later=1)
+
+            requests_before = state["requests"]
+            stats = pdf_text.run(db_path, workers=2, processes=2, now=datetime.now() + timedelta(days=2))
+            ok &= check_stats("nouvelle tentative due", stats, failed=1, deferred=1)
+            with database.connect(db_path) as conn:
+                attempts = dict(conn.execute("SELECT title, attempts FROM pdf_documents WHERE error IS NOT NULL"))
+            ok &= check_stats("tentatives", {"attempts": sorted(attempts.values()),
+                                             "requests": state["requests"] - requests_before},
+                              attempts=[2, pdf_text.MAX_ATTEMPTS], requests=readable + 1)
+
+            print("🔎 PDF partagés, extractions en attente bornées")
+            state["etag"] = True
+            shared_path = os.path.join(tmp, "shared.db")
+            rows = instruction_rows(base_url, copies=COPIES)
+            create_database(shared_path, rows, COLUMNS)
+            total = len(rows)
+            pdf_text.QUEUED_EXTRACTIONS_PER_PROCESS = 1
+            stats = pdf_text.run(shared_path, workers=4, processes=1)
+            with database.connect(shared_path) as conn:
+                texts = conn.execute("SELECT COUNT(*) FROM pdf_texts").fetchone()[0]
+            # Une copie téléchargée après l'enregistrement du texte est « inchangée »
+            ok &= check_stats("PDF partagés", dict(stats, texts=texts,
+                                                   indexed=stats["extracted"] + stats["unchanged"]),
+                              indexed=readable * COPIES, failed=total - readable * COPIES, texts=readable)
+        finally:
+            server.shutdown()
+
+    if not ok:
+        print("❌ Chaîne d'extraction incorrecte")
+        sys.exit(1)
+    print("✅ Chaîne d'extraction conforme")
+
+
+if __name__ == "__main__":
+    main()
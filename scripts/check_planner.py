@@ -0,0 +1,101 @@
+"""Contrôle de la planification des semaines à vérifier.
+
+Rejoue le CSV de référence sur le faux site local (`mock_boagri`) et exécute
+`ingest.run` sur une base vide, au 30 juin 2024, depuis le 1er mars 2024 :
+
+1. rattrapage : toutes les semaines sont récupérées, les semaines vides sont
+   notées (statut HTTP, durée) et reprogrammées à un jour ;
+2. deuxième passage : seules les semaines récentes sont revérifiées ;
+3. un jour plus tard : les semaines vides sont revérifiées, le délai double ;
+4. budget limité sur une base vide : les semaines récentes passent en premier.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_planner.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import http_client
+import ingest
+import jobs
+
+from checks import check, create_database
+from mock_boagri import CSV_PATH, MockConfig, MockServer
+
+TODAY = datetime(2024, 6, 30)
+SINCE = datetime(2024, 3, 1)
+
+
+def expected_weeks():
+    """Semaines de la période : (toutes, celles qui ont des instructions dans le CSV)."""
+    weeks = jobs.iso_weeks(tuple(SINCE.isocalendar()[:2]), tuple(TODAY.isocalendar()[:2]))
+    published = set(pd.read_csv(CSV_PATH)[["year", "week"]].itertuples(index=False, name=None))
+    return weeks, [week for week in weeks if week in published]
+
+
+def main():
+    weeks, published = expected_weeks()
+    empty = len(weeks) - len(published)
+    recent = ingest.recent_weeks(TODAY)
+
+    ok = True
+    with MockServer(MockConfig(dataset=CSV_PATH)) as server, tempfile.TemporaryDirectory() as tmp:
+        options = dict(since=SINCE, today=TODAY, base_url=server.base_url,
+                       session=http_client.create_session(max_retries=0))
+        db_path = os.path.join(tmp, "instructions.db")
+        create_database(db_path)
+
+        print(f"🔎 Planification des semaines ({len(weeks)} semaines, dont {empty} vides)")
+        stats = ingest.run(db_path, **options)
+        ok &= check("rattrapage", {"checked": stats.weeks_checked, "empty": stats.weeks_empty},
+                    {"checked": len(weeks), "empty": empty})
+
+        conn = sqlite3.connect(db_path)
+        observed = conn.execute("""
+            SELECT COUNT(*), SUM(http_status = 200), SUM(fetch_duration IS NOT NULL),
+                   SUM(empty_checks = 1 AND next_attempt_at IS NOT NULL)
+            FROM scrape_jobs
+        """).fetchone()
+        ok &= check("observations (semaines, HTTP 200, durées, vides reprogrammées)",
+                    observed, (len(weeks), len(weeks), len(weeks), empty))
+
+        stats = ingest.run(db_path, **options)
+        ok &= check("deuxième passage (semaines récentes)", stats.weeks_checked, len(recent))
+
+        # Un jour passe : les semaines vides sont dues
+        conn.execute("UPDATE scrape_jobs SET next_attempt_at = datetime(next_attempt_at, '-1 day')")
+        conn.commit()
+        stats = ingest.run(db_path, **options)
+        rechecked = len(set(recent) | {w for w in weeks if w not in published})
+        ok &= check("un jour plus tard (récentes + vides)", stats.weeks_checked, rechecked)
+        delays = conn.execute("""
+            SELECT DISTINCT ROUND(julianday(next_attempt_at) - julianday(fetched_at))
+            FROM scrape_jobs WHERE empty_checks = 2
+        """).fetchall()
+        ok &= check("délai doublé (jours)", delays, [(2.0,)])
+        conn.close()
+
+        db_path = os.path.join(tmp, "budget.db")
+        create_database(db_path)
+        claimed = []
+        ingest.run(db_path, max_weeks=4, workers=1,
+                   on_progress=lambda done, total, year, week, instructions: claimed.append((year, week)),
+                   **options)
+        ok &= check("budget de 4 semaines", sorted(claimed, reverse=True),
+                    sorted(weeks, reverse=True)[:4])
+
+    if not ok:
+        print("❌ Planification incorrecte")
+        sys.exit(1)
+    print("✅ Planification conforme")
+
+
+if __name__ == "__main__":
+    main()
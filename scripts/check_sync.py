@@ -0,0 +1,185 @@
+"""Contrôle de la synchronisation de la base locale (base complète et changesets).
+
+Publie une base et ses changesets sur un faux dépôt local (avec ETag), puis
+synchronise une base cliente avec `sync.update_local_database` :
+
+1. base absente : la base complète est téléchargée (200) ;
+2. base à jour : le manifeste est relu, puis une réponse 304 suffit (manifeste
+   comme base complète) ;
+3. nouveau changeset : seules les instructions modifiées et le texte de leurs
+   PDF (flux voisin) sont appliqués, la base complète n'est pas retéléchargée ;
+4. retard supérieur à `MAX_CHANGESETS_BEHIND` : la base complète est
+   retéléchargée, après sauvegarde de la base locale.
+
+Le script échoue au premier résultat inattendu.
+
+    python scripts/check_sync.py
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import changesets
+import database
+import http_client
+import pdf_text
+import sync
+from checks import check
+
+PDF_TITLE = "DGAL/SDSSA/2024-603"
+PDF_NEEDLE = "traçabilité des lots"
+
+
+# 📌 Faux dépôt : /<chemin> → fichier du répertoire publié, ETag = empreinte du contenu
+def make_handler(root, requests_by_path):
+    class RepositoryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_by_path[self.path] += 1
+            path = os.path.join(root, self.path.lstrip("/"))
+            if not os.path.isfile(path):
+                self.send_response(404)
+                self.end_headers()
+                return
+            with open(path, 'rb') as f:
+                payload = f.read()
+            etag = f'"{hashlib.sha256(payload).hexdigest()[:16]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return RepositoryHandler
+
+
+def create_remote(db_path, changeset_dir):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE instructions ({', '.join(changesets.CHANGESET_FIELDS)})")
+    conn.executemany(
+        "INSERT INTO instructions (year, week, title, resume) VALUES (2024, 10, ?, ?)",
+        [("DGAL/SDSSA/2024-600", "Version initiale"), ("DGAL/SDSSA/2024-601", "Version initiale")],
+    )
+    changesets.write_changeset(conn, ["DGAL/SDSSA/2024-600", "DGAL/SDSSA/2024-601"], changeset_dir)
+    conn.close()
+
+
+def publish_patch(db_path, changeset_dir):
+    """Modifie une instruction, en ajoute une avec le texte de son PDF, publie le changeset."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE instructions SET resume = 'Version corrigée' WHERE title = 'DGAL/SDSSA/2024-600'")
+    conn.execute("INSERT INTO instructions (year, week, title, resume) VALUES (2024, 11, ?, 'Nouvelle')", (PDF_TITLE,))
+    database.ensure_pdf_tables(conn)
+    text = f"Instruction relative à la {PDF_NEEDLE}."
+    sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    conn.execute("INSERT INTO pdf_texts (sha256, text, pages, extracted_at) VALUES (?, ?, 1, '2024-03-11')",
+                 (sha256, zlib.compress(text.encode('utf-8'))))
+    conn.execute("INSERT INTO pdf_documents (title, pdf_link, sha256, size, changed_at, checked_at) "
+                 "VALUES (?, 'http://example.invalid/telechargement', ?, 100, '2024-03-11', '2024-03-11')",
+                 (PDF_TITLE, sha256))
+    version = changesets.write_changeset(conn, ["DGAL/SDSSA/2024-600", PDF_TITLE], changeset_dir,
+                                         pdf_titles=[PDF_TITLE])
+    conn.close()
+    return version
+
+
+def publish_many(db_path, changeset_dir, count):
+    """Publie `count` changesets successifs ; retourne la dernière version."""
+    conn = sqlite3.connect(db_path)
+    for i in range(count):
+        conn.execute("UPDATE instructions SET resume = ? WHERE title = 'DGAL/SDSSA/2024-601'", (f"Révision {i + 1}",))
+        version = changesets.write_changeset(conn, ["DGAL/SDSSA/2024-601"], changeset_dir)
+    conn.close()
+    return version
+
+
+def local_state(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        resumes = dict(conn.execute("SELECT title, resume FROM instructions"))
+        has_pdf = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pdf_documents'").fetchone()
+        text = pdf_text.load_text(conn, PDF_TITLE) if has_pdf else None
+        return changesets.get_version(conn), resumes, text or ""
+    finally:
+        conn.close()
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        remote_dir = os.path.join(tmp, "remote")
+        changeset_dir = os.path.join(remote_dir, "changesets")
+        remote_db = os.path.join(remote_dir, "instructions.db")
+        local_db = os.path.join(tmp, "client", "instructions.db")
+        os.makedirs(changeset_dir)
+        os.makedirs(os.path.dirname(local_db))
+        create_remote(remote_db, changeset_dir)
+
+        requests_by_path = Counter()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(remote_dir, requests_by_path))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        backups_made = []
+        session = http_client.create_session(max_retries=0)
+
+        def update():
+            return sync.update_local_database(local_path=local_db, session=session,
+                                              before_replace=backups_made.append,
+                                              url=f"{base}/instructions.db", base_url=f"{base}/changesets")
+
+        try:
+            print("🔄 Synchronisation depuis un dépôt de test")
+            result = update()
+            ok &= check("base absente", (result.status, result.bytes_downloaded),
+                        (sync.UPDATED, os.path.getsize(remote_db)))
+            ok &= check("version installée", local_state(local_db)[0], 1)
+
+            ok &= check("manifeste relu", update().status, sync.UNCHANGED)
+            ok &= check("manifeste inchangé", update().status, sync.NOT_MODIFIED)
+            result = sync.sync_database(url=f"{base}/instructions.db", local_path=local_db, session=session)
+            ok &= check("base complète inchangée", (result.status, result.bytes_downloaded), (sync.NOT_MODIFIED, 0))
+
+            version = publish_patch(remote_db, changeset_dir)
+            full_downloads = requests_by_path["/instructions.db"]
+            result = update()
+            ok &= check("changeset appliqué", result.status, sync.PATCHED)
+            ok &= check("base complète non retéléchargée", requests_by_path["/instructions.db"], full_downloads)
+            local_version, resumes, text = local_state(local_db)
+            ok &= check("version après changeset", local_version, version)
+            ok &= check("instructions après changeset",
+                        (resumes.get("DGAL/SDSSA/2024-600"), resumes.get(PDF_TITLE)), ("Version corrigée", "Nouvelle"))
+            ok &= check("texte du PDF publié", PDF_NEEDLE in text, True)
+
+            count = changesets.MAX_CHANGESETS_BEHIND + 1
+            version = publish_many(remote_db, changeset_dir, count)
+            result = update()
+            ok &= check(f"retard de {count} changesets", result.status, sync.UPDATED)
+            ok &= check("sauvegardes avant remplacement", len(backups_made), 1)
+            local_version, resumes, _ = local_state(local_db)
+            ok &= check("version après base complète", (local_version, resumes.get("DGAL/SDSSA/2024-601")),
+                        (version, f"Révision {count}"))
+        finally:
+            server.shutdown()
+            session.close()
+
+    if not ok:
+        print("❌ Synchronisation incorrecte")
+        sys.exit(1)
+    print("✅ Synchronisation conforme")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Outils communs des contrôles (scripts/check_*.py) et lancement de tous les contrôles.
+
+Les contrôles importent d'ici l'affichage d'un résultat (`check`) et la base
+de test au schéma d'origine (`create_database`). Lancé directement, le module
+exécute chaque contrôle dans un processus neuf et échoue si l'un d'eux échoue
+(contrôles qui demandent des arguments exceptés) :
+
+    python scripts/checks.py [--only check_jobs check_cli] [--verbose]
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Schéma d'origine de la table des instructions (avant migrations et index)
+INSTRUCTIONS_TABLE = """
+    CREATE TABLE instructions (
+        year INTEGER, week INTEGER, title TEXT, link TEXT, pdf_link TEXT,
+        objet TEXT, resume TEXT, last_updated TEXT
+    )
+"""
+COLUMNS = ("year", "week", "title", "link", "pdf_link", "objet", "resume", "last_updated")
+
+# Date de mise à jour des lignes de test
+LAST_UPDATED = "2024-03-08 10:00:00.000000"
+
+# Contrôles lancés à part : ils comparent une base donnée en argument
+NEEDS_ARGUMENTS = ("check_backfill",)
+
+
+# 📌 Outils des contrôles
+def check(label, actual, expected):
+    """Affiche un résultat (OK ou ÉCART) ; retourne True s'il est conforme."""
+    status = "OK" if actual == expected else "ÉCART"
+    print(f"  {status:<6} {label}: {actual}")
+    return actual == expected
+
+
+def create_database(db_path, rows=(), columns=COLUMNS):
+    """Crée une base de test au schéma d'origine, avec des lignes de `columns`."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(INSTRUCTIONS_TABLE)
+        conn.executemany(
+            f"INSERT INTO instructions ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", rows
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# 📌 Lancement de tous les contrôles
+def available_checks():
+    """Noms des contrôles lançables sans argument, par ordre alphabétique."""
+    names = sorted(os.path.splitext(os.path.basename(path))[0]
+                   for path in glob.glob(os.path.join(SCRIPTS_DIR, "check_*.py")))
+    return [name for name in names if name not in NEEDS_ARGUMENTS]
+
+
+def run_check(name, verbose=False):
+    """Lance un contrôle : (réussi, durée en s, sortie)."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, f"{name}.py")],
+                            capture_output=not verbose, text=True)
+    output = "" if verbose else result.stdout + result.stderr
+    return result.returncode == 0, time.perf_counter() - started, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lance tous les contrôles de scripts/")
+    parser.add_argument("--only", nargs="+", help="Contrôles à lancer (par défaut : tous)")
+    parser.add_argument("--verbose", action="store_true", help="Affiche la sortie de chaque contrôle")
+    args = parser.parse_args()
+
+    names = args.only or available_checks()
+    failed = []
+    print(f"🔎 {len(names)} contrôles")
+    for name in names:
+        ok, duration, output = run_check(name, args.verbose)
+        print(f"  {'OK' if ok else 'ÉCHEC':<6} {name} ({duration:.1f} s)")
+        if not ok:
+            failed.append(name)
+            print(output)
+
+    if failed:
+        print(f"❌ Contrôles en échec : {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ Tous les contrôles sont conformes")
+
+
+if __name__ == "__main__":
+    main()
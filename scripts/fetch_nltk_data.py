@@ -0,0 +1,40 @@
+"""Prépare les ressources NLTK de la recherche dans data/nltk_data.
+
+Les ressources (tokeniseur punkt, WordNet et sa version multilingue) sont lues
+localement. Lancé au déploiement, ce script évite à l'application de les
+télécharger à la première recherche ; hors ligne, la recherche reste disponible
+sans lemmes ni synonymes.
+
+    python scripts/fetch_nltk_data.py [--dir data/nltk_data]
+"""
+import argparse
+import os
+import sys
+
+import nltk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import nlp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prépare les ressources NLTK de la recherche")
+    parser.add_argument("--dir", default=nlp.NLTK_DATA_DIR, help="Répertoire des ressources")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    nlp.NLTK_DATA_DIR = args.dir
+    for resource in nlp.RESOURCES:
+        # Une ressource déjà à jour dans le répertoire n'est pas retéléchargée
+        if not nltk.download(resource, download_dir=args.dir, quiet=True):
+            print(f"❌ {resource}: téléchargement impossible")
+
+    missing = nlp.missing_resources()
+    if missing:
+        print(f"❌ Ressources manquantes: {', '.join(missing)}")
+        sys.exit(1)
+    print(f"✅ Ressources NLTK prêtes dans {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
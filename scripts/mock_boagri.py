@@ -0,0 +1,226 @@
+"""Faux site boagri local, rejouable, pour tests et benchmarks sans réseau.
+
+Sert les trois types de pages utilisés par l'application :
+
+- /boagri/historique/annee-<A>/semaine-<S> : liste d'une semaine ;
+- /boagri/instruction-<A>-<N>              : page de détail (OBJET / RESUME) ;
+- /boagri/instruction-<A>-<N>/telechargement : PDF de l'instruction.
+
+Les instructions sont soit synthétiques (`per_week` par semaine), soit rejouées
+depuis le CSV de référence (`dataset`). Latence, taux d'erreur (réponses 503)
+et taille des pages sont réglables. Chaque décision aléatoire dépend seulement
+de la graine, du chemin et du numéro de tentative sur ce chemin : une même
+configuration rejoue exactement les mêmes réponses, quel que soit l'ordre des
+requêtes. Les réponses portent un ETag et honorent If-None-Match.
+
+    python scripts/mock_boagri.py --port 8765 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import hashlib
+import html
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "sdssa_instructions_2019_2025.csv")
+
+
+class MockConfig:
+    """Paramètres du faux site."""
+
+    def __init__(self, per_week=3, latency=0.0, jitter=0.0, error_rate=0.0, page_size=0,
+                 pdf=True, dataset=None, seed=0):
+        self.per_week = per_week      # instructions SDSSA par semaine (mode synthétique)
+        self.latency = latency        # latence de base par requête (s)
+        self.jitter = jitter          # latence aléatoire ajoutée, au plus (s)
+        self.error_rate = error_rate  # part des requêtes répondues en 503
+        self.page_size = page_size    # taille minimale des pages HTML (octets de remplissage)
+        self.pdf = pdf                # servir des PDF (fixtures) sur /telechargement
+        self.dataset = dataset        # CSV d'instructions à rejouer, ou None
+        self.seed = seed
+
+
+# 📌 Données servies
+class Catalog:
+    """Instructions servies, par semaine et par identifiant de page."""
+
+    def __init__(self, config):
+        self.config = config
+        self.weeks = {}
+        self.details = {}
+        if config.dataset:
+            for row in pd.read_csv(config.dataset).itertuples(index=False):
+                slug = row.link.rstrip("/").rsplit("/", 1)[-1]
+                self.weeks.setdefault((int(row.year), int(row.week)), []).append((row.title, slug))
+                self.details[slug] = (row.objet, row.resume)
+        pdf_dir = os.path.join(FIXTURES_DIR, "pdf")
+        self.pdfs = []
+        for name in sorted(os.listdir(pdf_dir)):
+            with open(os.path.join(pdf_dir, name), 'rb') as f:
+                content = f.read()
+            if content.startswith(b"%PDF-"):
+                self.pdfs.append(content)
+
+    def week(self, year, week):
+        """[(titre, identifiant de page)] publiés une semaine donnée."""
+        if self.config.dataset:
+            return self.weeks.get((year, week), [])
+        return [(f"DGAL/SDSSA/{year}-{week:02d}{i:02d}", f"instruction-{year}-{week:02d}{i:02d}")
+                for i in range(self.config.per_week)]
+
+    def detail(self, slug):
+        """(objet, résumé) d'une page de détail, ou None si elle n'existe pas."""
+        if self.config.dataset:
+            return self.details.get(slug)
+        return (f"Objet de l'instruction {slug}", f"Résumé de l'instruction {slug}.")
+
+    def pdf(self, slug):
+        return self.pdfs[int(hashlib.sha1(slug.encode()).hexdigest(), 16) % len(self.pdfs)]
+
+
+def _filler(size):
+    """Remplissage HTML (menus, pied de page) pour atteindre une taille de page réaliste."""
+    if size <= 0:
+        return ""
+    block = '<li><a href="/boagri/rubrique">Rubrique du Bulletin officiel</a></li>'
+    return "<ul class='menu'>" + block * (size // len(block) + 1) + "</ul>"
+
+
+def render_week(catalog, year, week):
+    items = "".join(
+        f'<li><a href="/boagri/{slug}">{html.escape(title)}</a></li>'
+        f'<li><a href="/boagri/autre-{slug}">DGAL/SDSPA/{year}-{i}</a></li>'
+        for i, (title, slug) in enumerate(catalog.week(year, week))
+    )
+    return (f"<html><body>{_filler(catalog.config.page_size)}"
+            f"<h1>Semaine {week} - {year}</h1><ul>{items}</ul></body></html>")
+
+
+def render_detail(catalog, objet, resume):
+    return (f"<html><body>{_filler(catalog.config.page_size)}"
+            f"<p><b>OBJET : </b>{html.escape(str(objet))}</p>"
+            f"<p><b>RESUME : </b>{html.escape(str(resume))}</p></body></html>")
+
+
+# 📌 Serveur
+def make_handler(config, catalog, stats):
+    attempts = Counter()
+    lock = threading.Lock()
+
+    class MockBoagriHandler(BaseHTTPRequestHandler):
+        def _decide(self):
+            """Tirage rejouable : dépend de la graine, du chemin et de la tentative."""
+            with lock:
+                attempts[self.path] += 1
+                attempt = attempts[self.path]
+            return random.Random(f"{config.seed}:{self.path}:{attempt}")
+
+        def _send(self, status, payload=b"", content_type="text/html; charset=utf-8"):
+            etag = f'"{hashlib.sha1(payload).hexdigest()[:16]}"' if status == 200 else None
+            if etag and self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+            with lock:
+                stats[status] += 1
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+            if payload:
+                self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            rng = self._decide()
+            time.sleep(config.latency + rng.uniform(0, config.jitter))
+            if rng.random() < config.error_rate:
+                return self._send(503)
+
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 4 and parts[1] == "historique":
+                try:
+                    year, week = int(parts[2].replace("annee-", "")), int(parts[3].replace("semaine-", ""))
+                except ValueError:
+                    return self._send(404)
+                return self._send(200, render_week(catalog, year, week).encode('utf-8'))
+            if len(parts) == 3 and parts[2] == "telechargement" and config.pdf:
+                return self._send(200, catalog.pdf(parts[1]), "application/pdf")
+            if len(parts) == 2 and parts[0] == "boagri":
+                detail = catalog.detail(parts[1])
+                if detail is not None:
+                    return self._send(200, render_detail(catalog, *detail).encode('utf-8'))
+            return self._send(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockBoagriHandler
+
+
+class MockServer:
+    """Faux site démarré dans un thread : `base_url`, compteurs de réponses `stats`."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.stats = Counter()
+        self._server = ThreadingHTTPServer((host, port),
+                                           make_handler(self.config, Catalog(self.config), self.stats))
+        self._server.daemon_threads = True
+        self.base_url = f"http://{host}:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def start_mock_server(per_week, latency, **options):
+    """Démarre un faux site synthétique : (serveur, URL de base)."""
+    server = MockServer(MockConfig(per_week=per_week, latency=latency, **options)).start()
+    return server, server.base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--per-week", type=int, default=3, help="instructions par semaine (synthétique)")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence par requête (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latence aléatoire supplémentaire (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part des réponses 503")
+    parser.add_argument("--page-size", type=int, default=0, help="taille de remplissage des pages (octets)")
+    parser.add_argument("--dataset", nargs="?", const=CSV_PATH, default=None,
+                        help="rejouer le CSV de référence (ou le CSV indiqué)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(per_week=args.per_week, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, page_size=args.page_size,
+                        dataset=args.dataset, seed=args.seed)
+    server = MockServer(config, port=args.port).start()
+    print(f"🌐 Faux site boagri sur {server.base_url} (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+        print(f"📊 Réponses servies : {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
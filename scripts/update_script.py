@@ -1,10 +1,23 @@
+import argparse
+import json
 import sqlite3
 import os
-import requests
+import sys
 import pandas as pd
-from bs4 import BeautifulSoup
 from datetime import datetime
 
+# Modules partagés avec l'application
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+import changesets
+import database
+import enrich
+import ingest
+import jobs
+import migrations
+import pdf_mirror
+import pdf_text
+import scraper
+
 # 📌 Chemin vers la base de données
 DB_PATH = "data/sdssa_instructions.db"
 
@@ -37,111 +50,222 @@ def setup_database():
         except sqlite3.OperationalError:
             pass  # Si l'index existe déjà
 
+    # File de récupération des semaines (reprise après interruption)
+    jobs.ensure_jobs_table(conn)
+
+    # Version de changeset embarquée dans la base publiée
+    if changesets.get_version(conn) is None:
+        changesets.set_version(conn, changesets.load_manifest().get("latest_version", 0))
+
     conn.commit()
     conn.close()
 
-# 📌 Fonction pour corriger les liens mal formés
-def fix_links():
+# 📌 Migrations de données (réparation des liens mal formés...), une seule fois chacune
+def apply_migrations(verbose=True):
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    try:
+        changes = migrations.apply_migrations(conn)
+    finally:
+        conn.close()
 
-    cursor.execute("SELECT id, link, pdf_link FROM instructions;")
-    rows = cursor.fetchall()
+    if verbose:
+        for name, titles in changes.items():
+            print(f"🛠 Migration {name} : {len(titles)} instructions corrigées")
+    return [title for titles in changes.values() for title in titles]
 
-    for row in rows:
-        record_id, link, pdf_link = row
+# 📌 Bilan d'intégrité des liens
+def links_report(verbose=True):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        report = database.link_report(conn)
+    finally:
+        conn.close()
 
-        # Corriger les liens mal formés
-        if link and link.startswith("https://info.agriculture.gouv.frhttps"):
-            corrected_link = link.replace("https://info.agriculture.gouv.frhttps", "https")
-            corrected_pdf_link = pdf_link.replace("https://info.agriculture.gouv.frhttps", "https")
+    if verbose:
+        anomalies = {name: count for name, count in report.items() if name != "total" and count}
+        if anomalies:
+            print(f"⚠️ Liens à vérifier sur {report['total']} instructions : {anomalies}")
+        else:
+            print(f"🔗 Liens conformes ({report['total']} instructions)")
+    return report
 
-            cursor.execute("""
-                UPDATE instructions
-                SET link = ?, pdf_link = ?
-                WHERE id = ?;
-            """, (corrected_link, corrected_pdf_link, record_id))
-
-    conn.commit()
-    conn.close()
-
-# 📌 Fonction pour récupérer les nouvelles instructions
-def get_new_instructions(year, week):
-    url = f"https://info.agriculture.gouv.fr/boagri/historique/annee-{year}/semaine-{week}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        instructions = soup.find_all('a', href=True)
-
-        result = []
-        for a in instructions:
-            if 'SDSSA' in a.text:
-                link = f"https://info.agriculture.gouv.fr{a['href']}"
-                pdf_link = link.replace("/detail", "/telechargement")
-                result.append((year, week, a.text, link, pdf_link, "OBJET : Inconnu", "RESUME : Inconnu"))
-
-        return result
-    else:
-        print(f"❌ Échec de récupération des données pour {year} Semaine {week}")
-        return []
+# 📌 Affichage de la progression
+def progress_printer(verbose):
+    def on_progress(done, total, year, week, instructions):
+        if not verbose:
+            return
+        if instructions is None:
+            print(f"❌ Échec de récupération des données pour {year} Semaine {week}")
+        else:
+            print(f"📄 [{done}/{total}] {year} Semaine {week} : {len(instructions)} instructions")
+    return on_progress
 
 # 📌 Fonction pour ajouter les instructions à la base de données
-def update_database():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def update_database(since=None, max_weeks=None, workers=scraper.DEFAULT_MAX_IN_FLIGHT, dry_run=False, verbose=True,
+                    base_url=scraper.BASE_URL):
+    stats = ingest.run(DB_PATH, since=since, max_weeks=max_weeks, workers=workers,
+                       dry_run=dry_run, on_progress=progress_printer(verbose), base_url=base_url)
+
+    if verbose:
+        print(f"✅ {stats.inserted} nouvelles instructions ajoutées, {stats.updated} mises à jour "
+              f"({stats.weeks_checked} semaines vérifiées, dont {stats.weeks_empty} vides).")
+    return stats
 
-    # Identifier la dernière semaine enregistrée
-    cursor.execute("SELECT MAX(year), MAX(week) FROM instructions;")
-    latest_entry = cursor.fetchone()
-    latest_year, latest_week = latest_entry if latest_entry != (None, None) else (2019, 1)
+# 📌 Reconstruction complète de l'historique
+def backfill_database(from_year=ingest.BACKFILL_START[0], chunk_weeks=ingest.BACKFILL_CHUNK, max_weeks=None,
+                      workers=scraper.DEFAULT_MAX_IN_FLIGHT, rate=scraper.DEFAULT_RATE, verbose=True,
+                      base_url=scraper.BASE_URL):
+    stats = ingest.backfill(DB_PATH, start=(from_year, 1), chunk_weeks=chunk_weeks, max_weeks=max_weeks,
+                            workers=workers, rate=rate, on_progress=progress_printer(verbose), base_url=base_url)
 
-    current_year, current_week = datetime.now().isocalendar()[:2]
+    if verbose:
+        print(f"✅ {stats.inserted} instructions chargées, {stats.updated} mises à jour "
+              f"({stats.weeks_failed} semaines en échec, reprises au prochain passage).")
+    return stats
 
-    # Trouver les semaines à vérifier
-    weeks_to_check = []
-    for year in range(latest_year, current_year + 1):
-        start_week = latest_week + 1 if year == latest_year else 1
-        end_week = current_week if year == current_year else 52
-        for week in range(start_week, end_week + 1):
-            weeks_to_check.append((year, week))
+# 📌 Complétion des fiches restées sans objet ou sans résumé
+def enrich_instructions(limit=enrich.DEFAULT_LIMIT, workers=scraper.DEFAULT_MAX_IN_FLIGHT, verbose=True):
+    def on_progress(done, total, title, status):
+        if verbose and status != 200:
+            print(f"❌ [{done}/{total}] {title} : {status or 'pas de réponse'}")
 
-    print(f"📅 Semaines à vérifier : {weeks_to_check}")
+    stats = enrich.run(DB_PATH, limit=limit, workers=workers, on_progress=on_progress)
+    if verbose:
+        print(f"✅ {stats.enriched} fiches complétées sur {stats.selected} redemandées, "
+              f"{stats.failed} à reprendre ({stats.abandoned} abandonnées).")
+    return stats
 
-    # Récupérer les nouvelles instructions
-    new_instructions = []
-    for year, week in weeks_to_check:
-        new_instructions.extend(get_new_instructions(year, week))
+# 📌 Extraction du texte des PDF (recherche plein texte) : fiches modifiées et PDF en attente seulement
+def extract_pdf_texts(changed_titles, workers=pdf_text.DEFAULT_WORKERS, verbose=True):
+    def on_progress(done, total, title, status):
+        if verbose and status in ("extracted", "failed"):
+            print(f"📄 [{done}/{total}] {title} : {status}")
 
-    print(f"📄 {len(new_instructions)} nouvelles instructions trouvées.")
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        database.ensure_pdf_tables(conn)
+        titles = set(changed_titles) | set(pdf_text.pending_titles(conn))
+    finally:
+        conn.close()
 
-    # Ajouter les nouvelles instructions à la base de données
-    added_count = 0
-    for instruction in new_instructions:
-        year, week, title, link, pdf_link, objet, resume = instruction
-        cursor.execute("SELECT COUNT(*) FROM instructions WHERE title = ?", (title,))
-        exists = cursor.fetchone()[0]
+    stats = pdf_text.run(DB_PATH, titles=titles, workers=workers, on_progress=on_progress)
+    if verbose:
+        print(f"✅ {stats['extracted']} PDF extraits, {stats['not_modified'] + stats['unchanged']} inchangés, "
+              f"{stats['failed']} en échec ({stats['deferred']} reportés).")
+    return stats
 
-        if exists == 0:
-            cursor.execute("""
-                INSERT INTO instructions (year, week, title, link, pdf_link, objet, resume, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (year, week, title, link, pdf_link, objet, resume, datetime.now()))
-            added_count += 1
+# 📌 Copie locale des PDF (miroir)
+def mirror_pdfs(workers=pdf_mirror.DEFAULT_WORKERS, verbose=True):
+    stats = pdf_mirror.mirror_pdfs(DB_PATH, workers=workers)
+    if verbose:
+        print(f"✅ {stats['mirrored']} PDF copiés ({stats['resumed']} repris), "
+              f"{stats['skipped'] + stats['deduplicated']} déjà présents, {stats['failed']} en échec.")
+    return stats
 
-    conn.commit()
-    conn.close()
+# 📌 Fonction pour publier les lignes modifiées (et le texte des PDF modifiés) sous forme de changeset
+def publish_changeset(titles, pdf_titles=(), verbose=True):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        version = changesets.write_changeset(conn, titles, pdf_titles=pdf_titles)
+    finally:
+        conn.close()
 
-    print(f"✅ {added_count} nouvelles instructions ajoutées.")
+    if not verbose:
+        return version
+    if version is None:
+        print("📦 Aucun changeset à publier.")
+    else:
+        print(f"📦 Changeset {version} publié ({len(set(titles))} instructions, "
+              f"{len(set(pdf_titles))} textes de PDF).")
+    return version
 
 # 📌 Exécuter les mises à jour
 if __name__ == "__main__":
-    print("🔄 Initialisation de la base de données...")
-    setup_database()
+    parser = argparse.ArgumentParser(description="Mise à jour de la base des instructions SDSSA")
+    parser.add_argument("--since", type=lambda value: datetime.strptime(value, "%Y-%m-%d"), default=None,
+                        help="date de départ (AAAA-MM-JJ) ; par défaut la dernière mise à jour")
+    parser.add_argument("--max-weeks", type=int, default=None,
+                        help="nombre maximal de semaines à traiter (rattrapage par tranches)")
+    parser.add_argument("--workers", type=int, default=scraper.DEFAULT_MAX_IN_FLIGHT,
+                        help="requêtes simultanées")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="récupérer sans rien écrire dans la base")
+    parser.add_argument("--json", action="store_true",
+                        help="afficher uniquement les statistiques au format JSON")
+    parser.add_argument("--backfill", action="store_true",
+                        help="reconstruire tout l'historique depuis --from-year (reprise possible)")
+    parser.add_argument("--from-year", type=int, default=ingest.BACKFILL_START[0],
+                        help="première année de la reconstruction")
+    parser.add_argument("--chunk-weeks", type=int, default=ingest.BACKFILL_CHUNK,
+                        help="semaines chargées par transaction lors de la reconstruction")
+    parser.add_argument("--rate", type=float, default=scraper.DEFAULT_RATE,
+                        help="requêtes par seconde vers boagri lors de la reconstruction")
+    parser.add_argument("--enrich", action="store_true",
+                        help="redemander ensuite les pages de détail des fiches sans objet ou sans résumé")
+    parser.add_argument("--pdf-text", action="store_true",
+                        help="extraire ensuite le texte des PDF nouveaux ou modifiés")
+    parser.add_argument("--mirror-pdfs", action="store_true",
+                        help="copier ensuite les PDF dans le miroir local (mirror/)")
+    parser.add_argument("--base-url", default=scraper.BASE_URL,
+                        help="site boagri interrogé (faux site local de scripts/mock_boagri.py pour les essais)")
+    parser.add_argument("--db", default=DB_PATH,
+                        help="base à mettre à jour ; aucun changeset n'est publié pour une autre base")
+    args = parser.parse_args()
+    if args.backfill and args.dry_run:
+        parser.error("--dry-run n'est pas disponible avec --backfill")
+    verbose = not args.json
+    publish = args.db == DB_PATH and not args.dry_run
+    DB_PATH = args.db
+
+    changed_titles = []
+    if not args.dry_run:
+        if verbose:
+            print("🔄 Initialisation de la base de données...")
+        setup_database()
 
-    print("🛠 Correction des liens mal formés...")
-    fix_links()
+        changed_titles = apply_migrations(verbose=verbose)
+    links_fixed = len(changed_titles)
 
-    print("📡 Récupération et mise à jour des instructions...")
-    update_database()
+    if verbose:
+        print("📡 Récupération et mise à jour des instructions...")
+    if args.backfill and not args.dry_run:
+        stats = backfill_database(from_year=args.from_year, chunk_weeks=args.chunk_weeks, max_weeks=args.max_weeks,
+                                  workers=args.workers, rate=args.rate, verbose=verbose, base_url=args.base_url)
+    else:
+        stats = update_database(since=args.since, max_weeks=args.max_weeks, workers=args.workers,
+                                dry_run=args.dry_run, verbose=verbose, base_url=args.base_url)
+    changed_titles += stats.changed_titles
 
-    print("✅ Mise à jour terminée !")
+    enrich_stats = None
+    if args.enrich and not args.dry_run:
+        if verbose:
+            print("🧩 Complétion des fiches incomplètes...")
+        enrich_stats = enrich_instructions(workers=args.workers, verbose=verbose)
+        changed_titles += enrich_stats.changed_titles
+
+    pdf_stats = None
+    if args.pdf_text and not args.dry_run:
+        if verbose:
+            print("📄 Extraction du texte des PDF...")
+        pdf_stats = extract_pdf_texts(changed_titles, verbose=verbose)
+
+    mirror_stats = None
+    if args.mirror_pdfs and not args.dry_run:
+        if verbose:
+            print("📄 Copie locale des PDF...")
+        mirror_stats = mirror_pdfs(verbose=verbose)
+
+    if publish:
+        if verbose:
+            print("📦 Publication du changeset...")
+        publish_changeset(changed_titles, pdf_stats["changed_titles"] if pdf_stats else (), verbose=verbose)
+
+    report = links_report(verbose=verbose)
+
+    if args.json:
+        print(json.dumps(dict(stats.to_dict(), links_fixed=links_fixed, links=report,
+                              enrich=enrich_stats.to_dict() if enrich_stats else None,
+                              pdf_text=pdf_stats, pdf_mirror=mirror_stats),
+                         ensure_ascii=False, indent=2))
+    else:
+        print("✅ Mise à jour terminée !")